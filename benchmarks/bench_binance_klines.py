@@ -0,0 +1,104 @@
+"""Microbenchmark: parseo de páginas de /api/v3/klines.
+
+Compara el camino anterior (``json`` + DataFrame de listas + ``pd.to_numeric``
+por columna + clip por página + concat/dedupe/sort/clip final) con el actual
+de ``client.parse_klines`` / ``client.klines_frame`` sobre páginas sintéticas
+de 1000 velas (el máximo por request)::
+
+    python benchmarks/bench_binance_klines.py --pages 30 --repeat 5
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+import pandas as pd
+
+from datalake.providers.binance import client
+
+T0_MS = 1_735_689_600_000  # 2025-01-01 00:00 UTC
+STEP_MS = 60_000
+
+LEGACY_COLS = [
+    'openTime', 'open', 'high', 'low', 'close', 'volume', 'closeTime',
+    'qav', 'numTrades', 'takerBuyBase', 'takerBuyQuote', 'ignore',
+]
+
+
+def make_pages(pages: int, rows: int = 1000) -> list:
+    """Cuerpos JSON (bytes) con el layout de Binance: precios como strings."""
+    out = []
+    for p in range(pages):
+        data = []
+        for i in range(rows):
+            t = T0_MS + (p * rows + i) * STEP_MS
+            px = 40_000 + (p * rows + i) % 997 * 0.01
+            data.append([t, f"{px:.8f}", f"{px + 5:.8f}", f"{px - 5:.8f}", f"{px + 1:.8f}", "12.34500000",
+                         t + STEP_MS - 1, "493800.12345678", 321, "6.10000000", "244000.00000000", "0"])
+        out.append(json.dumps(data).encode())
+    return out
+
+
+def legacy(raw_pages: list, start_ms: int, end_ms: int) -> pd.DataFrame:
+    start = pd.Timestamp(start_ms, unit='ms', tz='UTC')
+    end = pd.Timestamp(end_ms, unit='ms', tz='UTC')
+    out = []
+    for raw in raw_pages:
+        df = pd.DataFrame(json.loads(raw), columns=LEGACY_COLS)
+        df['ts'] = pd.to_datetime(df['openTime'], unit='ms', utc=True)
+        for c in ('open', 'high', 'low', 'close', 'volume', 'qav', 'numTrades', 'takerBuyBase', 'takerBuyQuote'):
+            df[c] = pd.to_numeric(df[c], errors='coerce')
+        df = df[['ts', 'open', 'high', 'low', 'close', 'volume', 'qav', 'numTrades', 'takerBuyBase', 'takerBuyQuote']]
+        out.append(df[(df['ts'] >= start) & (df['ts'] <= end)])
+    res = pd.concat(out, ignore_index=True).drop_duplicates(subset=['ts']).sort_values('ts').reset_index(drop=True)
+    return res[(res['ts'] >= start) & (res['ts'] <= end)].reset_index(drop=True)
+
+
+def vectorised(raw_pages: list, start_ms: int, end_ms: int) -> pd.DataFrame:
+    return client.klines_frame([client.parse_klines(client._loads(r)) for r in raw_pages], start_ms, end_ms)
+
+
+def vectorised_stdlib_json(raw_pages: list, start_ms: int, end_ms: int) -> pd.DataFrame:
+    return client.klines_frame([client.parse_klines(json.loads(r)) for r in raw_pages], start_ms, end_ms)
+
+
+CASES = {
+    "legacy_to_numeric": legacy,
+    "numpy_stdlib_json": vectorised_stdlib_json,
+    "numpy_fast_decoder": vectorised,
+}
+
+
+def run(pages: int = 30, repeat: int = 5) -> dict:
+    raw = make_pages(pages)
+    start_ms, end_ms = T0_MS, T0_MS + (pages * 1000 - 1) * STEP_MS
+    ref = legacy(raw, start_ms, end_ms)
+    results = {}
+    for name, fn in CASES.items():
+        best = float("inf")
+        for _ in range(repeat):
+            t = time.perf_counter()
+            df = fn(raw, start_ms, end_ms)
+            best = min(best, time.perf_counter() - t)
+        assert len(df) == len(ref) and (df['close'].to_numpy() == ref['close'].to_numpy()).all()
+        results[name] = best
+    return results
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=30, help="páginas de 1000 velas (30 ≈ 3 semanas de M1)")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    res = run(args.pages, args.repeat)
+    rows = args.pages * 1000
+    for name, secs in res.items():
+        print(f"{name:<20} {secs * 1000:9.1f} ms  ({secs / args.pages * 1000:.2f} ms/página, {rows / secs / 1e6:.2f} M velas/s)")
+    print(f"decoder rápido: {'orjson' if client._orjson is not None else 'no instalado (json)'}")
+    print(f"speedup legacy→numpy: {res['legacy_to_numeric'] / res['numpy_fast_decoder']:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,114 @@
+"""Lecturas de un día sobre particiones mensuales: un row group vs row groups por día.
+
+Escribe el mismo mes de M1 sintético con los dos layouts (``row_groups="off"``,
+el default de pyarrow, y ``"day"``) y lee con ``read_range_df`` cada día del
+mes, midiendo tiempo, bytes y row groups leídos (plan ``explain``)::
+
+    python benchmarks/bench_day_reads.py --symbols 1 --month 2024-01 --repeat 5
+    python benchmarks/bench_day_reads.py --page-index --out benchmarks/results/day_reads.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+
+from datalake.ingestors.ibkr.writer import COLS_BASE
+from datalake.read.api import read_range_df
+from datalake.tools.synth import make_m1, partition_path, symbol_names
+from datalake.write.partition import atomic_write_table
+
+LAYOUTS = {"single": "off", "day": "day"}
+
+
+def _month_days(month: str) -> List[date]:
+    d0 = date.fromisoformat(f"{month}-01")
+    d1 = (d0.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return [d0 + timedelta(days=i) for i in range((d1 - d0).days)]
+
+
+def write_layout(root: str, symbols: List[str], month: str, row_groups: str, page_index: bool) -> int:
+    """Un archivo mensual por símbolo con el layout pedido. Devuelve bytes en disco."""
+    days = _month_days(month)
+    size = 0
+    for i, sym in enumerate(symbols):
+        df = make_m1(sym, days[0].isoformat(), days[-1].isoformat(), seed=42 + i)
+        dest = partition_path(root, sym, "M1", days[0].year, days[0].month)
+        atomic_write_table(pa.Table.from_pandas(df[COLS_BASE], preserve_index=False), dest,
+                           row_groups=row_groups, write_page_index=page_index,
+                           compression="zstd", version="2.6", use_dictionary=False)
+        size += os.path.getsize(dest)
+    return size
+
+
+def time_day_reads(root: str, symbols: List[str], month: str, repeat: int) -> Dict[str, float]:
+    days = _month_days(month)
+    times: List[float] = []
+    bytes_read = rg_read = rg_total = 0
+    for _ in range(repeat):
+        for sym in symbols:
+            for d in days:
+                t = time.perf_counter()
+                df = read_range_df(root, market="crypto", tf="M1", symbol=sym, date_from=d.isoformat(),
+                                   date_to=(d + timedelta(days=1)).isoformat(), explain=True)
+                times.append(time.perf_counter() - t)
+                assert len(df) == 1440, (sym, d, len(df))
+                plan = df.attrs["read_plan"]
+                bytes_read += plan.bytes_read
+                rg_read += sum(f.row_groups for f in plan.selected)
+                rg_total += sum(f.row_groups_total for f in plan.selected)
+    n = len(times)
+    return {"reads": n, "min_ms": min(times) * 1000, "median_ms": statistics.median(times) * 1000,
+            "bytes_per_read": bytes_read / n, "row_groups_per_read": rg_read / n,
+            "row_groups_per_file": rg_total / n}
+
+
+def run(*, n_symbols: int = 1, month: str = "2024-01", repeat: int = 3, page_index: bool = False) -> Dict[str, object]:
+    symbols = symbol_names(n_symbols)
+    out: Dict[str, object] = {"month": month, "symbols": n_symbols, "page_index": page_index, "layouts": {}}
+    with tempfile.TemporaryDirectory(prefix="bench-day-") as tmp:
+        for name, rg in LAYOUTS.items():
+            root = os.path.join(tmp, name)
+            size = write_layout(root, symbols, month, rg, page_index)
+            res = time_day_reads(root, symbols, month, repeat)
+            res["file_bytes"] = size / n_symbols
+            out["layouts"][name] = res
+    single, day = out["layouts"]["single"], out["layouts"]["day"]
+    out["speedup"] = single["median_ms"] / day["median_ms"] if day["median_ms"] else float("inf")
+    out["bytes_ratio"] = day["bytes_per_read"] / single["bytes_per_read"] if single["bytes_per_read"] else 0.0
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Lecturas de un día: row group único vs row groups por día UTC")
+    ap.add_argument("--symbols", type=int, default=1)
+    ap.add_argument("--month", default="2024-01", help="YYYY-MM")
+    ap.add_argument("--repeat", type=int, default=3, help="pasadas por todos los días del mes")
+    ap.add_argument("--page-index", action="store_true", help="escribir también el page index")
+    ap.add_argument("--out", default=None, help="archivo .json con los resultados")
+    args = ap.parse_args(argv)
+
+    res = run(n_symbols=args.symbols, month=args.month, repeat=args.repeat, page_index=args.page_index)
+    for name, m in res["layouts"].items():
+        print(f"{name:<7} mediana {m['median_ms']:7.2f} ms  min {m['min_ms']:7.2f} ms  "
+              f"bytes/lectura {m['bytes_per_read']:>11,.0f} / archivo {m['file_bytes']:>11,.0f}  "
+              f"row groups {m['row_groups_per_read']:.0f}/{m['row_groups_per_file']:.0f}")
+    print(f"día vs único: x{res['speedup']:.2f} más rápido, {res['bytes_ratio']:.3f} de los bytes")
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(res, indent=2))
+        print(f"[OK] resultados → {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
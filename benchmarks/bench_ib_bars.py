@@ -0,0 +1,89 @@
+"""Microbenchmark: conversión de barras IB a DataFrame.
+
+Compara la conversión por barra anterior (``b.__dict__`` / ``getattr`` +
+``float()``) con la columnar de ``downloader.bars_to_columns`` sobre 100k
+``BarData`` sintéticos::
+
+    python benchmarks/bench_ib_bars.py --n 100000 --repeat 5
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+from ib_insync import BarData
+
+from datalake.ingestors.ibkr.downloader import bars_frame_utc, bars_to_df
+
+
+def make_bars(n: int) -> list:
+    t0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        BarData(date=t0 + timedelta(minutes=i), open=100.0 + i % 7, high=101.0 + i % 7,
+                low=99.0 + i % 7, close=100.5 + i % 7, volume=float(i % 13), average=100.0, barCount=3)
+        for i in range(n)
+    ]
+
+
+def legacy_dict(bars) -> pd.DataFrame:
+    df = pd.DataFrame(b.__dict__ for b in bars)[["date", "open", "high", "low", "close", "volume"]]
+    df["ts"] = pd.to_datetime(df["date"], utc=True)
+    return df.drop(columns=["date"]).sort_values("ts")
+
+
+def legacy_getattr(bars, exchange: str = "PAXOS") -> pd.DataFrame:
+    from datalake.ingestors.ibkr.timeutil import to_utc
+
+    df = pd.DataFrame([
+        {
+            "date": getattr(b, "date", None),
+            "open": float(getattr(b, "open", "nan")),
+            "high": float(getattr(b, "high", "nan")),
+            "low": float(getattr(b, "low", "nan")),
+            "close": float(getattr(b, "close", "nan")),
+            "volume": float(getattr(b, "volume", "nan")),
+        }
+        for b in bars
+    ])
+    df["ts"] = to_utc(df["date"], exchange)
+    return df.drop(columns=["date"]).sort_values("ts").reset_index(drop=True)
+
+
+CASES = {
+    "legacy_dict": legacy_dict,
+    "columnar_frame_utc": bars_frame_utc,
+    "legacy_getattr": legacy_getattr,
+    "columnar_bars_to_df": lambda bars: bars_to_df(bars, "PAXOS"),
+}
+
+
+def run(n: int = 100_000, repeat: int = 5) -> dict:
+    bars = make_bars(n)
+    results = {}
+    for name, fn in CASES.items():
+        best = float("inf")
+        for _ in range(repeat):
+            t = time.perf_counter()
+            fn(bars)
+            best = min(best, time.perf_counter() - t)
+        results[name] = best
+    return results
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    res = run(args.n, args.repeat)
+    for name, secs in res.items():
+        print(f"{name:<22} {secs * 1000:9.1f} ms  ({args.n / secs / 1e6:.2f} M barras/s)")
+    print(f"speedup dict→columnar:    {res['legacy_dict'] / res['columnar_frame_utc']:.1f}x")
+    print(f"speedup getattr→columnar: {res['legacy_getattr'] / res['columnar_bars_to_df']:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,190 @@
+"""Suite de benchmarks de los hot paths del lake (lectura, escritura, agregados).
+
+Genera un lake sintético con ``datalake.tools.synth.write_lake`` (``--symbols``
+x ``--years`` de M1, más M5/M15 para el join MTF), mide cada caso ``--repeat``
+veces y guarda un JSON con mínimo/mediana por caso, el tamaño del lake y el
+commit, para comparar entre commits::
+
+    python benchmarks/bench_lake.py run --symbols 2 --years 1 --out benchmarks/results
+    python benchmarks/bench_lake.py compare benchmarks/results/base.json benchmarks/results/head.json
+
+``--lake DIR`` reutiliza (o deja) el lake generado entre corridas; sin él se
+usa un directorio temporal. ``compare`` sale con código 1 si algún caso es
+más lento que ``--threshold`` (fracción) respecto a la base.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from bridge.backtest_crew.provider import LakeProvider
+from datalake.aggregates.aggregate import aggregate_symbol
+from datalake.aggregates.loader import load_m1_range
+from datalake.config import LakeConfig
+from datalake.ingestors.ibkr.writer import write_month
+from datalake.levels.or_levels import build_or_levels
+from datalake.read.api import join_mtf_exec_ctx, read_range_df
+from datalake.read.reader import read_range
+from datalake.tools.gaps import find_missing_ranges_utc
+from datalake.tools.synth import make_m1, symbol_names, write_lake
+
+ROOT = Path(__file__).resolve().parents[1]
+
+START = date(2023, 1, 1)
+CTX_TFS = {"M5": "5min", "M15": "15min"}
+
+
+def _cfg(root: str, timeframe: str = "M1") -> SimpleNamespace:
+    return SimpleNamespace(data_root=root, market="crypto", timeframe=timeframe, source="ibkr", vendor="ibkr",
+                           exchange="PAXOS", what_to_show="AGGTRADES", tz="UTC")
+
+
+def build_lake(root: str, n_symbols: int, days: int, seed: int = 42) -> Dict[str, object]:
+    """Escribe M1 (y M5/M15) por (símbolo, mes). Idempotente si ya existe."""
+    marker = Path(root) / ".bench_lake.json"
+    meta = {"symbols": n_symbols, "days": days, "seed": seed, "start": START.isoformat()}
+    if marker.exists() and json.loads(marker.read_text()) == meta:
+        return meta
+    end = START + timedelta(days=days - 1)
+    write_lake(root, symbol_names(n_symbols), START.isoformat(), end.isoformat(), seed=seed, extra_tfs=CTX_TFS)
+    marker.write_text(json.dumps(meta))
+    return meta
+
+
+def make_cases(root: str, scratch: str, n_symbols: int, days: int, window_days: int) -> Dict[str, Callable[[], object]]:
+    """Casos sobre la última ventana de ``window_days`` del primer símbolo.
+
+    Los casos que escriben lo hacen en ``scratch`` para no alterar el lake medido.
+    """
+    sym = symbol_names(n_symbols)[0]
+    end = START + timedelta(days=days - 1)
+    d0 = max(START, end - timedelta(days=window_days - 1))
+    d_from, d_to, d_excl = d0.isoformat(), end.isoformat(), (end + timedelta(days=1)).isoformat()
+    lake = LakeConfig(root=root)
+    month = make_m1("BENCH-USD", end.replace(day=1).isoformat(), end.isoformat())
+    day_mid = (d0 + (end - d0) / 2).isoformat()
+
+    return {
+        "read_range_df": lambda: read_range_df(root, market="crypto", tf="M1", symbol=sym,
+                                               date_from=d_from, date_to=d_excl),
+        "read_range": lambda: read_range(root, "crypto", "M1", sym, d_from, d_to),
+        "join_mtf_exec_ctx": lambda: join_mtf_exec_ctx(root, symbol=sym, market="crypto", exec_tf="M1",
+                                                       ctx_tfs=list(CTX_TFS), date_from=d_from, date_to=d_excl),
+        "load_exec_and_filter": lambda: LakeProvider(cfg=lake).load_exec_and_filter(
+            sym, f"{d_from} 00:00", f"{d_to} 23:59", exec_tf="1 min", filter_tf="15 mins"),
+        "aggregate_symbol": lambda: aggregate_symbol(sym, f"{d_from} 00:00", f"{d_to} 23:59", ["M5", "H1"],
+                                                     lambda s, a, b, _: load_m1_range(s, a, b, lake),
+                                                     LakeConfig(root=scratch)),
+        "build_or_levels": lambda: build_or_levels(sym, f"{d_from} 00:00", f"{d_to} 23:59", cfg=lake),
+        # tras el warm-up el mes ya existe: mide el ciclo completo leer → merge/dedupe → escribir
+        "write_month": lambda: write_month(month, symbol="BENCH-USD", cfg=_cfg(scratch)),
+        "find_missing_ranges_utc": lambda: find_missing_ranges_utc(sym, day_mid, "M1", "PAXOS", "AGGTRADES",
+                                                                  _cfg(root)),
+    }
+
+
+def time_case(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    fn()  # warm-up (imports, caché de FS)
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return {"min_s": min(times), "median_s": statistics.median(times), "repeat": repeat}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(*, n_symbols: int = 1, years: float = 0.25, window_days: int = 30, repeat: int = 5,
+        lake: Optional[str] = None, only: Optional[List[str]] = None) -> Dict[str, object]:
+    days = max(1, round(years * 365))
+    with tempfile.TemporaryDirectory(prefix="bench-lake-") as tmp:
+        root = lake or os.path.join(tmp, "lake")
+        t = time.perf_counter()
+        meta = build_lake(root, n_symbols, days)
+        build_s = time.perf_counter() - t
+        cases = make_cases(root, os.path.join(tmp, "scratch"), n_symbols, days, window_days)
+        results = {name: time_case(fn, repeat) for name, fn in cases.items() if not only or name in only}
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "lake": {**meta, "window_days": min(window_days, days), "m1_rows_per_symbol": days * 1440,
+                 "build_s": round(build_s, 3)},
+        "results": results,
+    }
+
+
+def compare(base: Dict[str, object], head: Dict[str, object], threshold: float = 0.15) -> List[Dict[str, object]]:
+    """Ratio head/base (mediana) por caso común; ``regression`` si supera ``1 + threshold``."""
+    rows = []
+    for name, h in head["results"].items():
+        b = base["results"].get(name)
+        if b is None:
+            continue
+        ratio = h["median_s"] / b["median_s"] if b["median_s"] > 0 else float("inf")
+        rows.append({"case": name, "base_s": b["median_s"], "head_s": h["median_s"], "ratio": ratio,
+                     "regression": ratio > 1 + threshold})
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmarks de lectura/escritura/agregados del lake")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run")
+    r.add_argument("--symbols", type=int, default=1)
+    r.add_argument("--years", type=float, default=0.25, help="años de M1 por símbolo (0.25 ≈ 3 meses)")
+    r.add_argument("--window-days", type=int, default=30, help="rango que leen los casos de lectura")
+    r.add_argument("--repeat", type=int, default=5)
+    r.add_argument("--lake", default=None, help="directorio del lake sintético (se reutiliza si coincide)")
+    r.add_argument("--case", action="append", dest="only", help="solo estos casos (repetible)")
+    r.add_argument("--out", default=None, help="archivo .json o directorio (→ <commit>.json)")
+    c = sub.add_parser("compare")
+    c.add_argument("base")
+    c.add_argument("head")
+    c.add_argument("--threshold", type=float, default=0.15)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "compare":
+        base, head = (json.loads(Path(p).read_text()) for p in (args.base, args.head))
+        rows = compare(base, head, args.threshold)
+        for row in rows:
+            flag = "REGRESIÓN" if row["regression"] else ""
+            print(f"{row['case']:<24} {row['base_s'] * 1000:9.1f} ms → {row['head_s'] * 1000:9.1f} ms"
+                  f"  x{row['ratio']:.2f} {flag}")
+        return 1 if any(row["regression"] for row in rows) else 0
+
+    res = run(n_symbols=args.symbols, years=args.years, window_days=args.window_days,
+              repeat=args.repeat, lake=args.lake, only=args.only)
+    for name, m in res["results"].items():
+        print(f"{name:<24} min {m['min_s'] * 1000:9.1f} ms   mediana {m['median_s'] * 1000:9.1f} ms")
+    if args.out:
+        out = Path(args.out)
+        if out.suffix != ".json":
+            out = out / f"{res['commit'] or 'local'}.json"
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(res, indent=2))
+        print(f"[OK] resultados → {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,8 +2,9 @@ from __future__ import annotations
 import pandas as pd
 from datalake.config import LakeConfig
 from pathlib import Path
-import pyarrow as pa
-import pyarrow.parquet as pq
+from datalake.read.schemas import BINANCE_EXTENDED
+from datalake.utils.metrics import annotate, timed
+from datalake.write.partition import merge_write
 
 # Reglas de resampleo por timeframe
 # M5='5min', M15='15min', H1='1h', D1='1d'
@@ -25,22 +26,29 @@ def _agg(df: pd.DataFrame, rule: str) -> pd.DataFrame:
     return res[['ts','open','high','low','close','volume','source','market','symbol','exchange']]
 
 
-def resample_df(df: pd.DataFrame, rule: str) -> pd.DataFrame:
+def resample_df(df: pd.DataFrame, rule: str, *, ffill: bool = True) -> pd.DataFrame:
     """Resample minuto M1 OHLCV a otra frecuencia.
 
     - Localiza/convierte ``ts`` a UTC.
     - Ordena por índice y elimina duplicados.
     - Usa ``label='left', closed='left'`` para alinear a la izquierda.
-    - Forward-fill de columnas OHLC para continuidad.
+    - Forward-fill de columnas OHLC para continuidad; con ``ffill=False`` los
+      buckets sin ninguna vela M1 se descartan (como las klines de Binance).
+    - Los campos extendidos de Binance presentes (``quote_volume``, ``trades``,
+      ``taker_buy_*``) se suman por bucket, igual que ``volume``.
     """
     df = df.copy()
     df['ts'] = pd.to_datetime(df['ts'], utc=True)
     df = (df.set_index('ts')
             .sort_index()
             .loc[lambda x: ~x.index.duplicated(keep='last')])
-    res = (df.resample(rule, label='left', closed='left')
-             .agg({'open':'first','high':'max','low':'min','close':'last','volume':'sum'}))
-    res[['open','high','low','close']] = res[['open','high','low','close']].ffill()
+    rs = df.resample(rule, label='left', closed='left')
+    res = rs.agg({'open':'first','high':'max','low':'min','close':'last','volume':'sum'})
+    for c in BINANCE_EXTENDED:
+        if c in df.columns:  # NA (no 0) si el bucket solo tiene filas sin el campo
+            res[c] = rs[c].sum(min_count=1)
+    if ffill:
+        res[['open','high','low','close']] = res[['open','high','low','close']].ffill()
     res = res.dropna(subset=['open','high','low','close']).reset_index()
     return res
 
@@ -52,22 +60,25 @@ def write_month_aggregate(df: pd.DataFrame, symbol: str, tf: str, cfg: LakeConfi
     out: Path | None = None
     for (y,m), chunk in df.groupby(['year','month']):
         dest = _dest_path(cfg, symbol, tf, int(y), int(m))
-        dest.parent.mkdir(parents=True, exist_ok=True)
-        if dest.exists():
-            existing = pq.read_table(dest).to_pandas()
-            merged = (pd.concat([existing, chunk], ignore_index=True)
-                        .drop_duplicates('ts', keep='last')
-                        .sort_values('ts').reset_index(drop=True))
-        else:
-            merged = chunk.sort_values('ts').reset_index(drop=True)
-        table = pa.Table.from_pandas(merged.drop(columns=['year','month'], errors='ignore'), preserve_index=False)
-        tmp = dest.with_suffix('.tmp.parquet'); pq.write_table(table, tmp, compression=LakeConfig().compression); tmp.replace(dest)
+
+        def _merge(existing: pd.DataFrame | None, chunk=chunk) -> pd.DataFrame:
+            if existing is not None:
+                merged = (pd.concat([existing, chunk], ignore_index=True)
+                            .drop_duplicates('ts', keep='last')
+                            .sort_values('ts').reset_index(drop=True))
+            else:
+                merged = chunk.sort_values('ts').reset_index(drop=True)
+            return merged.drop(columns=['year','month'], errors='ignore')
+
+        merge_write(dest, _merge, compression=LakeConfig().compression)
         out = dest
     return out if out else _dest_path(cfg, symbol, tf, int(df['year'].iloc[-1]), int(df['month'].iloc[-1]))
 
 
+@timed("aggregate.symbol", labels=("symbol",))
 def aggregate_symbol(symbol: str, start_utc: str, end_utc: str, timeframes: list[str], loader_func, cfg: LakeConfig) -> dict[str, list[Path]]:
     raw = loader_func(symbol, start_utc, end_utc, cfg)
+    annotate(rows=len(raw))
     if raw.empty:
         return {tf: [] for tf in timeframes}
     out: dict[str, list[Path]] = {}
@@ -81,4 +92,5 @@ def aggregate_symbol(symbol: str, start_utc: str, end_utc: str, timeframes: list
             p = write_month_aggregate(chunk.drop(columns=['year','month']), symbol, tf, cfg)
             paths.append(p)
         out[tf] = paths
+        annotate(files=len(paths))
     return out
@@ -0,0 +1,204 @@
+"""Reparación de gaps IBKR por lotes a partir de un reporte de cobertura.
+
+Flujo:
+
+1. ``gaps_from_coverage``: por cada serie con días incompletos lee solo ``ts``
+   de los meses afectados y obtiene los runs faltantes exactos.
+2. ``plan_requests``: agrupa runs cercanos en el mínimo de requests que caben
+   en una ventana de IB (``max_span``), partiendo los runs demasiado largos.
+3. ``execute_plan``: ejecuta todo sobre una sola conexión (con el governor de
+   pacing) y escribe cada mes afectado una sola vez.
+"""
+from __future__ import annotations
+
+import glob
+import logging
+import os
+from contextlib import ExitStack
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from datalake.read.paths import symbol_base
+from datalake.tools.coverage import TF_MINUTES
+from datalake.tools.gaps import gap_runs
+
+logger = logging.getLogger("ibkr.repair_plan")
+
+# Ventana máxima por request de HMDS por TF (M1: los chunks de 8h del ingest;
+# el resto según la duración máxima que IB acepta para cada bar size)
+MAX_SPAN = {
+    "M1": timedelta(hours=8),
+    "M5": timedelta(days=7),
+    "M15": timedelta(days=14),
+    "M30": timedelta(days=28),
+    "H1": timedelta(days=30),
+    "H4": timedelta(days=180),
+    "D1": timedelta(days=365),
+}
+
+
+@dataclass(frozen=True)
+class RepairRequest:
+    symbol: str
+    timeframe: str
+    start: pd.Timestamp  # primera barra faltante (inclusiva)
+    end: pd.Timestamp    # última barra faltante (inclusiva)
+    runs: Tuple[Tuple[pd.Timestamp, pd.Timestamp], ...]
+
+    @property
+    def step(self) -> pd.Timedelta:
+        return pd.Timedelta(minutes=TF_MINUTES[self.timeframe])
+
+    @property
+    def end_dt(self) -> pd.Timestamp:
+        """``endDateTime`` para IB (cierre de la última barra)."""
+        return self.end + self.step
+
+    @property
+    def duration_seconds(self) -> int:
+        return int((self.end_dt - self.start).total_seconds())
+
+    @property
+    def missing_bars(self) -> int:
+        return sum(int((e - s) / self.step) + 1 for s, e in self.runs)
+
+
+def _read_ts(lake_root: str, market: str, timeframe: str, symbol: str, months: Iterable[Tuple[int, int]]) -> pd.Series:
+    base = symbol_base(lake_root, market, timeframe, symbol)
+    files = []
+    for y, m in sorted(set(months)):
+        files.extend(glob.glob(os.path.join(base, f"year={y:04d}", f"month={m:02d}", "*.parquet")))
+    if not files:
+        return pd.Series([], dtype="datetime64[ns, UTC]")
+    ts = pd.concat((pd.read_parquet(f, columns=["ts"])["ts"] for f in files), ignore_index=True)
+    return pd.to_datetime(ts, utc=True)
+
+
+def gaps_from_coverage(report: pd.DataFrame, lake_root: str) -> pd.DataFrame:
+    """Runs faltantes (``symbol, timeframe, start, end``) de los días incompletos IBKR del reporte."""
+    rep = report[(report["missing_bars"] > 0)]
+    if "source" in rep.columns:
+        rep = rep[rep["source"] == "ibkr"]
+    out: List[pd.DataFrame] = []
+    for (market, tf, symbol), g in rep.groupby(["market", "timeframe", "symbol"]):
+        step = pd.Timedelta(minutes=TF_MINUTES[tf])
+        days = pd.to_datetime(pd.Series(sorted(set(g["date"])))).dt.tz_localize("UTC")
+        ts = _read_ts(lake_root, market, tf, symbol, ((d.year, d.month) for d in days))
+        # bloques de días consecutivos -> un solo cálculo de runs por bloque
+        block = (days.diff() != pd.Timedelta(days=1)).cumsum()
+        for _, blk in days.groupby(block):
+            lo, hi = blk.iloc[0], blk.iloc[-1] + pd.Timedelta(days=1) - step
+            runs = gap_runs(ts[(ts >= lo) & (ts <= hi)], lo, hi, step).to_frame()
+            if len(runs):
+                runs.insert(0, "timeframe", tf)
+                runs.insert(0, "symbol", symbol)
+                out.append(runs)
+    if not out:
+        return pd.DataFrame(columns=["symbol", "timeframe", "start", "end", "bars"])
+    return pd.concat(out, ignore_index=True)
+
+
+def plan_requests(gaps: pd.DataFrame, max_span: Optional[Dict[str, timedelta]] = None) -> List[RepairRequest]:
+    """Agrupa runs en requests de como mucho ``max_span[tf]``.
+
+    Cobertura greedy de izquierda a derecha: cada ventana se llena hasta el
+    límite, lo que da el mínimo de requests para cubrir todos los runs. Cada
+    ventana cubre al menos una barra; un TF sin span conocido es ``ValueError``.
+    """
+    spans = {**MAX_SPAN, **(max_span or {})}
+    plan: List[RepairRequest] = []
+    for (symbol, tf), g in gaps.sort_values("start").groupby(["symbol", "timeframe"], sort=True):
+        if tf not in spans or tf not in TF_MINUTES:
+            raise ValueError(f"TF sin ventana de reparación: {tf}")
+        step = pd.Timedelta(minutes=TF_MINUTES[tf])
+        span = max(pd.Timedelta(spans[tf]), step)  # si no, piece_end < s y el bucle no avanza
+        cur: List[Tuple[pd.Timestamp, pd.Timestamp]] = []
+
+        def _flush():
+            if cur:
+                plan.append(RepairRequest(symbol, tf, cur[0][0], cur[-1][1], tuple(cur)))
+                cur.clear()
+
+        for s, e in zip(g["start"], g["end"]):
+            while s <= e:
+                # llenar la ventana abierta con lo que quepa del run
+                w0 = cur[0][0] if cur else s
+                piece_end = min(e, w0 + span - step)
+                if piece_end < s:
+                    _flush()
+                    continue
+                cur.append((s, piece_end))
+                s = piece_end + step
+                if s <= e:
+                    _flush()
+        _flush()
+    return plan
+
+
+def execute_plan(
+    plan: List[RepairRequest],
+    *,
+    lake_root: str,
+    exchange: str,
+    what_to_show: str,
+    use_rth: bool = False,
+    market: str = "crypto",
+    ib=None,
+) -> List[str]:
+    """Ejecuta ``plan`` sobre una sesión del pool IB y escribe una vez por (símbolo, TF, mes)."""
+    from datalake.config import LakeConfig
+    from datalake.ingestors.ibkr.downloader import bars_to_df, fetch_bars_range
+    from datalake.ingestors.ibkr.writer import write_month
+
+    stack = ExitStack()
+    if ib is None and plan and os.getenv("DATALAKE_SYNTH") != "1":
+        from datalake.ingestors.ibkr.session import shared_pool
+
+        ib = stack.enter_context(shared_pool().session())
+
+    pending: Dict[Tuple[str, str, int, int], List[pd.DataFrame]] = {}
+    try:
+        for i, req in enumerate(plan, 1):
+            bars = fetch_bars_range(
+                symbol=req.symbol,
+                exchange=exchange,
+                end_dt_utc=req.end_dt,
+                duration_seconds=req.duration_seconds,
+                timeframe=req.timeframe,
+                what_to_show=what_to_show,
+                use_rth=use_rth,
+                ib=ib,
+            )
+            df = bars_to_df(bars, exchange=exchange)
+            # solo las barras que faltaban: no se pisan las existentes
+            keep = pd.Series(False, index=df.index)
+            for s, e in req.runs:
+                keep |= (df["ts"] >= s) & (df["ts"] <= e)
+            df = df[keep]
+            logger.info(
+                "repair %d/%d %s %s [%s → %s] faltaban=%d recibidas=%d",
+                i, len(plan), req.symbol, req.timeframe, req.start, req.end, req.missing_bars, len(df),
+            )
+            for (y, m), part in df.groupby([df["ts"].dt.year, df["ts"].dt.month]):
+                pending.setdefault((req.symbol, req.timeframe, int(y), int(m)), []).append(part)
+    finally:
+        stack.close()
+
+    written: List[str] = []
+    for (symbol, tf, _, _), parts in sorted(pending.items()):
+        cfg = LakeConfig()
+        cfg.data_root = lake_root
+        cfg.market = market
+        cfg.timeframe = tf
+        cfg.source = "ibkr"
+        cfg.vendor = "ibkr"
+        cfg.exchange = exchange
+        cfg.what_to_show = what_to_show
+        cfg.tz = "UTC"
+        cfg.logger = logger
+        df = pd.concat(parts, ignore_index=True).sort_values("ts")
+        written.append(write_month(pdf_new=df, symbol=symbol, cfg=cfg))
+    return written
@@ -0,0 +1,297 @@
+"""Backfill histórico desde los dumps públicos de klines de Binance.
+
+Binance publica ZIPs mensuales y diarios con un CSV por archivo y las mismas
+columnas que ``/api/v3/klines`` (https://data.binance.vision):
+
+    data/spot/monthly/klines/BTCUSDT/1m/BTCUSDT-1m-2025-08.zip
+    data/spot/daily/klines/BTCUSDT/1m/BTCUSDT-1m-2025-08-01.zip
+
+Para historia profunda es mucho más barato que paginar la API: no consume
+weight y un mes M1 son ~2 MB comprimidos. Los archivos se obtienen con un
+*fetcher* intercambiable (directorio local o HTTP) y se parsean con el lector
+CSV vectorizado de pandas; cada mes se escribe una sola vez con el writer del
+lake. La API REST queda para la cola reciente (``--rest-tail``).
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import io
+import os
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from datalake.ingestors.binance.ingest_cli import (
+    TF_CHOICES,
+    add_control_cols,
+    range_bounds,
+    warn_incomplete_days,
+    write_by_month,
+)
+from datalake.providers.binance.client import (
+    EXTENDED_FIELDS,
+    INTERVALS,
+    STEP_MINUTES,
+    fetch_klines,
+    http_session,
+    klines_frame,
+)
+from datalake.read.schemas import BINANCE_EXTENDED, cast_extended
+from datalake.utils.symbols.binance_map import to_binance_symbol
+
+ARCHIVE_BASE_URL = 'https://data.binance.vision'
+
+KLINE_COLUMNS = [
+    'openTime','open','high','low','close','volume','closeTime',
+    'qav','numTrades','takerBuyBase','takerBuyQuote','ignore'
+]
+
+# Lo que devuelve un fetcher: ruta a un ZIP, bytes del ZIP o None si no existe.
+ArchiveSource = Union[str, Path, bytes]
+Fetcher = Callable[[str], Optional[ArchiveSource]]
+
+
+def archive_relpath(b_symbol: str, tf: str, year: int, month: int, day: Optional[int] = None) -> str:
+    interval = INTERVALS[tf]
+    if day is None:
+        name = f"{b_symbol}-{interval}-{year:04d}-{month:02d}.zip"
+        period = 'monthly'
+    else:
+        name = f"{b_symbol}-{interval}-{year:04d}-{month:02d}-{day:02d}.zip"
+        period = 'daily'
+    return f"data/spot/{period}/klines/{b_symbol}/{interval}/{name}"
+
+
+class LocalArchiveFetcher:
+    """Busca los ZIP en un directorio local, con el layout de data.binance.vision o plano."""
+
+    def __init__(self, root: Union[str, Path]) -> None:
+        self.root = Path(root)
+
+    def __call__(self, relpath: str) -> Optional[Path]:
+        for cand in (self.root / relpath, self.root / Path(relpath).name):
+            if cand.exists():
+                return cand
+        return None
+
+
+class HttpArchiveFetcher:
+    """Descarga los ZIP por HTTP (streaming a disco) verificando el ``.CHECKSUM`` publicado."""
+
+    def __init__(
+        self,
+        base_url: str = ARCHIVE_BASE_URL,
+        cache_dir: Optional[Union[str, Path]] = None,
+        verify_checksum: bool = True,
+        timeout: int = 60,
+    ) -> None:
+        self.base_url = base_url.rstrip('/')
+        self.cache_dir = Path(cache_dir) if cache_dir else Path(tempfile.gettempdir()) / 'binance_archive'
+        self.verify_checksum = verify_checksum
+        self.timeout = timeout
+
+    def __call__(self, relpath: str) -> Optional[Path]:
+        dest = self.cache_dir / relpath
+        if dest.exists():
+            return dest
+        url = f"{self.base_url}/{relpath}"
+        with http_session().get(url, stream=True, timeout=self.timeout) as r:
+            if r.status_code == 404:
+                return None
+            r.raise_for_status()
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            tmp = dest.with_suffix('.part')
+            digest = hashlib.sha256()
+            with open(tmp, 'wb') as fh:
+                for chunk in r.iter_content(chunk_size=1 << 20):
+                    fh.write(chunk)
+                    digest.update(chunk)
+        if self.verify_checksum:
+            chk = http_session().get(f"{url}.CHECKSUM", timeout=self.timeout)
+            if chk.status_code == 200:
+                expected = chk.text.split()[0].strip().lower()
+                if expected != digest.hexdigest():
+                    tmp.unlink(missing_ok=True)
+                    raise ValueError(f"Checksum inválido para {relpath}")
+        tmp.replace(dest)
+        return dest
+
+
+def empty_klines() -> pd.DataFrame:
+    """Resultado vacío con las mismas columnas y dtypes que un mes con datos (y que la API)."""
+    return klines_frame([], 0, 0)
+
+
+def read_kline_archive(src: ArchiveSource) -> pd.DataFrame:
+    """Parsea un ZIP de klines a ``ts`` + OHLCV + campos extendidos (``ts`` = openTime UTC).
+
+    Soporta CSV con o sin cabecera y timestamps en ms o µs (Binance pasó a µs
+    en los dumps spot desde 2025).
+    """
+    zsrc = io.BytesIO(src) if isinstance(src, bytes) else src
+    with zipfile.ZipFile(zsrc) as zf:
+        member = next(n for n in zf.namelist() if n.endswith('.csv'))
+        with zf.open(member) as fh:
+            first = fh.peek(64)[:1] if hasattr(fh, 'peek') else b''
+            has_header = bool(first) and not first.isdigit()
+            df = pd.read_csv(
+                fh,
+                header=0 if has_header else None,
+                names=KLINE_COLUMNS,
+                usecols=[*range(6), *range(7, 11)],
+                dtype={'openTime': 'int64', 'open': 'float64', 'high': 'float64',
+                       'low': 'float64', 'close': 'float64', 'volume': 'float64',
+                       'qav': 'float64', 'numTrades': 'int64', 'takerBuyBase': 'float64',
+                       'takerBuyQuote': 'float64'},
+                engine='c',
+            )
+    if df.empty:
+        return empty_klines()
+    open_time = df['openTime'].to_numpy()
+    unit = 'us' if open_time.max() > 10**14 else 'ms'
+    df['ts'] = pd.to_datetime(open_time, unit=unit, utc=True)
+    df = df.rename(columns=EXTENDED_FIELDS)
+    return cast_extended(df[['ts','open','high','low','close','volume', *BINANCE_EXTENDED]])
+
+
+def _months(d0: date, d1: date) -> List[Tuple[int, int]]:
+    out, y, m = [], d0.year, d0.month
+    while (y, m) <= (d1.year, d1.month):
+        out.append((y, m))
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return out
+
+
+def load_archives(
+    b_symbol: str,
+    tf: str,
+    year: int,
+    month: int,
+    fetcher: Fetcher,
+    *,
+    days: Optional[List[date]] = None,
+) -> pd.DataFrame:
+    """Carga el ZIP mensual; si aún no está publicado, cae a los ZIP diarios de ``days``."""
+    src = fetcher(archive_relpath(b_symbol, tf, year, month))
+    if src is not None:
+        return read_kline_archive(src)
+    frames = []
+    for d in days or []:
+        src = fetcher(archive_relpath(b_symbol, tf, d.year, d.month, d.day))
+        if src is not None:
+            frames.append(read_kline_archive(src))
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return empty_klines()
+    return pd.concat(frames, ignore_index=True)
+
+
+def backfill(
+    symbol: str,
+    tf: str,
+    date_from: str,
+    date_to: str,
+    fetcher: Fetcher,
+    *,
+    region: str = 'global',
+    rest_tail: bool = False,
+    root: Optional[str] = None,
+) -> List[str]:
+    """Backfill de ``symbol`` desde archivos; un write por mes. Devuelve rutas escritas.
+
+    Con ``rest_tail`` la API REST completa la cola aún no publicada y los
+    meses intermedios sin archivo; sin él esos meses se reportan como huecos.
+    Los archivos de data.binance.vision son solo de binance.com, así que el
+    backfill (archivo + REST) es siempre de un único venue: ``region='global'``.
+    """
+    if region != 'global':
+        raise ValueError("los archivos de data.binance.vision son de binance.com: "
+                         "el backfill por archivos solo admite region='global' (Binance.US: ingest_cli)")
+    b_sym = to_binance_symbol(symbol)
+    start, end = range_bounds(date_from, date_to)
+    d0, d1 = start.date(), end.date()
+    written: List[str] = []
+    last_ts: Optional[pd.Timestamp] = None
+    missing: List[Tuple[date, date]] = []
+    for year, month in _months(d0, d1):
+        m0 = max(d0, date(year, month, 1))
+        m1 = min(d1, (date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1)))
+        days = [m0 + timedelta(days=i) for i in range((m1 - m0).days + 1)]
+        df = load_archives(b_sym, tf, year, month, fetcher, days=days)
+        if df.empty:
+            print(f"[ARCHIVE] sin archivo {b_sym} {tf} {year}-{month:02d}")
+            missing.append((m0, m1))
+            continue
+        df = df[(df['ts'] >= start) & (df['ts'] <= end)]
+        df = df.drop_duplicates(subset=['ts']).sort_values('ts')
+        written.extend(write_by_month(add_control_cols(df, symbol, tf, region), root=root))
+        if not df.empty:
+            last_ts = df['ts'].iloc[-1]
+        print(f"[ARCHIVE] {symbol} {tf} {year}-{month:02d}: filas={len(df)}")
+
+    step = timedelta(minutes=STEP_MINUTES[tf])
+    tail_start = start if last_ts is None else (last_ts.to_pydatetime() + step)
+    # meses sin archivo antes del último ts archivado: la cola no los cubre
+    holes = [(m0, m1) for m0, m1 in missing if range_bounds(m1.isoformat(), m1.isoformat())[1] < tail_start]
+    if not rest_tail:
+        if holes:
+            print(f"[ARCHIVE] {symbol} {tf} meses sin archivo (huecos; usar --rest-tail): "
+                  + ", ".join(f"{m0:%Y-%m}" for m0, _ in holes))
+        return sorted(set(written))
+
+    for m0, m1 in holes:
+        h0, h1 = range_bounds(m0.isoformat(), m1.isoformat())
+        hole = add_control_cols(fetch_klines(b_sym, h0, h1, tf=tf, region=region), symbol, tf, region)
+        written.extend(write_by_month(hole, root=root))
+        print(f"[REST] {symbol} {tf} mes sin archivo {m0:%Y-%m}: filas={len(hole)}")
+    # Cola reciente aún no publicada en archivos -> API REST
+    if tail_start <= end:
+        tail = fetch_klines(b_sym, tail_start, end, tf=tf, region=region)
+        tail = add_control_cols(tail, symbol, tf, region)
+        written.extend(write_by_month(tail, root=root))
+        print(f"[REST] {symbol} {tf} cola {tail_start.isoformat()}→{end.isoformat()}: filas={len(tail)}")
+    return sorted(set(written))
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description='Backfill Binance desde archivos públicos de klines (source=binance)')
+    p.add_argument('--symbols', required=True, help='Lista separada por comas, e.g. BTC-USD,ETH-USD')
+    p.add_argument('--from', dest='date_from', required=True, help='YYYY-MM-DD (UTC)')
+    p.add_argument('--to', dest='date_to', required=True, help='YYYY-MM-DD (UTC)')
+    p.add_argument('--tf', choices=TF_CHOICES, default='M1')
+    src = p.add_mutually_exclusive_group()
+    src.add_argument('--archive-dir', help='Directorio local con los ZIP (layout data.binance.vision o plano)')
+    src.add_argument('--base-url', default=ARCHIVE_BASE_URL, help='Host de descarga de archivos')
+    p.add_argument('--cache-dir', default=None, help='Caché local de ZIP descargados')
+    p.add_argument('--rest-tail', action='store_true',
+                   help='Completar con la API REST lo no publicado aún y los meses sin archivo')
+    p.add_argument('--binance-region', choices=['global','us'], default=os.getenv('BINANCE_REGION','global'),
+                   help='Solo global: los archivos son de binance.com (para Binance.US usar ingest_cli)')
+    args = p.parse_args()
+    if args.binance_region != 'global':
+        p.error('--binance-region us no aplica: data.binance.vision solo publica datos de binance.com')
+
+    if args.archive_dir:
+        fetcher: Fetcher = LocalArchiveFetcher(args.archive_dir)
+    else:
+        fetcher = HttpArchiveFetcher(args.base_url, cache_dir=args.cache_dir)
+
+    for sym in [s.strip() for s in args.symbols.split(',') if s.strip()]:
+        paths = backfill(sym, args.tf, args.date_from, args.date_to, fetcher,
+                         region=args.binance_region, rest_tail=args.rest_tail)
+        for path in paths:
+            print(f"OK {sym} {args.tf} → {path}")
+        if paths:
+            df = pd.concat((pd.read_parquet(p_, columns=['ts']) for p_ in paths), ignore_index=True)
+            df = df[(df['ts'] >= pd.Timestamp(args.date_from, tz='UTC'))
+                    & (df['ts'] < pd.Timestamp(args.date_to, tz='UTC') + pd.Timedelta(days=1))]
+            warn_incomplete_days(df, sym, args.tf, args.date_from, args.date_to)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,19 +1,24 @@
 from __future__ import annotations
 import os
 import argparse
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
 import pandas as pd
-import pyarrow as pa
-import pyarrow.parquet as pq
 
-from datalake.providers.binance.client import fetch_klines
+from datalake.aggregates.aggregate import resample_df
+from datalake.providers.binance.client import fetch_klines, plan_pages
+from datalake.read.schemas import BINANCE_EXTENDED, cast_extended, extended_dtypes
+from datalake.utils.journal import PARTIAL, open_journal
 from datalake.utils.symbols.binance_map import to_binance_symbol
+from datalake.write.partition import merge_write
 
 UTC = timezone.utc
 
 TF_CHOICES = ['M1','M5','M15','M30']
 
+# TFs que son agregación exacta de M1 (openTime alineado a la izquierda)
+DERIVED_RULES = {'M5': '5min', 'M15': '15min', 'M30': '30min'}
+
 def _dt_utc(d: str, h: int, m: int, s: int = 0) -> datetime:
     y, mo, da = map(int, d.split('-'))
     return datetime(y, mo, da, h, m, s, tzinfo=UTC)
@@ -34,7 +39,8 @@ def _expect_rows(tf: str) -> int:
         'M30': 48,
     }[tf]
 
-def _add_control_cols(df: pd.DataFrame, symbol_logico: str, tf: str, region: str) -> pd.DataFrame:
+def add_control_cols(df: pd.DataFrame, symbol_logico: str, tf: str, region: str) -> pd.DataFrame:
+    """Columnas de control del lake (symbol, tf, source y exchange según ``region``)."""
     if df is None or df.empty:
         return df
     df = df.copy()
@@ -62,54 +68,253 @@ def write_merge_dedupe(df: pd.DataFrame, *, root: str | None = None) -> str:
         / f"year={year}"
         / f"month={month:02d}"
     )
-    base.mkdir(parents=True, exist_ok=True)
     dest_file = base / f"part-{year}-{month:02d}.parquet"
-    existing = pd.DataFrame()
-    if dest_file.exists():
-        try:
-            existing = pq.read_table(dest_file).to_pandas()
-        except Exception:
-            existing = pd.read_parquet(dest_file)
-    merged = pd.concat([existing, df], ignore_index=True)
-    merged['ts'] = pd.to_datetime(merged['ts'], utc=True)
-    merged = merged.drop_duplicates(
-        subset=['symbol', 'tf', 'ts', 'source'], keep='last'
-    ).sort_values('ts')
-    table = pa.Table.from_pandas(merged, preserve_index=False)
-    pq.write_table(table, dest_file, compression="zstd", version="2.6", use_dictionary=False)
+
+    def _merge(existing: pd.DataFrame | None) -> pd.DataFrame:
+        merged = pd.concat([existing, df], ignore_index=True) if existing is not None else df.copy()
+        merged['ts'] = pd.to_datetime(merged['ts'], utc=True)
+        cast_extended(merged)  # concat con filas antiguas sin campos extendidos → NA tipados
+        return merged.drop_duplicates(
+            subset=['symbol', 'tf', 'ts', 'source'], keep='last'
+        ).sort_values('ts')
+
+    # lock por partición + temporal/os.replace (ver datalake.write.partition)
+    merge_write(dest_file, _merge, compression="zstd", version="2.6", use_dictionary=False)
     return str(dest_file)
 
-def ingest(args: argparse.Namespace) -> None:
+def range_bounds(date_from: str, date_to: str) -> tuple[datetime, datetime]:
+    """[from 00:00, to 23:59] UTC; openTime <= 23:59 cubre la última vela de cualquier TF."""
+    return _dt_utc(date_from, 0, 0, 0), _dt_utc(date_to, 23, 59, 0)
+
+def write_by_month(df: pd.DataFrame, *, root: str | None = None) -> list[str]:
+    """Escribe ``df`` agrupando por (año, mes): un merge/dedupe por partición."""
+    if df is None or df.empty:
+        return []
+    keys = [df['ts'].dt.year, df['ts'].dt.month]
+    return [write_merge_dedupe(chunk, root=root) for _, chunk in df.groupby(keys, sort=True)]
+
+def warn_incomplete_days(df: pd.DataFrame, sym: str, tf: str, date_from: str, date_to: str) -> None:
+    """Avisa por consola de los días de [date_from, date_to] con menos velas de las esperadas."""
+    exp = _expect_rows(tf)
+    days = list(_days_iter(date_from, date_to))
+    if df is None or df.empty:
+        counts = pd.Series(0, index=days)
+        by_day = {}
+    else:
+        day_key = df['ts'].dt.strftime('%Y-%m-%d')
+        by_day = {d: g for d, g in df.groupby(day_key)}
+        counts = day_key.value_counts().reindex(days, fill_value=0)
+    for day, rows in counts.items():
+        if rows != exp:
+            g = by_day.get(day)
+            # Log claro de cobertura y primeras/últimas marcas
+            first_ts = None if g is None else g['ts'].min()
+            last_ts = None if g is None else g['ts'].max()
+            print(f"[WARN] {sym} {day} tf={tf}: filas={rows} (esperado={exp}) range={first_ts}→{last_ts}")
+
+def _resume_start(prev: dict | None, day: str, tf: str) -> datetime:
+    """Inicio del día ``day``; si el journal lo dejó parcial solo por la cola
+    (filas contiguas desde 00:00 hasta ``last_ts``) se retoma tras ``last_ts``."""
+    start = _dt_utc(day, 0, 0, 0)
+    if not prev or prev.get('status') != PARTIAL or not prev.get('last_ts'):
+        return start
+    step = timedelta(minutes=1440 // _expect_rows(tf))
+    last = pd.Timestamp(prev['last_ts']).to_pydatetime()
+    if int((last - start) / step) + 1 == int(prev.get('rows', 0)):
+        return last + step
+    return start
+
+def _contiguous_runs(days: list[str]) -> list[list[str]]:
+    """Agrupa ``days`` (ISO, ordenados) en tramos de días consecutivos."""
+    runs: list[list[str]] = []
+    for d in days:
+        if runs and date.fromisoformat(d) - date.fromisoformat(runs[-1][-1]) == timedelta(days=1):
+            runs[-1].append(d)
+        else:
+            runs.append([d])
+    return runs
+
+def _read_lake_days(root: str, sym: str, tf: str, days: list[str], columns: list[str] | None = None) -> pd.DataFrame:
+    """Filas de ``days`` ya escritas en el lake (solo los meses tocados)."""
+    base = Path(root) / "data" / "source=binance" / "market=crypto" / f"timeframe={tf}" / f"symbol={sym}"
+    months = sorted({(int(d[:4]), int(d[5:7])) for d in days})
+    files = [base / f"year={y}" / f"month={m:02d}" / f"part-{y}-{m:02d}.parquet" for y, m in months]
+    parts = [pd.read_parquet(f, columns=columns) for f in files if f.exists()]
+    if not parts:
+        return pd.DataFrame(columns=columns or ['ts'])
+    df = pd.concat(parts, ignore_index=True)
+    df['ts'] = pd.to_datetime(df['ts'], utc=True)
+    lo, hi = range_bounds(min(days), max(days))
+    return df[(df['ts'] >= lo) & (df['ts'] <= hi)].reset_index(drop=True)
+
+def _journal_written(journal, root: str, sym: str, tf: str, days: list[str], requests: int) -> None:
+    """Registra en el journal lo que quedó en disco para ``days`` (lee solo ``ts``)."""
+    df = _read_lake_days(root, sym, tf, days, columns=['ts'])
+    journal.record_frame('binance', sym, tf, df, days, expected=_expect_rows(tf), requests=requests)
+
+def derive_from_m1(
+    sym: str,
+    tfs: list[str],
+    date_from: str,
+    date_to: str,
+    region: str,
+    *,
+    journal=None,
+    resume: bool = True,
+    root: str | None = None,
+) -> list[str]:
+    """Construye M5/M15/M30 de ``source=binance`` a partir del M1 del lake, sin API.
+
+    Una kline de N minutos de Binance es la agregación exacta de sus N klines
+    de 1m (open primero, high máx, low mín, close último, volumen suma), así
+    que se usa ``resample_df`` alineado a la izquierda y sin ffill: un bucket
+    sin velas M1 tampoco existe en la API."""
+    root = root or os.getenv("LAKE_ROOT", os.getcwd())
+    all_days = list(_days_iter(date_from, date_to))
+    todo = {}
+    for tf in tfs:
+        if tf not in DERIVED_RULES:
+            raise ValueError(f"TF no derivable desde M1: {tf}")
+        days = journal.pending('binance', sym, tf, all_days) if journal is not None and resume else all_days
+        if days:
+            todo[tf] = days
+    if not todo:
+        return []
+    need = sorted({d for days in todo.values() for d in days})
+    m1 = _read_lake_days(root, sym, 'M1', need)
+    written: list[str] = []
+    for tf, days in todo.items():
+        out = cast_extended(resample_df(m1, DERIVED_RULES[tf], ffill=False)) if not m1.empty else m1
+        out = add_control_cols(out, sym, tf, region)
+        written.extend(write_by_month(out, root=root))
+        if journal is not None:
+            _journal_written(journal, root, sym, tf, days, 0)
+        print(f"[DERIVE] {sym} {tf} {days[0]}→{days[-1]} filas={0 if out is None else len(out)} (desde M1, 0 requests)")
+    return written
+
+def verify_derived(sym: str, tf: str, day: str, region: str, *, root: str | None = None) -> dict:
+    """Compara las velas derivadas de ``day`` con las de la API (1 página por día)."""
+    root = root or os.getenv("LAKE_ROOT", os.getcwd())
+    start, end = range_bounds(day, day)
+    api = fetch_klines(symbol=to_binance_symbol(sym), start_dt=start, end_dt=end, tf=tf, region=region)
+    local = _read_lake_days(root, sym, tf, [day])
+    cols = ['open', 'high', 'low', 'close', 'volume']
+    cols += [c for c in BINANCE_EXTENDED if c in api.columns and c in local.columns]
+    both = api.merge(local, on='ts', how='outer', suffixes=('_api', '_local'), indicator=True)
+    matched = both[both['_merge'] == 'both']
+    diff = pd.Series(False, index=matched.index)
+    for c in cols:
+        a, b = matched[f'{c}_api'].astype(float), matched[f'{c}_local'].astype(float)
+        tol = 1e-6 if c in BINANCE_EXTENDED and extended_dtypes()[c] == 'float32' else 1e-9
+        diff |= (a - b).abs() > tol * b.abs().clip(lower=1.0)
+    return {
+        'symbol': sym, 'tf': tf, 'day': day,
+        'api_rows': len(api), 'local_rows': len(local),
+        'only_api': int((both['_merge'] == 'left_only').sum()),
+        'only_local': int((both['_merge'] == 'right_only').sum()),
+        'mismatched': int(diff.sum()),
+    }
+
+def ingest_symbol(
+    sym: str,
+    tf: str,
+    date_from: str,
+    date_to: str,
+    region: str,
+    *,
+    journal=None,
+    resume: bool = True,
+    root: str | None = None,
+    derive: list[str] | tuple = (),
+) -> tuple[list[str], int]:
+    """Ingesta de un símbolo/TF en [date_from, date_to] (días UTC).
+
+    Devuelve ``(paths escritos, velas descargadas)``. Es seguro llamarla en
+    paralelo para (símbolo, TF, mes) distintos: el budget de weight es el
+    governor compartido de la región y cada partición se escribe con lock.
+    Con ``tf='M1'`` y ``derive`` (p. ej. ``['M5','M15','M30']``) esas TFs se
+    construyen localmente del M1 en vez de descargarse."""
+    root = root or os.getenv("LAKE_ROOT", os.getcwd())
+    if derive and tf != 'M1':
+        raise ValueError("derive solo aplica a la ingesta M1")
+    paths, rows = _fetch_and_write(sym, tf, date_from, date_to, region, journal=journal, resume=resume, root=root)
+    if derive:
+        paths += derive_from_m1(sym, list(derive), date_from, date_to, region,
+                                journal=journal, resume=resume, root=root)
+    return paths, rows
+
+def _fetch_and_write(
+    sym: str,
+    tf: str,
+    date_from: str,
+    date_to: str,
+    region: str,
+    *,
+    journal,
+    resume: bool,
+    root: str,
+) -> tuple[list[str], int]:
+    b_sym = to_binance_symbol(sym)
+    all_days = list(_days_iter(date_from, date_to))
+    runs = [all_days]
+    if journal is not None and resume:
+        days = journal.pending('binance', sym, tf, all_days)
+        if not days:
+            print(f"[SKIP] {sym} {tf} {date_from}→{date_to} completo según journal")
+            return [], 0
+        # los días done del medio no se vuelven a bajar: un fetch por tramo contiguo
+        runs = _contiguous_runs(days)
+    paths: list[str] = []
+    rows = 0
+    for run in runs:
+        start, end = range_bounds(run[0], run[-1])
+        if journal is not None and resume:
+            prev = journal.get('binance', sym, tf, run[0])
+            start = _resume_start(prev, run[0], tf)
+            if run != all_days or prev:
+                print(f"[RESUME] {sym} {tf} desde {start.isoformat()} ({len(run)} días pendientes)")
+
+        # Llamada ya paginada (páginas llenas sobre todo el tramo)
+        df = fetch_klines(
+            symbol=b_sym,
+            start_dt=start,
+            end_dt=end,
+            tf=tf,
+            region=region
+        )
+
+        df = add_control_cols(df, sym, tf, region)
+        paths += write_by_month(df, root=root)
+        if journal is not None:
+            # requests propios de la unidad (el governor es compartido entre hilos)
+            _journal_written(journal, root, sym, tf, run, len(plan_pages(start, end, tf)))
+
+        # Validación por día
+        warn_incomplete_days(df, sym, tf, run[0], run[-1])
+        rows += 0 if df is None else len(df)
+    return list(dict.fromkeys(paths)), rows
+
+def ingest(args: argparse.Namespace) -> list[str]:
+    """Ingesta por rango: un plan de páginas de 1000 velas para todo --from/--to
+    (cruzando días) y una escritura por mes tocado.
+
+    Con ``args.journal`` se registra el estado de cada día y, salvo
+    ``args.no_resume``, se saltan los días ``done`` y se retoma desde el primer
+    día pendiente."""
     symbols = [s.strip() for s in args.symbols.split(',') if s.strip()]
+    root = os.getenv("LAKE_ROOT", os.getcwd())
+    journal = open_journal(getattr(args, 'journal', None), root)
+    # --derive-from-m1: se baja M1 y la TF pedida se agrega localmente
+    derive = getattr(args, 'derive_from_m1', False) and args.tf in DERIVED_RULES
+    written: list[str] = []
     for sym in symbols:
-        b_sym = to_binance_symbol(sym)
-        for day in _days_iter(args.date_from, args.date_to):
-            start = _dt_utc(day, 0, 0, 0)
-            end   = _dt_utc(day, 23, 59, 0)
-
-            # Llamada ya paginada
-            df = fetch_klines(
-                symbol=b_sym,
-                start_dt=start,
-                end_dt=end,
-                tf=args.tf,
-                region=args.binance_region
-            )
-
-            df = _add_control_cols(df, sym, args.tf, args.binance_region)
-
-            if df is not None and not df.empty:
-                write_merge_dedupe(df)
-
-            # Validación
-            exp = _expect_rows(args.tf)
-            if exp is not None:
-                rows = 0 if df is None else len(df)
-                if rows != exp:
-                    # Log claro de cobertura y primeras/últimas marcas
-                    first_ts = None if (df is None or df.empty) else df['ts'].min()
-                    last_ts  = None if (df is None or df.empty) else df['ts'].max()
-                    print(f"[WARN] {sym} {day} tf={args.tf}: filas={rows} (esperado={exp}) range={first_ts}→{last_ts}")
+        paths, _ = ingest_symbol(
+            sym, 'M1' if derive else args.tf, args.date_from, args.date_to, args.binance_region,
+            journal=journal, resume=not getattr(args, 'no_resume', False), root=root,
+            derive=[args.tf] if derive else (),
+        )
+        written.extend(paths)
+    return written
 
 def main() -> int:
     p = argparse.ArgumentParser(description='Ingesta Binance (source=binance) — Phase-4')
@@ -118,6 +323,12 @@ def main() -> int:
     p.add_argument('--to', dest='date_to', required=True, help='YYYY-MM-DD (UTC)')
     p.add_argument('--tf', choices=TF_CHOICES, default='M1')
     p.add_argument('--binance-region', choices=['global','us'], default=os.getenv('BINANCE_REGION','global'))
+    p.add_argument('--journal', default=os.getenv('DATALAKE_JOURNAL', 'auto'),
+                   help='Journal de días procesados; auto = <lake>/.state/jobs.jsonl, off = sin journal')
+    p.add_argument('--no-resume', dest='no_resume', action='store_true',
+                   help='Ignorar el journal al decidir qué bajar (se sigue registrando)')
+    p.add_argument('--derive-from-m1', action='store_true',
+                   help='Para M5/M15/M30: bajar solo M1 y agregar localmente')
     args = p.parse_args()
     ingest(args)
     return 0
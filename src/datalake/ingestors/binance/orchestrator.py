@@ -0,0 +1,185 @@
+"""Orquestador de llenado Binance por (símbolo, TF, mes).
+
+Cada unidad de trabajo es un ``ingest_symbol`` sobre un mes completo. Las
+unidades se reparten en un pool acotado de hilos que comparten el governor de
+la región (un solo budget de weight/min para todo el proceso), así que subir
+``workers`` solo aprovecha mejor el budget: nunca lo excede. Las unidades más
+caras (más páginas) se lanzan primero para que el pool no termine esperando a
+un M1 rezagado.
+"""
+from __future__ import annotations
+
+import calendar
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from datalake.ingestors.binance.ingest_cli import DERIVED_RULES, range_bounds, ingest_symbol
+from datalake.providers.binance.client import KLINES_WEIGHT, plan_pages, weight_budget
+
+
+@dataclass(frozen=True)
+class WorkUnit:
+    symbol: str
+    tf: str
+    year: int
+    month: int
+    derive: Tuple[str, ...] = ()  # TFs agregadas localmente desde este M1
+
+    @property
+    def date_from(self) -> str:
+        return date(self.year, self.month, 1).isoformat()
+
+    @property
+    def date_to(self) -> str:
+        return date(self.year, self.month, calendar.monthrange(self.year, self.month)[1]).isoformat()
+
+    @property
+    def planned_requests(self) -> int:
+        return len(plan_pages(*range_bounds(self.date_from, self.date_to), self.tf))
+
+    def __str__(self) -> str:
+        extra = f"(+{','.join(self.derive)})" if self.derive else ""
+        return f"{self.symbol} {self.tf}{extra} {self.year:04d}-{self.month:02d}"
+
+
+@dataclass
+class UnitResult:
+    unit: WorkUnit
+    rows: int = 0
+    paths: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class FillReport:
+    results: List[UnitResult]
+    elapsed_s: float
+    requests: int
+    target_weight_per_min: float
+    limit_weight_per_min: float
+
+    @property
+    def rows(self) -> int:
+        return sum(r.rows for r in self.results)
+
+    @property
+    def failed(self) -> List[UnitResult]:
+        return [r for r in self.results if r.error]
+
+    @property
+    def requests_per_min(self) -> float:
+        return self.requests / (self.elapsed_s / 60) if self.elapsed_s > 0 else 0.0
+
+    @property
+    def weight_per_min(self) -> float:
+        return self.requests_per_min * KLINES_WEIGHT
+
+    @property
+    def bars_per_sec(self) -> float:
+        return self.rows / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "units": len(self.results),
+            "failed": len(self.failed),
+            "rows": self.rows,
+            "requests": self.requests,
+            "elapsed_s": round(self.elapsed_s, 3),
+            "requests_per_min": round(self.requests_per_min, 1),
+            "weight_per_min": round(self.weight_per_min, 1),
+            "target_weight_per_min": self.target_weight_per_min,
+            "budget_use": round(self.weight_per_min / self.target_weight_per_min, 3) if self.target_weight_per_min else 0.0,
+            "bars_per_sec": round(self.bars_per_sec, 1),
+        }
+
+
+def month_range(month_from: str, month_to: Optional[str] = None) -> List[Tuple[int, int]]:
+    """``'YYYY-MM'`` → lista de (año, mes) inclusiva."""
+    y0, m0 = map(int, month_from.split("-"))
+    y1, m1 = map(int, (month_to or month_from).split("-"))
+    if not (1 <= m0 <= 12 and 1 <= m1 <= 12) or (y1, m1) < (y0, m0):
+        raise ValueError(f"rango de meses inválido: {month_from}→{month_to}")
+    out = []
+    y, m = y0, m0
+    while (y, m) <= (y1, m1):
+        out.append((y, m))
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return out
+
+
+def plan_units(
+    symbols: Iterable[str],
+    tfs: Iterable[str],
+    month_from: str,
+    month_to: Optional[str] = None,
+    *,
+    derive: bool = False,
+) -> List[WorkUnit]:
+    """Todas las unidades (símbolo, TF, mes), las de más páginas primero.
+
+    Con ``derive`` las TFs de ``DERIVED_RULES`` no se descargan: viajan en la
+    unidad M1 del mismo símbolo/mes y se agregan localmente tras escribirla.
+    """
+    tfs = list(tfs)
+    derived: Tuple[str, ...] = ()
+    if derive:
+        derived = tuple(tf for tf in tfs if tf in DERIVED_RULES)
+        tfs = [tf for tf in tfs if tf not in DERIVED_RULES]
+        if derived and "M1" not in tfs:
+            tfs.insert(0, "M1")
+    units = [
+        WorkUnit(sym, tf, y, m, derived if tf == "M1" else ())
+        for sym in symbols
+        for tf in tfs
+        for y, m in month_range(month_from, month_to)
+    ]
+    return sorted(units, key=lambda u: -u.planned_requests)
+
+
+def run_units(
+    units: List[WorkUnit],
+    *,
+    region: str = "global",
+    workers: int = 4,
+    journal=None,
+    resume: bool = True,
+    root: Optional[str] = None,
+    progress: Optional[Callable[[UnitResult], None]] = None,
+) -> FillReport:
+    """Ejecuta ``units`` en un pool de ``workers`` hilos con el budget compartido de ``region``."""
+
+    def _one(unit: WorkUnit) -> UnitResult:
+        res = UnitResult(unit)
+        t0 = time.perf_counter()
+        try:
+            res.paths, res.rows = ingest_symbol(
+                unit.symbol, unit.tf, unit.date_from, unit.date_to, region,
+                journal=journal, resume=resume, root=root, derive=list(unit.derive),
+            )
+        except Exception as e:  # una unidad fallida no tumba el resto
+            res.error = f"{type(e).__name__}: {e}"
+        res.seconds = time.perf_counter() - t0
+        return res
+
+    b0 = weight_budget(region)
+    t0 = time.perf_counter()
+    results: List[UnitResult] = []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="fill") as pool:
+        futures = [pool.submit(_one, u) for u in units]
+        for fut in as_completed(futures):
+            res = fut.result()
+            results.append(res)
+            if progress is not None:
+                progress(res)
+    b1 = weight_budget(region)
+    return FillReport(
+        results=results,
+        elapsed_s=time.perf_counter() - t0,
+        requests=int(b1["requests"] - b0["requests"]),
+        target_weight_per_min=float(b1["target"]),
+        limit_weight_per_min=float(b1["limit"]),
+    )
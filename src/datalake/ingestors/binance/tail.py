@@ -0,0 +1,275 @@
+"""Actualizador continuo (tail) del lake Binance.
+
+Mantiene las particiones ``source=binance`` al día hasta la última vela
+*cerrada* de cada símbolo:
+
+- Al arrancar toma el último ``ts`` escrito en el lake por símbolo (solo lee la
+  columna ``ts`` del mes más reciente); si no hay nada, arranca ``lookback``
+  minutos atrás.
+- En cada ciclo (alineado al cierre de vela + ``settle_s``) pide a la API solo
+  lo que falta entre ese ``ts`` y la última vela cerrada: normalmente 1 página
+  por símbolo. Los símbolos se piden en paralelo bajo el governor compartido
+  de la región.
+- Las velas nuevas se acumulan en memoria y se escriben por lotes: un
+  merge por (símbolo, mes) cada ``flush_s`` segundos o al superar
+  ``max_pending`` filas, en lugar de reescribir el parquet mensual en cada
+  minuto. Un corte pierde como mucho lo no escrito, que se vuelve a pedir al
+  arrancar (el lake es la fuente de verdad del cursor).
+- ``metrics()`` expone por símbolo el lag (segundos desde el cierre de la
+  última vela persistida), filas pendientes y errores; el daemon lo publica
+  en ``<lake>/.state/tail/metrics.json`` en cada ciclo.
+
+Uso::
+
+    python -m datalake.ingestors.binance.tail --symbols BTC-USD,ETH-USD --tf M1
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from datalake.ingestors.binance.ingest_cli import TF_CHOICES, add_control_cols, write_by_month
+from datalake.providers.binance.client import STEP_MINUTES, fetch_klines
+from datalake.utils.symbols.binance_map import to_binance_symbol
+
+logger = logging.getLogger("datalake.binance.tail")
+
+UTC = timezone.utc
+
+DEFAULT_FLUSH_S = float(os.getenv("BINANCE_TAIL_FLUSH_S", "300"))
+DEFAULT_MAX_PENDING = int(os.getenv("BINANCE_TAIL_MAX_PENDING", "5000"))
+
+
+@dataclass
+class TailState:
+    symbol: str
+    last_ts: Optional[datetime] = None      # openTime de la última vela conocida (escrita o pendiente)
+    written_ts: Optional[datetime] = None   # openTime de la última vela ya en el lake
+    pending_rows: int = 0
+    rows_written: int = 0
+    polls: int = 0
+    errors: int = 0
+    last_error: Optional[str] = None
+    lag_s: Optional[float] = None
+
+
+def last_lake_ts(root: str, symbol: str, tf: str) -> Optional[datetime]:
+    """Último ``ts`` escrito para ``symbol``/``tf`` (lee solo ``ts`` del mes más reciente)."""
+    base = Path(root) / "data" / "source=binance" / "market=crypto" / f"timeframe={tf}" / f"symbol={symbol}"
+    for part in sorted(base.glob("year=*/month=*/part-*.parquet"), reverse=True):
+        ts = pd.read_parquet(part, columns=["ts"])["ts"]
+        if not ts.empty:
+            return pd.Timestamp(ts.max()).tz_convert(UTC).to_pydatetime()
+    return None
+
+
+class TailUpdater:
+    """Cursor + buffer por símbolo; ``poll_once`` / ``flush`` son síncronos y testeables."""
+
+    def __init__(
+        self,
+        symbols: List[str],
+        tf: str = "M1",
+        *,
+        region: str = "global",
+        root: Optional[str] = None,
+        lookback_min: int = 60,
+        flush_s: float = DEFAULT_FLUSH_S,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        workers: int = 4,
+        clock: Callable[[], datetime] = lambda: datetime.now(UTC),
+    ) -> None:
+        if tf not in TF_CHOICES:
+            raise ValueError(f"TF no soportado: {tf}")
+        self.symbols = list(symbols)
+        self.tf = tf
+        self.region = region
+        self.root = root or os.getenv("LAKE_ROOT", os.getcwd())
+        self.step = timedelta(minutes=STEP_MINUTES[tf])
+        self.lookback = timedelta(minutes=lookback_min)
+        self.flush_s = flush_s
+        self.max_pending = max_pending
+        self.workers = max(1, workers)
+        self.clock = clock
+        self.states: Dict[str, TailState] = {s: TailState(s) for s in self.symbols}
+        self._pending: Dict[str, List[pd.DataFrame]] = {s: [] for s in self.symbols}
+        self._lock = threading.Lock()
+        self._last_flush = clock()
+
+    # -- cursor ---------------------------------------------------------------
+    def last_closed(self, now: Optional[datetime] = None) -> datetime:
+        """openTime de la última vela cerrada a ``now``."""
+        now = now or self.clock()
+        step_s = int(self.step.total_seconds())
+        opened = datetime.fromtimestamp(int(now.timestamp()) // step_s * step_s, UTC)
+        return opened - self.step
+
+    def bootstrap(self) -> None:
+        """Inicializa el cursor de cada símbolo desde el lake."""
+        start = self.last_closed() - self.lookback
+        for sym, st in self.states.items():
+            st.written_ts = last_lake_ts(self.root, sym, self.tf)
+            st.last_ts = st.written_ts or start
+            logger.info("[TAIL] %s %s cursor=%s", sym, self.tf, st.last_ts.isoformat())
+
+    # -- ciclo ----------------------------------------------------------------
+    def _poll_symbol(self, sym: str, until: datetime) -> int:
+        st = self.states[sym]
+        if st.last_ts is None:
+            st.last_ts = until - self.lookback
+        start = st.last_ts + self.step
+        if start > until:
+            return 0
+        df = fetch_klines(to_binance_symbol(sym), start, until, tf=self.tf, region=self.region)
+        with self._lock:
+            st.polls += 1
+            if df.empty:
+                return 0
+            self._pending[sym].append(add_control_cols(df, sym, self.tf, self.region))
+            st.pending_rows += len(df)
+            st.last_ts = df["ts"].iloc[-1].to_pydatetime()
+        return len(df)
+
+    def poll_once(self) -> int:
+        """Pide a la API lo que falte hasta la última vela cerrada. Devuelve filas nuevas."""
+        until = self.last_closed()
+
+        def _one(sym: str) -> int:
+            try:
+                return self._poll_symbol(sym, until)
+            except Exception as e:  # un símbolo caído no frena al resto
+                st = self.states[sym]
+                st.errors += 1
+                st.last_error = f"{type(e).__name__}: {e}"
+                logger.warning("[TAIL] %s error: %s", sym, st.last_error)
+                return 0
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(self.symbols)) or 1,
+                                thread_name_prefix="tail") as pool:
+            new = sum(pool.map(_one, self.symbols))
+        if self.flush_due():
+            self.flush()
+        return new
+
+    def flush_due(self) -> bool:
+        pending = sum(st.pending_rows for st in self.states.values())
+        if not pending:
+            return False
+        elapsed = (self.clock() - self._last_flush).total_seconds()
+        return elapsed >= self.flush_s or pending >= self.max_pending
+
+    def flush(self) -> List[str]:
+        """Escribe lo pendiente: un merge por (símbolo, mes).
+
+        Si la escritura de un símbolo falla (lock ocupado, ``ConcurrentWriteError``,
+        disco), su lote vuelve al buffer para el próximo flush y el resto sigue.
+        """
+        written: List[str] = []
+        with self._lock:
+            batches = {s: f for s, f in self._pending.items() if f}
+            self._pending = {s: [] for s in self.symbols}
+        for sym, frames in batches.items():
+            df = pd.concat(frames, ignore_index=True)
+            st = self.states[sym]
+            try:
+                paths = write_by_month(df, root=self.root)
+            except Exception as e:
+                with self._lock:
+                    self._pending[sym][:0] = frames  # delante de lo llegado mientras tanto
+                    st.errors += 1
+                    st.last_error = f"{type(e).__name__}: {e}"
+                logger.warning("[TAIL] %s flush falló (%d filas quedan pendientes): %s", sym, len(df), st.last_error)
+                continue
+            written.extend(paths)
+            with self._lock:
+                st.pending_rows -= len(df)
+                st.rows_written += len(df)
+                st.written_ts = df["ts"].max().to_pydatetime()
+        self._last_flush = self.clock()
+        return written
+
+    # -- métricas -------------------------------------------------------------
+    def metrics(self) -> Dict[str, dict]:
+        """Por símbolo: lag (s) desde el cierre de la última vela en el lake y contadores."""
+        now = self.clock()
+        out = {}
+        for sym, st in self.states.items():
+            if st.written_ts is not None:
+                st.lag_s = round((now - (st.written_ts + self.step)).total_seconds(), 3)
+            d = asdict(st)
+            for k in ("last_ts", "written_ts"):
+                d[k] = d[k].isoformat() if d[k] is not None else None
+            out[sym] = d
+        return out
+
+    def publish_metrics(self, path: Optional[str] = None) -> str:
+        path = path or os.path.join(self.root, ".state", "tail", "metrics.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"tf": self.tf, "at": self.clock().isoformat(), "symbols": self.metrics()}, fh, indent=2)
+        os.replace(tmp, path)
+        return path
+
+    def run(self, *, settle_s: float = 2.0, stop: Optional[threading.Event] = None, cycles: Optional[int] = None) -> None:
+        """Bucle del daemon: despierta ``settle_s`` tras cada cierre de vela."""
+        stop = stop or threading.Event()
+        self.bootstrap()
+        n = 0
+        try:
+            while not stop.is_set():
+                new = self.poll_once()
+                self.publish_metrics()
+                lags = [st.lag_s for st in self.states.values() if st.lag_s is not None]
+                logger.info("[TAIL] +%d filas pendientes=%d lag_max=%s", new,
+                            sum(st.pending_rows for st in self.states.values()), max(lags) if lags else None)
+                n += 1
+                if cycles is not None and n >= cycles:
+                    break
+                nxt = self.last_closed() + 2 * self.step + timedelta(seconds=settle_s)
+                stop.wait(max(0.0, (nxt - self.clock()).total_seconds()))
+        finally:
+            self.flush()
+            self.publish_metrics()
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Mantiene source=binance al día hasta la última vela cerrada")
+    p.add_argument("--symbols", required=True, help="Lista separada por comas, e.g. BTC-USD,ETH-USD")
+    p.add_argument("--tf", choices=TF_CHOICES, default="M1")
+    p.add_argument("--binance-region", choices=["global", "us"], default=os.getenv("BINANCE_REGION", "global"))
+    p.add_argument("--lookback-min", type=int, default=60, help="Arranque sin datos en el lake: minutos hacia atrás")
+    p.add_argument("--flush-s", type=float, default=DEFAULT_FLUSH_S, help="Segundos entre escrituras por lotes")
+    p.add_argument("--max-pending", type=int, default=DEFAULT_MAX_PENDING, help="Flush anticipado al superar N filas")
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--settle-s", type=float, default=2.0, help="Espera tras el cierre de vela antes de pedirla")
+    p.add_argument("--once", action="store_true", help="Un solo ciclo (cron) y salir")
+    args = p.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    tail = TailUpdater(
+        [s.strip() for s in args.symbols.split(",") if s.strip()], args.tf,
+        region=args.binance_region, lookback_min=args.lookback_min, flush_s=args.flush_s,
+        max_pending=args.max_pending, workers=args.workers,
+    )
+    try:
+        tail.run(settle_s=args.settle_s, cycles=1 if args.once else None)
+    except KeyboardInterrupt:
+        pass  # run() ya escribió lo pendiente en su finally
+    for sym, m in tail.metrics().items():
+        print(f"[TAIL] {sym} last={m['written_ts']} lag_s={m['lag_s']} filas={m['rows_written']} errores={m['errors']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
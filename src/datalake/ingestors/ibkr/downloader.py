@@ -1,12 +1,18 @@
 import logging
-import logging
 import os
+from contextlib import ExitStack
+from operator import attrgetter
 from types import SimpleNamespace
-from typing import List
+from typing import Dict, List, Optional
 
+import numpy as np
 import pandas as pd
 from ib_insync import IB, Contract
 
+from datalake.utils.metrics import span
+from datalake.utils.pacing import governor_for
+
+from .session import shared_pool
 from .timeutil import to_utc
 
 logger = logging.getLogger("ibkr.downloader")
@@ -23,8 +29,10 @@ def _req_historical_with_retry(
     use_rth: bool,
     fmt_date: int = 2,
 ):
+    gov = governor_for("ibkr")
+    gov.acquire()
     try:
-        return ib.reqHistoricalData(
+        bars = ib.reqHistoricalData(
             contract,
             endDateTime=end_date_time,
             durationStr=duration_str,
@@ -34,6 +42,9 @@ def _req_historical_with_retry(
             formatDate=fmt_date,
             keepUpToDate=False,
         )
+        if bars:
+            gov.on_success()
+        return bars
     except Exception as e:
         msg = str(e)
         needs_agg = ("10299" in msg) and ("AGGTRADES" in msg.upper())
@@ -41,6 +52,7 @@ def _req_historical_with_retry(
             logger.warning(
                 "IB exige AGGTRADES (10299). Reintentando con whatToShow=AGGTRADES."
             )
+            gov.acquire()
             return ib.reqHistoricalData(
                 contract,
                 endDateTime=end_date_time,
@@ -81,22 +93,19 @@ def download_window(
         end_date_time,
         duration_str,
     )
-    bars = _req_historical_with_retry(
-        ib,
-        contract,
-        end_date_time=end_date_time,
-        duration_str=duration_str,
-        bar_size=bar_size,
-        what_to_show=what_to_show,
-        use_rth=use_rth,
-    )
-    if not bars:
-        return pd.DataFrame(columns=["ts", "open", "high", "low", "close", "volume"])
-    df = pd.DataFrame(b.__dict__ for b in bars)[
-        ["date", "open", "high", "low", "close", "volume"]
-    ]
-    df["ts"] = pd.to_datetime(df["date"], utc=True)
-    return df.drop(columns=["date"]).sort_values("ts")
+    with span("ibkr.download_window", symbol=contract.symbol, bar_size=bar_size) as sp:
+        bars = _req_historical_with_retry(
+            ib,
+            contract,
+            end_date_time=end_date_time,
+            duration_str=duration_str,
+            bar_size=bar_size,
+            what_to_show=what_to_show,
+            use_rth=use_rth,
+        )
+        df = bars_frame_utc(bars)
+        sp.set(rows=len(df), requests=1)
+    return df
 
 
 def fetch_hist_bars(
@@ -119,7 +128,7 @@ def fetch_hist_bars(
         end_str = end_dt_utc
     else:
         end_str = end_dt_utc.strftime("%Y%m%d %H:%M:%S UTC")
-    duration_str = f"{int(duration_seconds)} S"
+    duration_str = ib_duration_str(duration_seconds)
     df = download_window(
         ib,
         contract,
@@ -145,27 +154,68 @@ def fetch_hist_bars(
 
 BAR_SIZES = {
     "M1": "1 min",
+    "M5": "5 mins",
+    "M15": "15 mins",
+    "M30": "30 mins",
     "H1": "1 hour",
+    "H4": "4 hours",
+    "D1": "1 day",
 }
 
 
+def ib_duration_str(seconds: float) -> str:
+    """``durationStr`` de IB: en segundos hasta 1 día (límite de la unidad ``S``), si no en días."""
+    seconds = int(seconds)
+    if seconds <= 86_400:
+        return f"{seconds} S"
+    return f"{-(-seconds // 86_400)} D"
+
+
+_BAR_FIELDS = ("open", "high", "low", "close", "volume")
+_EMPTY_COLS = ["ts", "open", "high", "low", "close", "volume"]
+
+
+def bars_to_columns(bars) -> Dict[str, np.ndarray]:
+    """Extrae los campos de las barras a arrays NumPy, una pasada por columna.
+
+    ``map(attrgetter(...))`` + ``np.fromiter`` con ``count`` prealoca el array y
+    recorre las barras en C, sin crear un dict ni un ``float()`` por barra.
+    Una barra sin algún campo (o con uno no numérico) no rompe la conversión:
+    esa columna se rehace con ``getattr(..., nan)`` y el valor queda NaN.
+    """
+    bars = bars if isinstance(bars, (list, tuple)) else list(bars)
+    n = len(bars)
+    cols = {"date": np.fromiter((getattr(b, "date", None) for b in bars), dtype=object, count=n)}
+    for field in _BAR_FIELDS:
+        try:
+            cols[field] = np.fromiter(map(attrgetter(field), bars), dtype="float64", count=n)
+        except (AttributeError, TypeError, ValueError):
+            cols[field] = np.fromiter((_as_float(getattr(b, field, np.nan)) for b in bars), dtype="float64", count=n)
+    return cols
+
+
+def _as_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def bars_frame_utc(bars) -> pd.DataFrame:
+    """Barras -> DataFrame ``ts, open, high, low, close, volume`` con ``date`` ya en UTC (formatDate=2)."""
+    if not bars:
+        return pd.DataFrame(columns=_EMPTY_COLS)
+    cols = bars_to_columns(bars)
+    cols["ts"] = pd.to_datetime(cols.pop("date"), utc=True)
+    return pd.DataFrame(cols, columns=_EMPTY_COLS).sort_values("ts")
+
+
 def bars_to_df(bars, exchange: str) -> pd.DataFrame:
     """Convierte lista de barras de ib_insync en DataFrame con ts en UTC."""
     if not bars:
-        return pd.DataFrame(columns=["ts", "open", "high", "low", "close", "volume"])
-    df = pd.DataFrame(
-        [
-            {
-                "date": getattr(b, "date", None),
-                "open": float(getattr(b, "open", "nan")),
-                "high": float(getattr(b, "high", "nan")),
-                "low": float(getattr(b, "low", "nan")),
-                "close": float(getattr(b, "close", "nan")),
-                "volume": float(getattr(b, "volume", "nan")),
-            }
-            for b in bars
-        ]
-    )
+        return pd.DataFrame(columns=_EMPTY_COLS)
+    cols = bars_to_columns(bars)
+    df = pd.DataFrame(cols)
     df["ts"] = to_utc(df["date"], exchange)
     df = df.drop(columns=["date"]).sort_values("ts").reset_index(drop=True)
     return df
@@ -179,12 +229,15 @@ def fetch_bars_range(
     timeframe: str,
     what_to_show: str,
     use_rth: bool = False,
+    ib: Optional[IB] = None,
 ) -> List[SimpleNamespace]:
     """Descarga barras históricas para un rango arbitrario.
 
-    Devuelve la lista de barras tal como ``ib_insync`` la proporciona. Si la
-    variable de entorno ``DATALAKE_SYNTH`` es ``"1"`` se generan barras
-    sintéticas para pruebas offline.
+    Devuelve la lista de barras tal como ``ib_insync`` la proporciona. Si se
+    pasa ``ib`` se usa esa conexión; si no, se toma una sesión del pool
+    compartido (``session.shared_pool``). Si la variable de entorno
+    ``DATALAKE_SYNTH`` es ``"1"`` se generan barras sintéticas para pruebas
+    offline.
     """
 
     if os.getenv("DATALAKE_SYNTH") == "1":
@@ -205,15 +258,12 @@ def fetch_bars_range(
 
     from .contracts import make_crypto_contract
 
-    host = os.getenv("IB_HOST", "127.0.0.1")
-    port = int(os.getenv("IB_PORT", "7497"))
-    client_id = int(os.getenv("IB_CLIENT_ID", "1"))
-    ib = IB()
-    ib.connect(host, port, clientId=client_id, timeout=15)
-    try:
+    with ExitStack() as stack:
+        if ib is None:
+            ib = stack.enter_context(shared_pool().session())
         contract = make_crypto_contract(symbol, exchange=exchange)
         end_str = end_dt_utc if isinstance(end_dt_utc, str) else end_dt_utc.strftime("%Y%m%d %H:%M:%S UTC")
-        duration_str = f"{int(duration_seconds)} S"
+        duration_str = ib_duration_str(duration_seconds)
         bar_size = BAR_SIZES.get(timeframe, timeframe)
         bars = _req_historical_with_retry(
             ib,
@@ -225,5 +275,3 @@ def fetch_bars_range(
             use_rth=use_rth,
         )
         return bars
-    finally:
-        ib.disconnect()
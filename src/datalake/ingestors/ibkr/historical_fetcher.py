@@ -1,11 +1,14 @@
 from __future__ import annotations
 import datetime as dt
+from dataclasses import replace
 from typing import Iterable, List
 import pandas as pd
 from ib_insync import util
-from datalake.ingestors.ibkr.ib_client import IBClient, IBClientConfig
+from datalake.ingestors.ibkr.ib_client import IBClientConfig
+from datalake.ingestors.ibkr.session import SessionConfig, shared_pool
 from datalake.ingestors.ibkr.contracts import make_crypto_contract
 from datalake.ingestors.ibkr.normalize import to_bar_end_utc, enforce_m1_grid
+from datalake.utils.pacing import governor_for
 
 
 def _date_range_days(start: pd.Timestamp, end: pd.Timestamp) -> Iterable[pd.Timestamp]:
@@ -21,18 +24,20 @@ def fetch_crypto_m1_range(symbol: str, start_utc: str, end_utc: str, client_cfg:
     Retorna DataFrame con columnas: ts, open, high, low, close, volume, source, market, symbol, exchange, what_to_show.
     """
     cfg = client_cfg or IBClientConfig()
-    cli = IBClient(cfg)
-    cli.connect()
-    try:
+    gov = governor_for("ibkr")
+    if cfg.rate_limit_rps is not None:
+        gov.reconfigure(replace(gov.cfg, rate_per_sec=cfg.rate_limit_rps))
+    pool = shared_pool(SessionConfig(host=cfg.host, port=cfg.port, base_client_id=cfg.client_id, timeout=cfg.timeout))
+    with pool.session() as ib:
         contract = make_crypto_contract(symbol)
         start = pd.Timestamp(start_utc, tz='UTC')
         end = pd.Timestamp(end_utc, tz='UTC')
         dfs: List[pd.DataFrame] = []
         for day in _date_range_days(start, end):
-            cli._throttle()
+            gov.acquire()
             # endDateTime debe ser fin del día UTC
             end_dt = (day + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)).to_pydatetime()
-            bars = cli.ib.reqHistoricalData(
+            bars = ib.reqHistoricalData(
                 contract,
                 endDateTime=end_dt,
                 durationStr='1 D',
@@ -57,5 +62,3 @@ def fetch_crypto_m1_range(symbol: str, start_utc: str, end_utc: str, client_cfg:
             return pd.DataFrame(columns=['ts','open','high','low','close','volume','source','market','symbol','exchange','what_to_show'])
         out = enforce_m1_grid(pd.concat(dfs, ignore_index=True))
         return out
-    finally:
-        cli.disconnect()
@@ -1,23 +1,28 @@
 from __future__ import annotations
-import time
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from typing import Optional
 from tenacity import retry, stop_after_attempt, wait_exponential
 from ib_insync import IB
 
+from datalake.utils.pacing import PacingGovernor, attach_ib_pacing_feedback, governor_for
+
 @dataclass
 class IBClientConfig:
     host: str = '127.0.0.1'
     port: int = 7497
     client_id: int = 1011
     timeout: float = 30.0
-    rate_limit_rps: float = 0.7  # <=1 req/s
+    rate_limit_rps: Optional[float] = None  # None: el del governor compartido (IB_RATE_LIMIT_RPS)
 
 class IBClient:
     def __init__(self, cfg: Optional[IBClientConfig] = None) -> None:
         self.cfg = cfg or IBClientConfig()
         self.ib = IB()
-        self._last_ts = 0.0
+        # Governor compartido con el resto de rutas IB; solo un rate explícito lo ajusta
+        self.governor: PacingGovernor = governor_for("ibkr")
+        if self.cfg.rate_limit_rps is not None:
+            self.governor.reconfigure(replace(self.governor.cfg, rate_per_sec=self.cfg.rate_limit_rps))
+        attach_ib_pacing_feedback(self.ib, self.governor)
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=8))
     def connect(self) -> None:
@@ -29,9 +34,4 @@ class IBClient:
             self.ib.disconnect()
 
     def _throttle(self) -> None:
-        min_interval = 1.0 / max(self.cfg.rate_limit_rps, 0.01)
-        now = time.time()
-        delay = self._last_ts + min_interval - now
-        if delay > 0:
-            time.sleep(delay)
-        self._last_ts = time.time()
+        self.governor.acquire()
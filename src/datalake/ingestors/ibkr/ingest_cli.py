@@ -2,19 +2,28 @@ import argparse
 import logging
 import os
 import re
-import time
 from datetime import datetime, timedelta, timezone
 from typing import List
 
+import numpy as np
 import pandas as pd
 from ib_insync import IB, Contract
 
 from datalake.config import LakeConfig
-from datalake.ingestors.ibkr.writer import write_month
-from datalake.ingestors.ibkr.downloader import download_window, fetch_hist_bars
+from datalake.ingestors.ibkr.month_buffer import MonthBuffer, default_spill_dir
+from datalake.ingestors.ibkr.downloader import bars_frame_utc, download_window, fetch_hist_bars
+from datalake.tools.gaps import find_missing_ranges_utc, gap_runs
+from datalake.ingestors.ibkr.planner import (
+    FixedPlanner,
+    RequestMetrics,
+    default_state_path,
+    make_planner,
+)
+from datalake.ingestors.ibkr.session import shared_pool
+from datalake.utils.journal import DONE, PARTIAL, open_journal
+from datalake.utils.pacing import governor_for
 
 # --- Helpers de contrato, chunking y fetch robusto (2h) ---
-CHUNK_HOURS = 8
 
 BAR_SIZES = {
     "M1": "1 min",
@@ -68,13 +77,7 @@ def _concat_non_empty(out: pd.DataFrame | None, df: pd.DataFrame | None) -> pd.D
 
 
 def to_dataframe(bars) -> pd.DataFrame:
-    if not bars:
-        return pd.DataFrame(columns=["ts", "open", "high", "low", "close", "volume"])
-    df = pd.DataFrame(b.__dict__ for b in bars)[
-        ["date", "open", "high", "low", "close", "volume"]
-    ]
-    df["ts"] = pd.to_datetime(df["date"], utc=True)
-    return df.drop(columns=["date"]).sort_values("ts")
+    return bars_frame_utc(bars)
 
 
 def _req_historical_with_retry(
@@ -88,8 +91,10 @@ def _req_historical_with_retry(
     use_rth,
     fmt_date: int = 2,
 ):
+    gov = governor_for("ibkr")
+    gov.acquire()
     try:
-        return ib.reqHistoricalData(
+        bars = ib.reqHistoricalData(
             contract,
             endDateTime=end_dt,
             durationStr=duration,
@@ -99,6 +104,9 @@ def _req_historical_with_retry(
             formatDate=fmt_date,
             keepUpToDate=False,
         )
+        if bars:
+            gov.on_success()
+        return bars
     except Exception as e:
         msg = str(e)
         needs_agg = ("10299" in msg) and ("AGGTRADES" in msg.upper())
@@ -106,6 +114,7 @@ def _req_historical_with_retry(
             logging.warning(
                 "IB exige AGGTRADES (10299). Reintentando con whatToShow=AGGTRADES."
             )
+            gov.acquire()
             return ib.reqHistoricalData(
                 contract,
                 endDateTime=end_dt,
@@ -181,18 +190,6 @@ def _crypto_contract(symbol: str, exchange: str = "PAXOS") -> Contract:
     return Contract(secType="CRYPTO", symbol=base, currency=quote, exchange=exchange)
 
 
-def _day_chunks_exact_utc(day_utc: datetime) -> List[tuple[datetime, datetime]]:
-    """Return three fixed UTC chunks covering the day without gaps."""
-    start = day_utc.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=timezone.utc)
-    chunks: List[tuple[datetime, datetime]] = []
-    cur = start
-    for _ in range(3):
-        end = cur + timedelta(hours=CHUNK_HOURS) - timedelta(minutes=1)
-        chunks.append((cur, end))
-        cur = end + timedelta(minutes=1)
-    return chunks
-
-
 def _end_of_day_utc(date_str: str) -> str:
     y, m, d = date_str.split("-")
     return f"{y}{m}{d} 23:59:59 UTC"
@@ -203,63 +200,51 @@ def _find_missing_ranges_utc(df_day: pd.DataFrame) -> List[tuple[datetime, datet
     if df_day.empty:
         return []
     day_start = df_day["ts"].dt.floor("D").min().replace(tzinfo=timezone.utc)
-    full = pd.date_range(
-        day_start,
-        day_start + timedelta(days=1) - timedelta(minutes=1),
-        freq="1min",
-        tz=timezone.utc,
-    )
-    missing = full.difference(pd.DatetimeIndex(df_day["ts"]))
-    if missing.empty:
-        return []
-    ranges: List[tuple[datetime, datetime]] = []
-    start = missing[0]
-    prev = start
-    for ts in missing[1:]:
-        if ts - prev == timedelta(minutes=1):
-            prev = ts
-        else:
-            ranges.append((start.to_pydatetime(), prev.to_pydatetime()))
-            start = ts
-            prev = ts
-    ranges.append((start.to_pydatetime(), prev.to_pydatetime()))
-    return ranges
-
-
-def _synth_fill(df_day: pd.DataFrame, day_start: datetime) -> pd.DataFrame:
-    """Fill missing minute bars with flat synthetic data."""
-    full = pd.date_range(
-        day_start,
-        day_start + timedelta(days=1) - timedelta(minutes=1),
-        freq="1min",
-        tz=timezone.utc,
-    )
-    existing = pd.DatetimeIndex(df_day["ts"])
+    runs = gap_runs(df_day["ts"], day_start, day_start + timedelta(days=1) - timedelta(minutes=1))
+    return [(s.to_pydatetime(), e.to_pydatetime()) for s, e in runs.to_list()]
+
+
+def _synth_fill(
+    df_day: pd.DataFrame,
+    day_start: datetime,
+    day_end: datetime | None = None,
+    step: timedelta = timedelta(minutes=1),
+) -> pd.DataFrame:
+    """Fill missing bars with flat synthetic data.
+
+    The grid is ``[day_start, day_end]`` every ``step`` (one UTC day of M1 by
+    default; pass ``day_end``/``step`` for other timeframes or whole months).
+    Each missing bar takes the previous real close, or the next real open for
+    leading gaps, with zero volume and ``is_synth=True``.
+    """
+    if day_end is None:
+        day_end = day_start + timedelta(days=1) - step
+    full = pd.date_range(day_start, day_end, freq=step, tz=timezone.utc).as_unit("ns")
+    ref = df_day.sort_values("ts", kind="stable")
+    existing = pd.DatetimeIndex(pd.to_datetime(ref["ts"], utc=True)).as_unit("ns")
     missing = full.difference(existing)
     if missing.empty:
         return df_day
-    synth_rows = []
-    for ts in missing:
-        prev = df_day[df_day["ts"] < ts]
-        nxt = df_day[df_day["ts"] > ts]
-        if not prev.empty:
-            price = prev.iloc[-1]["close"]
-        elif not nxt.empty:
-            price = nxt.iloc[0]["open"]
-        else:
-            price = 0.0
-        synth_rows.append(
-            {
-                "ts": ts,
-                "open": price,
-                "high": price,
-                "low": price,
-                "close": price,
-                "volume": 0,
-                "is_synth": True,
-            }
-        )
-    df_synth = pd.DataFrame(synth_rows)
+    if ref.empty:
+        price = np.zeros(len(missing))
+    else:
+        # searchsorted == reindex + ffill(close) / bfill(open) sobre los ts reales
+        close = ref["close"].to_numpy(dtype="float64")
+        open_ = ref["open"].to_numpy(dtype="float64")
+        prev_i = existing.searchsorted(missing, side="left") - 1
+        next_i = np.minimum(existing.searchsorted(missing, side="right"), len(ref) - 1)
+        price = np.where(prev_i >= 0, close[np.maximum(prev_i, 0)], open_[next_i])
+    df_synth = pd.DataFrame(
+        {
+            "ts": missing,
+            "open": price,
+            "high": price,
+            "low": price,
+            "close": price,
+            "volume": 0,
+            "is_synth": True,
+        }
+    )
     df_day = _concat_non_empty(df_day, df_synth)
     if "is_synth" not in df_day.columns:
         df_day["is_synth"] = df_day.get("is_synth", False)
@@ -332,10 +317,12 @@ def _repair_range_with_fallback(
     exchange: str = params["exchange"]
     what: str = params["what"]
     rth: bool = params["rth"]
+    planner = params.get("planner") or FixedPlanner()
+    key = (symbol, exchange)
     cont = _crypto_contract(symbol, exchange=exchange)
     remaining: List[tuple[datetime, datetime]] = [(start, end)]
     out = pd.DataFrame(columns=["ts", "open", "high", "low", "close", "volume"])
-    for step in [3600, 1800, 600, 300]:
+    for step in planner.repair_steps(key):
         new_remaining: List[tuple[datetime, datetime]] = []
         for rs, re in remaining:
             cur = rs
@@ -354,6 +341,8 @@ def _repair_range_with_fallback(
                 )
                 if not df.empty:
                     df = df[(df["ts"] >= cur) & (df["ts"] <= block_end)]
+                planner.observe(key, duration, _covered_seconds(df))
+                if not df.empty:
                     out = _concat_non_empty(out, df)
                 else:
                     new_remaining.append((cur, block_end))
@@ -366,6 +355,23 @@ def _repair_range_with_fallback(
     return out.drop_duplicates("ts").sort_values("ts")
 
 
+def _resume_partial_day(
+    symbol: str,
+    ranges: List[tuple[datetime, datetime]],
+    params: dict,
+) -> pd.DataFrame:
+    """Fetch only the ranges a previous run left missing (journal status ``partial``)."""
+    out = pd.DataFrame(columns=["ts", "open", "high", "low", "close", "volume"])
+    for start, end in ranges:
+        df_fix = _repair_range_with_fallback(
+            symbol, pd.Timestamp(start).to_pydatetime(), pd.Timestamp(end).to_pydatetime(), params
+        )
+        out = _concat_non_empty(out, df_fix)
+    if out.empty:
+        return out
+    return out.drop_duplicates("ts").sort_values("ts")
+
+
 def _fetch_with_fallback(
     ib: IB,
     symbol: str,
@@ -376,14 +382,15 @@ def _fetch_with_fallback(
     what: str,
     exchange: str,
     rth: bool,
+    planner=None,
 ) -> pd.DataFrame:
     cont = _crypto_contract(symbol, exchange=exchange)
     end_str = end.replace(second=59).strftime("%Y%m%d %H:%M:%S UTC")
     duration = int((end - start).total_seconds()) + 60
     duration_str = f"{duration} S"
-    attempts = [2, 5, 10]
+    max_attempts = 3
     df = pd.DataFrame()
-    for i, backoff in enumerate(attempts, start=1):
+    for i in range(1, max_attempts + 1):
         bar_sz = BAR_SIZES.get(tf, "1 min")
         logger.info(
             "REQ[A] sym=%s exch=%s what=%s useRTH=%s bar=%s end=%s dur=%s attempt=%d",
@@ -405,8 +412,15 @@ def _fetch_with_fallback(
             what_to_show=what,
             use_rth=rth,
         )
+        if planner is not None:
+            clipped = df if df.empty else df[(df["ts"] >= start) & (df["ts"] <= end)]
+            planner.observe((symbol, exchange), duration, _covered_seconds(clipped))
         if not df.empty and df["ts"].max() >= end:
             break
+        if planner is not None and not planner.retry_short and not df.empty:
+            # IB respondió pero con menos span: el planner ya ajustó la ventana
+            # y el resto lo cubre la reparación por rangos.
+            break
         logger.warning(
             "short chunk sym=%s last=%s expected_end=%s attempt=%d",
             symbol,
@@ -414,10 +428,19 @@ def _fetch_with_fallback(
             end,
             i,
         )
-        time.sleep(backoff)
+        # Chunk corto: IB suele estar paceando. El governor aplica el backoff
+        # antes del siguiente request (de cualquier ruta IB del proceso).
+        governor_for("ibkr").on_throttle()
     return df
 
 
+def _covered_seconds(df: pd.DataFrame | None, bar_s: int = 60) -> float:
+    """Span actually returned by IB (first to last bar, inclusive)."""
+    if df is None or df.empty:
+        return 0.0
+    return (df["ts"].max() - df["ts"].min()).total_seconds() + bar_s
+
+
 def _resample(pdf: pd.DataFrame, timeframe: str) -> pd.DataFrame:
     freq = RESAMPLE_FREQ.get(timeframe, "1min")
     if timeframe == "M1":
@@ -468,10 +491,48 @@ def _build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Rellenar huecos con barras sintéticas si quedan faltantes",
     )
+    ap.add_argument(
+        "--planner",
+        choices=["fixed", "adaptive"],
+        default=os.getenv("IB_PLANNER", "adaptive"),
+        help="Ventanas de request: fijas (8h) o aprendidas por símbolo/exchange",
+    )
+    ap.add_argument(
+        "--planner-state",
+        default=None,
+        help="JSON con lo aprendido por el planner (default <lake>/.state/ibkr_planner.json)",
+    )
+    ap.add_argument(
+        "--metrics-out",
+        default=None,
+        help="Reporte de requests por día (.parquet o .csv)",
+    )
+    ap.add_argument(
+        "--journal",
+        default=os.getenv("DATALAKE_JOURNAL", "auto"),
+        help="Journal de días procesados (JSON lines); auto = <lake>/.state/jobs.jsonl, off = sin journal",
+    )
+    ap.add_argument(
+        "--no-resume",
+        dest="no_resume",
+        action="store_true",
+        help="Ignorar el journal al decidir qué bajar (se sigue registrando)",
+    )
     return ap
 
 
 def ingest(args, data_root: str | None = None) -> List[str]:
+    """Run the ingest on a session checked out from the shared IB pool.
+
+    The session is returned to the pool (not disconnected) when done.
+    """
+    if os.getenv("DATALAKE_SYNTH") == "1":
+        return _ingest(args, data_root, None)
+    with shared_pool().session() as ib:
+        return _ingest(args, data_root, ib)
+
+
+def _ingest(args, data_root: str | None, ib) -> List[str]:
     symbols = [s.strip() for s in args.symbols.split(",") if s.strip()]
     d0 = datetime.fromisoformat(args.date_from).replace(tzinfo=timezone.utc)
     d1 = datetime.fromisoformat(args.date_to).replace(tzinfo=timezone.utc)
@@ -512,20 +573,45 @@ def ingest(args, data_root: str | None = None) -> List[str]:
     cfg.tz = "UTC"
 
     synth = os.getenv("DATALAKE_SYNTH") == "1"
-    ib = None
-    if not synth:
-        host = os.getenv("IB_HOST", "127.0.0.1")
-        port = int(os.getenv("IB_PORT", "7497"))
-        client_id = int(os.getenv("IB_CLIENT_ID", "1"))
-        ib = IB()
-        ib.connect(host, port, clientId=client_id, timeout=15)
+    planner_kind = getattr(args, "planner", None) or os.getenv("IB_PLANNER", "adaptive")
+    planner = make_planner(
+        planner_kind,
+        getattr(args, "planner_state", None) or default_state_path(lake_root),
+    )
+    metrics = RequestMetrics()
+    gov = governor_for("ibkr")
+    expected_rows = 1440 if tf == "M1" else None
+    # Journal por día: días done se saltan, parciales se retoman desde el lake
+    journal = open_journal(getattr(args, "journal", None), lake_root)
+    resume = journal is not None and not getattr(args, "no_resume", False)
+
+    def _record_day(sym: str, day: datetime, rows: int, req0: int, last_ts=None) -> None:
+        requests = gov.requests - req0
+        metrics.record_day(
+            sym,
+            day,
+            planner=planner.name,
+            window_s=planner.window_s((sym, exchange)),
+            requests=requests,
+            rows=rows,
+            expected=expected_rows,
+        )
+        if journal is not None:
+            journal.record(
+                "ibkr", sym, tf, day,
+                rows=rows, expected=expected_rows, last_ts=last_ts, requests=requests,
+            )
 
     written: List[str] = []
+    # Un write_month por (símbolo, mes); cada día queda en un spill hasta entonces
+    buffer = MonthBuffer(cfg, default_spill_dir(lake_root, tf))
+    written.extend(buffer.recover())
     for sym in symbols:
         logger.info("start %s %s→%s", sym, d0.date(), d1.date())
         cur = d0
         while cur <= d1:
             logger.info("day %s %s", sym, cur.date())
+            req0 = gov.requests
             is_crypto = _is_crypto(sym, exchange)
             what_final = args.what or env_what or (
                 "AGGTRADES" if is_crypto else "TRADES"
@@ -538,6 +624,19 @@ def ingest(args, data_root: str | None = None) -> List[str]:
             if is_crypto and rth_final:
                 logger.warning("useRTH=1 con cripto; continúa por petición del usuario")
             cfg.what_to_show = what_final
+            prev = journal.get("ibkr", sym, tf, cur) if resume else None
+            if prev and prev["status"] == DONE:
+                logger.info("skip %s %s (journal: done rows=%d)", sym, cur.date(), prev["rows"])
+                cur = (cur + timedelta(days=1)).replace(
+                    hour=0, minute=0, second=0, microsecond=0
+                )
+                continue
+            resume_ranges: List[tuple[datetime, datetime]] = []
+            if prev and prev["status"] == PARTIAL and tf == "M1" and not synth:
+                resume_ranges = find_missing_ranges_utc(
+                    sym, cur.strftime("%Y-%m-%d"), tf, exchange, what_final, cfg
+                )
+            day_rows = None  # filas del día en el lake si day_df es solo lo que faltaba
             if synth:
                 day_df = pd.DataFrame(
                     {
@@ -549,11 +648,38 @@ def ingest(args, data_root: str | None = None) -> List[str]:
                         "volume": [1.0],
                     }
                 )
+            elif resume_ranges:
+                missing_before = sum(
+                    int((e - s).total_seconds() // 60) + 1 for s, e in resume_ranges
+                )
+                logger.info(
+                    "resume %s %s (journal: partial) faltan=%d en %d rangos",
+                    sym, cur.date(), missing_before, len(resume_ranges),
+                )
+                day_df = _resume_partial_day(
+                    sym,
+                    resume_ranges,
+                    {
+                        "ib": ib,
+                        "exchange": exchange,
+                        "what": what_final,
+                        "rth": rth_final,
+                        "planner": planner,
+                    },
+                )
+                day_rows = 1440 - missing_before + len(day_df)
+                if day_df.empty:
+                    logger.warning("resume sin barras nuevas %s %s", sym, cur.date())
+                    _record_day(sym, cur, day_rows, req0)
+                    cur = (cur + timedelta(days=1)).replace(
+                        hour=0, minute=0, second=0, microsecond=0
+                    )
+                    continue
             else:
                 contract = _crypto_contract(sym, exchange=exchange)
                 all_df = pd.DataFrame()
-                chunks = _day_chunks_exact_utc(cur)
-                for start_utc, end_utc in chunks[:2]:
+                chunks = planner.day_chunks(cur, (sym, exchange))
+                for start_utc, end_utc in chunks:
                     dfw = _fetch_with_fallback(
                         ib,
                         sym,
@@ -564,6 +690,7 @@ def ingest(args, data_root: str | None = None) -> List[str]:
                         what_final,
                         exchange,
                         rth_final,
+                        planner=planner,
                     )
                     if not dfw.empty:
                         dfw = dfw[
@@ -580,6 +707,7 @@ def ingest(args, data_root: str | None = None) -> List[str]:
                                     "exchange": exchange,
                                     "what": what_final,
                                     "rth": rth_final,
+                                    "planner": planner,
                                 }
                                 for s_m, e_m in miss:
                                     df_fix = _repair_range_with_fallback(
@@ -610,6 +738,7 @@ def ingest(args, data_root: str | None = None) -> List[str]:
                     logging.warning(f"tail cross-midnight fetch failed: {e}")
                 if all_df is None or all_df.empty:
                     logger.warning("no bars %s %s", sym, cur.date())
+                    _record_day(sym, cur, 0, req0)
                     cur = (cur + timedelta(days=1)).replace(
                         hour=0, minute=0, second=0, microsecond=0
                     )
@@ -657,6 +786,7 @@ def ingest(args, data_root: str | None = None) -> List[str]:
                         "exchange": exchange,
                         "what": what_final,
                         "rth": rth_final,
+                        "planner": planner,
                     }
                     for start_m, end_m in missing_ranges:
                         df_fix = _repair_range_with_fallback(
@@ -674,6 +804,7 @@ def ingest(args, data_root: str | None = None) -> List[str]:
                         logging.warning("tail-repair no pudo completar el tramo 20:00–23:59.")
                 if day_df.empty:
                     logger.warning("no bars %s %s", sym, cur.isoformat())
+                    _record_day(sym, cur, 0, req0)
                     cur = (cur + timedelta(days=1)).replace(
                         hour=0, minute=0, second=0, microsecond=0
                     )
@@ -720,16 +851,35 @@ def ingest(args, data_root: str | None = None) -> List[str]:
             day_df = day_df.drop_duplicates(
                 subset=["symbol", "timeframe", "ts", "source"], keep="last"
             )
-            path = write_month(day_df, symbol=sym, cfg=cfg)
-            written.append(path)
-            logger.info("end %s %s -> %s", sym, cur.date(), path)
+            written.extend(buffer.flush(sym, before=(cur.year, cur.month)))
+            written.extend(buffer.add(sym, day_df))
+            _record_day(
+                sym,
+                cur,
+                len(day_df) if day_rows is None else day_rows,
+                req0,
+                last_ts=day_df["ts"].max(),
+            )
+            logger.info("end %s %s -> buffer (%d filas)", sym, cur.date(), buffer.rows)
             cur = (cur + timedelta(days=1)).replace(
                 hour=0, minute=0, second=0, microsecond=0
             )
+        written.extend(buffer.flush(sym))
         logger.info("done %s", sym)
-
-    if ib is not None:
-        ib.disconnect()
+        planner.save()
+
+    summary = metrics.summary()
+    logger.info(
+        "requests planner=%s días=%d completos=%d requests=%d requests/día_completo=%.2f",
+        planner.name,
+        summary["days"],
+        summary["filled_days"],
+        summary["requests"],
+        summary["requests_per_filled_day"],
+    )
+    metrics_out = getattr(args, "metrics_out", None)
+    if metrics_out:
+        metrics.write(metrics_out)
     return written
 
 
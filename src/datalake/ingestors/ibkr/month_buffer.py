@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import glob
+import logging
+import os
+import shutil
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from datalake.ingestors.ibkr.writer import write_month
+
+logger = logging.getLogger("ibkr.month_buffer")
+
+Key = Tuple[str, int, int]  # (symbol, year, month)
+
+DEFAULT_MAX_ROWS = 250_000  # ~6 meses de M1 de un símbolo
+
+
+def default_spill_dir(lake_root: str, timeframe: str) -> str:
+    return os.path.join(lake_root, ".state", "spill", "ibkr", f"timeframe={timeframe}")
+
+
+class MonthBuffer:
+    """Buffers validated day frames per (symbol, month) and writes each month once.
+
+    Every ``add`` first spills the day to ``<spill_dir>/symbol=S/YYYY-MM/<day>.parquet``
+    so a crash never loses buffered data: ``recover`` writes whatever a
+    previous run left spilled. A month is flushed with a single
+    ``write_month`` when the caller moves past it, when the symbol ends, or
+    when the buffered rows exceed ``max_rows`` (the largest month goes first).
+    """
+
+    def __init__(
+        self,
+        cfg,
+        spill_dir: str,
+        *,
+        max_rows: Optional[int] = None,
+        write: Callable[..., str] = write_month,
+    ) -> None:
+        self.cfg = cfg
+        self.spill_dir = spill_dir
+        self.max_rows = max_rows or int(os.getenv("IB_BUFFER_MAX_ROWS", DEFAULT_MAX_ROWS))
+        self._write = write
+        self._frames: Dict[Key, List[pd.DataFrame]] = {}
+        self._rows: Dict[Key, int] = {}
+        self.flushes = 0
+
+    @staticmethod
+    def _key(symbol: str, df: pd.DataFrame) -> Key:
+        ts = df["ts"].iloc[0]
+        return symbol, int(ts.year), int(ts.month)
+
+    def _month_dir(self, key: Key) -> str:
+        symbol, year, month = key
+        return os.path.join(self.spill_dir, f"symbol={symbol}", f"{year:04d}-{month:02d}")
+
+    def _spill(self, key: Key, df: pd.DataFrame) -> None:
+        d = self._month_dir(key)
+        os.makedirs(d, exist_ok=True)
+        name = df["ts"].iloc[0].strftime("%Y-%m-%d")
+        tmp = os.path.join(d, f".{name}.parquet.tmp")
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, os.path.join(d, f"{name}.parquet"))
+
+    @property
+    def rows(self) -> int:
+        return sum(self._rows.values())
+
+    def add(self, symbol: str, df: pd.DataFrame) -> List[str]:
+        """Spill + buffer one day; returns paths written if the row threshold forced a flush."""
+        if df is None or df.empty:
+            return []
+        key = self._key(symbol, df)
+        self._spill(key, df)
+        self._frames.setdefault(key, []).append(df)
+        self._rows[key] = self._rows.get(key, 0) + len(df)
+        written: List[str] = []
+        while self.rows > self.max_rows and self._rows:
+            biggest = max(self._rows, key=self._rows.get)
+            written.extend(self._flush_key(biggest))
+        return written
+
+    def _flush_key(self, key: Key) -> List[str]:
+        frames = self._frames.pop(key, [])
+        self._rows.pop(key, None)
+        if not frames:
+            return []
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        df = df.drop_duplicates(subset=["ts"], keep="last").sort_values("ts")
+        path = self._write(df, symbol=key[0], cfg=self.cfg)
+        self.flushes += 1
+        logger.info("flush %s %04d-%02d rows=%d días=%d -> %s", key[0], key[1], key[2], len(df), len(frames), path)
+        # la partición ya tiene los datos: el spill sobra
+        shutil.rmtree(self._month_dir(key), ignore_errors=True)
+        return [path]
+
+    def flush(self, symbol: Optional[str] = None, *, before: Optional[Tuple[int, int]] = None) -> List[str]:
+        """Flush buffered months (of ``symbol`` if given; only months < ``before`` if given)."""
+        written: List[str] = []
+        for key in sorted(self._frames):
+            if symbol is not None and key[0] != symbol:
+                continue
+            if before is not None and (key[1], key[2]) >= before:
+                continue
+            written.extend(self._flush_key(key))
+        return written
+
+    def recover(self) -> List[str]:
+        """Write the spills a crashed run left behind (one ``write_month`` per month)."""
+        written: List[str] = []
+        for d in sorted(glob.glob(os.path.join(self.spill_dir, "symbol=*", "*-*"))):
+            files = sorted(glob.glob(os.path.join(d, "*.parquet")))
+            symbol = os.path.basename(os.path.dirname(d)).split("=", 1)[1]
+            if not files:
+                shutil.rmtree(d, ignore_errors=True)
+                continue
+            df = pd.concat((pd.read_parquet(f) for f in files), ignore_index=True)
+            df["ts"] = pd.to_datetime(df["ts"], utc=True)
+            logger.warning("recover spill %s (%d días, %d filas)", d, len(files), len(df))
+            key = self._key(symbol, df)
+            self._frames.setdefault(key, []).append(df)
+            self._rows[key] = self._rows.get(key, 0) + len(df)
+            written.extend(self._flush_key(key))
+        return written
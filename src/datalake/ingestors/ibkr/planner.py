@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger("ibkr.planner")
+
+Key = Tuple[str, str]  # (symbol, exchange)
+
+# Fixed schedule used historically by the ingest: 8h chunks + shrinking repair windows
+FIXED_CHUNK_S = 8 * 3600
+FIXED_REPAIR_STEPS = [3600, 1800, 600, 300]
+# Main body of the day; 20:00–23:59 is fetched by the cross-midnight tail request
+BODY_END = timedelta(hours=20)
+
+MIN_WINDOW_S = 300
+MAX_WINDOW_S = 24 * 3600
+
+
+class FixedPlanner:
+    """Original behaviour: two fixed 8h chunks (00:00–15:59) and 1h→5m repairs."""
+
+    name = "fixed"
+    retry_short = True  # re-request the same window when IB answers short
+
+    def day_chunks(self, day: datetime, key: Key) -> List[Tuple[datetime, datetime]]:
+        start = day.replace(hour=0, minute=0, second=0, microsecond=0)
+        step = timedelta(seconds=FIXED_CHUNK_S)
+        return [
+            (start + i * step, start + (i + 1) * step - timedelta(minutes=1))
+            for i in range(2)
+        ]
+
+    def repair_steps(self, key: Key) -> List[int]:
+        return list(FIXED_REPAIR_STEPS)
+
+    def window_s(self, key: Key) -> float:
+        return float(FIXED_CHUNK_S)
+
+    def observe(self, key: Key, requested_s: float, covered_s: float) -> None:
+        pass
+
+    def save(self) -> None:
+        pass
+
+
+@dataclass
+class WindowState:
+    window_s: float = float(FIXED_CHUNK_S)
+    honoured: int = 0  # consecutive fully honoured requests
+    requests: int = 0
+    short: int = 0
+    ceiling_s: float = 0.0  # smallest window IB answered short; 0 = unknown
+
+
+class AdaptivePlanner:
+    """Learns per (symbol, exchange) the largest window IB reliably honours.
+
+    Every response is compared with what was asked (``covered_s`` vs
+    ``requested_s``). A short answer shrinks the window to the span IB actually
+    returned and remembers the failed size as a ceiling; ``grow_after``
+    consecutive full answers grow it by ``growth`` without crossing the ceiling
+    (a long honoured streak lifts the ceiling to probe again). The day body (00:00–19:59) is then
+    split into as few windows of that size as possible. State is persisted as
+    JSON so later runs start from what was learned.
+    """
+
+    name = "adaptive"
+    retry_short = False
+
+    def __init__(
+        self,
+        state_path: Optional[str] = None,
+        *,
+        grow_after: int = 2,
+        growth: float = 1.5,
+        min_window_s: float = MIN_WINDOW_S,
+        max_window_s: float = MAX_WINDOW_S,
+        honoured_ratio: float = 0.98,
+        probe_after: int = 10,
+    ) -> None:
+        self.state_path = state_path
+        self.grow_after = grow_after
+        self.growth = growth
+        self.min_window_s = min_window_s
+        self.max_window_s = max_window_s
+        self.honoured_ratio = honoured_ratio
+        self.probe_after = probe_after
+        self._lock = threading.Lock()
+        self.state: Dict[Key, WindowState] = {}
+        if state_path and os.path.exists(state_path):
+            self._load(state_path)
+
+    def _load(self, path: str) -> None:
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                raw = json.load(fh)
+        except (OSError, ValueError) as e:
+            logger.warning("planner state unreadable (%s): %s", path, e)
+            return
+        for k, v in raw.items():
+            sym, _, exch = k.partition("@")
+            self.state[(sym, exch)] = WindowState(**v)
+
+    def save(self) -> None:
+        if not self.state_path:
+            return
+        with self._lock:
+            raw = {f"{s}@{e}": asdict(v) for (s, e), v in sorted(self.state.items())}
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(raw, fh, indent=2)
+        os.replace(tmp, self.state_path)
+
+    def window_s(self, key: Key) -> float:
+        with self._lock:
+            return self.state.setdefault(key, WindowState()).window_s
+
+    def observe(self, key: Key, requested_s: float, covered_s: float) -> None:
+        if requested_s <= 0:
+            return
+        with self._lock:
+            st = self.state.setdefault(key, WindowState())
+            st.requests += 1
+            if covered_s >= requested_s * self.honoured_ratio:
+                # Small requests (repairs, short last chunks) say little about the limit
+                if requested_s >= st.window_s * 0.5:
+                    st.honoured += 1
+                    if st.honoured >= self.grow_after:
+                        cap = self.max_window_s
+                        if st.ceiling_s and st.honoured < self.grow_after * self.probe_after:
+                            # don't grow into a window IB already cut short
+                            cap = min(cap, st.ceiling_s - 300)
+                        else:
+                            st.ceiling_s = 0.0  # long streak: probe above the old ceiling
+                        if cap > st.window_s:
+                            st.window_s = min(cap, st.window_s * self.growth)
+                            st.honoured = 0
+            else:
+                st.short += 1
+                st.honoured = 0
+                st.ceiling_s = requested_s if not st.ceiling_s else min(st.ceiling_s, requested_s)
+                # covered 0 says nothing about the size (empty market, pacing): halve
+                target = covered_s if covered_s > 0 else st.window_s / 2
+                st.window_s = max(self.min_window_s, min(st.window_s, target) // 300 * 300)
+
+    def day_chunks(self, day: datetime, key: Key) -> List[Tuple[datetime, datetime]]:
+        start = day.replace(hour=0, minute=0, second=0, microsecond=0)
+        body_min = int(BODY_END.total_seconds() // 60)
+        win_min = max(1, int(self.window_s(key) // 60))
+        n = -(-body_min // win_min)
+        size = -(-body_min // n)  # equal-sized chunks
+        out = []
+        for i in range(n):
+            s = start + timedelta(minutes=i * size)
+            e = min(start + timedelta(minutes=(i + 1) * size - 1), start + BODY_END - timedelta(minutes=1))
+            out.append((s, e))
+        return out
+
+    def repair_steps(self, key: Key) -> List[int]:
+        w = int(self.window_s(key))
+        steps = sorted({s for s in [w, *FIXED_REPAIR_STEPS] if s <= max(w, 300)}, reverse=True)
+        return steps
+
+
+def make_planner(kind: str, state_path: Optional[str] = None):
+    if kind == "fixed":
+        return FixedPlanner()
+    if kind == "adaptive":
+        return AdaptivePlanner(state_path)
+    raise ValueError(f"planner desconocido: {kind}")
+
+
+def default_state_path(lake_root: str) -> str:
+    return os.getenv("IB_PLANNER_STATE") or os.path.join(lake_root, ".state", "ibkr_planner.json")
+
+
+class RequestMetrics:
+    """Per (symbol, day) request counts so fewer requests per filled day can be shown."""
+
+    COLUMNS = ["symbol", "date", "planner", "window_s", "requests", "rows", "expected", "missing", "filled"]
+
+    def __init__(self) -> None:
+        self.rows: List[dict] = []
+
+    def record_day(
+        self,
+        symbol: str,
+        day: datetime,
+        *,
+        planner: str,
+        window_s: float,
+        requests: int,
+        rows: int,
+        expected: Optional[int],
+    ) -> None:
+        missing = max(0, expected - rows) if expected else 0
+        self.rows.append(
+            {
+                "symbol": symbol,
+                "date": day.date(),
+                "planner": planner,
+                "window_s": float(window_s),
+                "requests": int(requests),
+                "rows": int(rows),
+                "expected": int(expected or 0),
+                "missing": int(missing),
+                "filled": bool(expected) and missing == 0,
+            }
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.rows, columns=self.COLUMNS)
+
+    def summary(self) -> Dict[str, float]:
+        df = self.to_frame()
+        filled = df[df["filled"]]
+        return {
+            "days": len(df),
+            "filled_days": len(filled),
+            "requests": int(df["requests"].sum()) if len(df) else 0,
+            "requests_per_filled_day": float(filled["requests"].mean()) if len(filled) else 0.0,
+        }
+
+    def write(self, path: str) -> str:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        df = self.to_frame()
+        if path.endswith(".csv"):
+            df.to_csv(path, index=False)
+        else:
+            df.to_parquet(path, index=False)
+        return path
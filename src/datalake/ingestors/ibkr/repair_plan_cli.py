@@ -0,0 +1,101 @@
+import argparse
+import logging
+import os
+
+import pandas as pd
+
+from datalake.commands.repair_plan import execute_plan, gaps_from_coverage, plan_requests
+from datalake.ingestors.ibkr.ingest_cli import BAR_SIZES
+from datalake.tools.coverage import coverage_matrix
+
+logger = logging.getLogger("ibkr.repair_plan")
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="Reparación por lotes de gaps IBKR (una conexión, un write por mes)")
+    ap.add_argument("--coverage", help="Reporte Parquet de datalake-coverage; si falta se calcula")
+    ap.add_argument("--symbols", help="Lista separada por comas (filtra el reporte)")
+    ap.add_argument("--from", dest="date_from", help="YYYY-MM-DD (UTC)")
+    ap.add_argument("--to", dest="date_to", help="YYYY-MM-DD (UTC)")
+    ap.add_argument("--tf", choices=list(BAR_SIZES.keys()), default="M1")
+    ap.add_argument("--exchange", default=os.getenv("IB_EXCHANGE_CRYPTO", "PAXOS"))
+    ap.add_argument(
+        "--what-to-show",
+        dest="what",
+        default=os.getenv("IB_WHAT_TO_SHOW", "AGGTRADES"),
+    )
+    ap.add_argument(
+        "--use-rth",
+        dest="use_rth",
+        choices=[0, 1],
+        type=int,
+        default=int(os.getenv("IB_USE_RTH", "0")),
+    )
+    ap.add_argument("--lake-root", default=os.getenv("LAKE_ROOT", os.getcwd()))
+    ap.add_argument("--max-span-hours", type=float, default=None, help="Ventana máxima por request")
+    ap.add_argument("--dry-run", action="store_true", help="Solo mostrar el plan")
+    ap.add_argument(
+        "--log-level",
+        choices=["INFO", "DEBUG"],
+        default="INFO",
+        help="Nivel de logging",
+    )
+    return ap
+
+
+def run(args) -> list:
+    symbols = [s.strip() for s in args.symbols.split(",") if s.strip()] if args.symbols else None
+    if args.coverage:
+        report = pd.read_parquet(args.coverage)
+        report = report[report["timeframe"] == args.tf]
+        if symbols:
+            report = report[report["symbol"].isin(symbols)]
+        if args.date_from:
+            report = report[report["date"] >= pd.Timestamp(args.date_from).date()]
+        if args.date_to:
+            report = report[report["date"] <= pd.Timestamp(args.date_to).date()]
+    else:
+        report = coverage_matrix(
+            args.lake_root,
+            sources=["ibkr"],
+            timeframes=[args.tf],
+            symbols=symbols,
+            date_from=args.date_from,
+            date_to=args.date_to,
+        )
+
+    gaps = gaps_from_coverage(report, args.lake_root)
+    span = None
+    if args.max_span_hours:
+        span = {args.tf: pd.Timedelta(hours=args.max_span_hours).to_pytimedelta()}
+    plan = plan_requests(gaps, max_span=span)
+    logger.info(
+        "plan: runs=%d requests=%d barras_faltantes=%d",
+        len(gaps), len(plan), sum(r.missing_bars for r in plan),
+    )
+    for r in plan:
+        logger.info("  %s %s %s → %s (%ds, %d runs)", r.symbol, r.timeframe, r.start, r.end, r.duration_seconds, len(r.runs))
+    if args.dry_run:
+        return []
+    return execute_plan(
+        plan,
+        lake_root=args.lake_root,
+        exchange=args.exchange,
+        what_to_show=args.what,
+        use_rth=bool(args.use_rth),
+    )
+
+
+def main(argv=None) -> int:
+    args = _build_parser().parse_args(argv)
+    level = getattr(logging, args.log_level.upper())
+    logging.basicConfig(level=level)
+    logger.setLevel(level)
+    logging.getLogger("ibkr.downloader").setLevel(level)
+    for path in run(args):
+        print(f"OK → {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
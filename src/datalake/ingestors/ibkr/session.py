@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from ib_insync import IB
+
+from datalake.utils.pacing import attach_ib_pacing_feedback, governor_for
+
+logger = logging.getLogger("ibkr.session")
+
+
+@dataclass
+class SessionConfig:
+    host: str = field(default_factory=lambda: os.getenv("IB_HOST", "127.0.0.1"))
+    port: int = field(default_factory=lambda: int(os.getenv("IB_PORT", "7497")))
+    base_client_id: int = field(default_factory=lambda: int(os.getenv("IB_CLIENT_ID", "1")))
+    size: int = field(default_factory=lambda: int(os.getenv("IB_POOL_SIZE", "1")))
+    timeout: float = 15.0
+
+
+class IBSessionPool:
+    """Small pool of connected ``IB`` clients reused across ingest/repair/fetch paths.
+
+    Each slot owns a distinct client id (``base_client_id + i``) so several
+    sessions can be open against the same TWS/Gateway. Sessions are
+    health-checked (``isConnected`` + ``reqCurrentTime``) when checked out and
+    transparently reconnected if TWS dropped them. ``factory`` builds the
+    ``IB`` objects and can be swapped in tests.
+    """
+
+    def __init__(self, cfg: Optional[SessionConfig] = None, *, factory: Callable[[], IB] = IB) -> None:
+        self.cfg = cfg or SessionConfig()
+        self._factory = factory
+        self._cond = threading.Condition()
+        self._idle: List[Tuple[int, IB]] = []
+        self._free_ids = [self.cfg.base_client_id + i for i in range(max(1, self.cfg.size))]
+        self._busy = 0
+        self.connects = 0
+        self.reconnects = 0
+
+    def _connect(self, client_id: int) -> IB:
+        ib = self._factory()
+        attach_ib_pacing_feedback(ib, governor_for("ibkr"))
+        ib.connect(self.cfg.host, self.cfg.port, clientId=client_id, timeout=self.cfg.timeout)
+        self.connects += 1
+        logger.info("IB session connected clientId=%s", client_id)
+        return ib
+
+    @staticmethod
+    def _healthy(ib: IB) -> bool:
+        try:
+            if not ib.isConnected():
+                return False
+            ib.reqCurrentTime()
+            return True
+        except Exception:
+            return False
+
+    def _checkout(self) -> Tuple[int, Optional[IB]]:
+        with self._cond:
+            while not self._idle and not self._free_ids:
+                self._cond.wait()
+            self._busy += 1
+            if self._idle:
+                return self._idle.pop()
+            return self._free_ids.pop(0), None
+
+    def _checkin(self, client_id: int, ib: Optional[IB]) -> None:
+        with self._cond:
+            self._busy -= 1
+            if ib is None:
+                self._free_ids.append(client_id)
+            else:
+                self._idle.append((client_id, ib))
+            self._cond.notify()
+
+    @contextmanager
+    def session(self) -> Iterator[IB]:
+        """Check out a healthy connected ``IB``; it goes back to the pool on exit."""
+        client_id, ib = self._checkout()
+        try:
+            if ib is not None and not self._healthy(ib):
+                logger.warning("IB session clientId=%s unhealthy, reconnecting", client_id)
+                try:
+                    ib.disconnect()
+                except Exception:
+                    pass
+                ib = None
+                self.reconnects += 1
+            if ib is None:
+                ib = self._connect(client_id)
+        except BaseException:
+            self._checkin(client_id, None)
+            raise
+        try:
+            yield ib
+        finally:
+            self._checkin(client_id, ib)
+
+    def close(self) -> None:
+        with self._cond:
+            idle, self._idle = self._idle, []
+            for client_id, ib in idle:
+                try:
+                    ib.disconnect()
+                except Exception:
+                    pass
+                self._free_ids.append(client_id)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "idle": len(self._idle),
+                "busy": self._busy,
+                "connects": self.connects,
+                "reconnects": self.reconnects,
+            }
+
+
+_POOLS: Dict[Tuple[str, int, int], IBSessionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def shared_pool(cfg: Optional[SessionConfig] = None) -> IBSessionPool:
+    """Process-wide pool for ``(host, port, base_client_id)``; closed at exit."""
+    cfg = cfg or SessionConfig()
+    key = (cfg.host, cfg.port, cfg.base_client_id)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = IBSessionPool(cfg)
+            _POOLS[key] = pool
+        return pool
+
+
+@atexit.register
+def close_all() -> None:
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+    for pool in pools:
+        pool.close()
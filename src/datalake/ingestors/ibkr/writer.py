@@ -3,8 +3,9 @@ from __future__ import annotations
 import os
 import logging
 import pandas as pd
-import pyarrow as pa
-import pyarrow.parquet as pq
+
+from datalake.utils.metrics import annotate, enabled, timed
+from datalake.write.partition import merge_write
 
 logger = logging.getLogger("ibkr.writer")
 
@@ -123,13 +124,15 @@ def _ensure_synth(df: pd.DataFrame, has_synth: bool) -> pd.DataFrame:
     return df
 
 
+@timed("ibkr.write_month", labels=("symbol",))
 def write_month(pdf_new: pd.DataFrame, symbol: str, cfg) -> str:
     """Escribe/actualiza el parquet mensual para ``symbol`` evitando choques de tipos.
 
     - Lee el archivo existente como un solo parquet (no dataset) para evitar
-      columnas de partición.
+      columnas de partición, bajo el lock de la partición (``merge_write``).
     - Normaliza columnas de texto y alinea ``is_synth`` en ambos DataFrames.
-    - Deduplica por ``ts`` y escribe desactivando dictionary encoding.
+    - Deduplica por ``ts`` y escribe desactivando dictionary encoding, de
+      forma atómica (temporal + ``os.replace``).
     """
     import pathlib
 
@@ -155,57 +158,55 @@ def write_month(pdf_new: pd.DataFrame, symbol: str, cfg) -> str:
         / f"year={year}"
         / f"month={month:02d}"
     )
-    base.mkdir(parents=True, exist_ok=True)
     dest_file = base / f"part-{year}-{month:02d}.parquet"
+    seen: dict = {}
 
-    existing_pdf: pd.DataFrame | None = None
-    if dest_file.exists():
-        try:
-            existing_tbl = pq.ParquetFile(dest_file).read()
-        except Exception:
-            existing_tbl = pq.read_table(dest_file, use_legacy_dataset=True)
-        existing_pdf = existing_tbl.to_pandas()
-
-    pdf_new = _to_string(pdf_new)
-    if existing_pdf is not None:
-        existing_pdf = _to_string(existing_pdf)
-
-    has_synth = ("is_synth" in pdf_new.columns) or (
-        existing_pdf is not None and "is_synth" in existing_pdf.columns
-    )
-    pdf_new = _ensure_synth(pdf_new, has_synth)
-    if existing_pdf is not None:
-        existing_pdf = _ensure_synth(existing_pdf, has_synth)
+    def _merge(existing_pdf: pd.DataFrame | None) -> pd.DataFrame:
+        new = _to_string(pdf_new.copy())
+        if existing_pdf is not None:
+            existing_pdf = _to_string(existing_pdf)
 
-    target_cols = COLS_BASE + (["is_synth"] if has_synth else [])
+        has_synth = ("is_synth" in new.columns) or (
+            existing_pdf is not None and "is_synth" in existing_pdf.columns
+        )
+        new = _ensure_synth(new, has_synth)
+        if existing_pdf is not None:
+            existing_pdf = _ensure_synth(existing_pdf, has_synth)
 
-    for c in target_cols:
-        if c not in pdf_new.columns:
-            pdf_new[c] = pd.Series([None] * len(pdf_new))
-    pdf_new = pdf_new[target_cols]
+        target_cols = COLS_BASE + (["is_synth"] if has_synth else [])
 
-    if existing_pdf is not None:
         for c in target_cols:
-            if c not in existing_pdf.columns:
-                existing_pdf[c] = pd.Series([None] * len(existing_pdf))
-        existing_pdf = existing_pdf[target_cols]
-
-    if existing_pdf is not None and len(existing_pdf) > 0:
-        merged = pd.concat([existing_pdf, pdf_new], ignore_index=True)
-    else:
-        merged = pdf_new.copy()
+            if c not in new.columns:
+                new[c] = pd.Series([None] * len(new))
+        new = new[target_cols]
+
+        if existing_pdf is not None:
+            for c in target_cols:
+                if c not in existing_pdf.columns:
+                    existing_pdf[c] = pd.Series([None] * len(existing_pdf))
+            existing_pdf = existing_pdf[target_cols]
+
+        if existing_pdf is not None and len(existing_pdf) > 0:
+            merged = pd.concat([existing_pdf, new], ignore_index=True)
+        else:
+            merged = new.copy()
 
-    merged["ts"] = pd.to_datetime(merged["ts"], utc=True)
-    merged = merged.sort_values("ts").drop_duplicates("ts", keep="last")
+        merged["ts"] = pd.to_datetime(merged["ts"], utc=True)
+        merged = merged.sort_values("ts").drop_duplicates("ts", keep="last")
+        seen.update(existing=existing_pdf, new=new, merged=merged)
+        return merged
 
-    table = pa.Table.from_pandas(merged, preserve_index=False)
-    pq.write_table(
-        table,
+    # Lock por partición + temporal/os.replace: escrituras concurrentes del mismo mes no se pisan
+    merge_write(
         dest_file,
+        _merge,
         compression="zstd",
         version="2.6",
         use_dictionary=False,
     )
+    existing_pdf, pdf_new, merged = seen["existing"], seen["new"], seen["merged"]
+    if enabled():
+        annotate(rows=len(merged), files=1, bytes=os.path.getsize(dest_file))
 
     if cfg and hasattr(cfg, "logger"):
         def _rng(df: pd.DataFrame) -> tuple:
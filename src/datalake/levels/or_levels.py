@@ -3,8 +3,8 @@ import pandas as pd
 from datalake.config import LakeConfig
 from datalake.aggregates.loader import load_m1_range
 from pathlib import Path
-import pyarrow as pa
-import pyarrow.parquet as pq
+from datalake.utils.metrics import timed
+from datalake.write.partition import merge_write
 
 
 def _levels_dest(cfg: LakeConfig, symbol: str, year: int) -> Path:
@@ -16,6 +16,7 @@ def _parse_hhmm(hhmm: str) -> tuple[int,int]:
     hh, mm = hhmm.split(':'); return int(hh), int(mm)
 
 
+@timed("levels.or_levels", labels=("symbol", "or_window", "tz"), rows=len)
 def build_or_levels(symbol: str, start_utc: str, end_utc: str, *, or_window: str = '00:00-01:00', tz: str = 'UTC', cfg: LakeConfig | None = None) -> pd.DataFrame:
     cfg = cfg or LakeConfig()
     df = load_m1_range(symbol, start_utc, end_utc, cfg)
@@ -34,10 +35,10 @@ def build_or_levels(symbol: str, start_utc: str, end_utc: str, *, or_window: str
         start_local = pd.Timestamp(year=day_local.dt.year.iloc[0], month=day_local.dt.month.iloc[0], day=day_local.dt.day.iloc[0], hour=sh, minute=sm, tz=tz)
         end_local   = pd.Timestamp(year=day_local.dt.year.iloc[0], month=day_local.dt.month.iloc[0], day=day_local.dt.day.iloc[0], hour=eh, minute=em, tz=tz)
         mask_or = (day_local >= start_local) & (day_local < end_local)
-        or_slice = df.loc[mask_or.values]
+        or_slice = day_df.loc[mask_or.values]
         if or_slice.empty: continue
         or_high = float(or_slice['high'].max()); or_low = float(or_slice['low'].min())
-        mask_after = (day_local >= end_local); after = df.loc[mask_after.values]
+        mask_after = (day_local >= end_local); after = day_df.loc[mask_after.values]
         break_dir = 'NONE'; break_ts = pd.NaT; retest_ts = pd.NaT; retest_price = float('nan')
         if not after.empty:
             up = after[after['close'] > or_high]; dn = after[after['close'] < or_low]
@@ -69,15 +70,17 @@ def write_year_levels(df: pd.DataFrame, symbol: str, cfg: LakeConfig) -> Path:
     df = df.copy(); df['year'] = pd.to_datetime(df['session_date']).dt.year
     out: Path | None = None
     for y, chunk in df.groupby('year'):
-        dest = _levels_dest(cfg, symbol, int(y)); dest.parent.mkdir(parents=True, exist_ok=True)
-        if dest.exists():
-            existing = pq.read_table(dest).to_pandas()
-            merged = (pd.concat([existing, chunk], ignore_index=True)
-                        .drop_duplicates(['session_date','symbol'], keep='last')
-                        .sort_values(['session_date','symbol']).reset_index(drop=True))
-        else:
-            merged = chunk.sort_values(['session_date','symbol']).reset_index(drop=True)
-        table = pa.Table.from_pandas(merged.drop(columns=['year'], errors='ignore'), preserve_index=False)
-        tmp = dest.with_suffix('.tmp.parquet'); pq.write_table(table, tmp, compression=LakeConfig().compression); tmp.replace(dest)
+        dest = _levels_dest(cfg, symbol, int(y))
+
+        def _merge(existing: pd.DataFrame | None, chunk=chunk) -> pd.DataFrame:
+            if existing is not None:
+                merged = (pd.concat([existing, chunk], ignore_index=True)
+                            .drop_duplicates(['session_date','symbol'], keep='last')
+                            .sort_values(['session_date','symbol']).reset_index(drop=True))
+            else:
+                merged = chunk.sort_values(['session_date','symbol']).reset_index(drop=True)
+            return merged.drop(columns=['year'], errors='ignore')
+
+        merge_write(dest, _merge, compression=LakeConfig().compression)
         out = dest
     return out
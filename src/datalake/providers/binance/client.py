@@ -1,134 +1,325 @@
 from __future__ import annotations
-import time
-from typing import Literal, Optional
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Dict, List, Literal, Optional, Tuple
 from datetime import datetime, timezone, timedelta
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
 
+try:  # decoder opcional (~1.5x más rápido que json); mismo resultado
+    import orjson as _orjson
+except ImportError:  # pragma: no cover - orjson no instalado
+    _orjson = None
+
+from datalake.read.schemas import BINANCE_EXTENDED, cast_extended
+from datalake.utils.metrics import annotate, span, timed
+from datalake.utils.pacing import PacingGovernor, governor_for, parse_retry_after
+
 UTC = timezone.utc
 
+# Weight de /api/v3/klines (Spot)
+KLINES_WEIGHT = 2
+
+# Límite REQUEST_WEIGHT por minuto y por IP según región
+WEIGHT_LIMITS = {
+    'global': 6000,
+    'us': 1200,
+}
+USED_WEIGHT_HEADER = 'X-MBX-USED-WEIGHT-1M'
+# Fracción del límite que nos permitimos usar (margen para otros clientes en la IP)
+DEFAULT_WEIGHT_FRACTION = float(os.getenv('BINANCE_WEIGHT_FRACTION', '0.8'))
+
+_WEIGHT_FRACTION: Dict[str, float] = {}
+
+# Páginas concurrentes por llamada a fetch_klines (acotadas además por el budget de weight)
+DEFAULT_MAX_WORKERS = int(os.getenv('BINANCE_MAX_WORKERS', '4'))
+MAX_BARS_PER_REQUEST = 1000  # límite de Binance por request
+
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+
 BASE_URLS = {
     'global': 'https://api.binance.com',
     'us': 'https://api.binance.us',
 }
 
-_INTERVALS = {
+# Códigos de intervalo de la API y duración en minutos por TF del lake
+INTERVALS = {
     'M1': '1m',
     'M5': '5m',
     'M15': '15m',
     'M30': '30m',
 }
 
-_STEP_MINUTES = {
+STEP_MINUTES = {
     'M1': 1,
     'M5': 5,
     'M15': 15,
     'M30': 30,
 }
 
+# Campos extendidos de /api/v3/klines → columnas del lake (ver read.schemas)
+EXTENDED_FIELDS = {
+    'qav': 'quote_volume',
+    'numTrades': 'trades',
+    'takerBuyBase': 'taker_buy_base',
+    'takerBuyQuote': 'taker_buy_quote',
+}
+
+# Posiciones en cada kline de /api/v3/klines (openTime=0, closeTime=6, numTrades=8, ignore=11)
+_FLOAT_IDX = [1, 2, 3, 4, 5, 7, 9, 10]
+_FLOAT_COLS = ['open', 'high', 'low', 'close', 'volume', 'quote_volume', 'taker_buy_base', 'taker_buy_quote']
+
+# Página parseada: (openTime ms int64, floats (n, 8) float64, numTrades int64)
+KlinePage = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
 class BinanceHTTPError(Exception):
     pass
 
 def _to_ms(dt: datetime) -> int:
     return int(dt.timestamp() * 1000)
 
-def _rate_limited_get(url: str, params: dict, max_retries: int = 5, timeout: int = 30) -> requests.Response:
+def http_session() -> requests.Session:
+    """Session HTTP compartida (keep-alive + pool de conexiones) para todo el proceso."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            sess = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(DEFAULT_MAX_WORKERS, 10))
+            sess.mount('https://', adapter)
+            sess.mount('http://', adapter)
+            _SESSION = sess
+        return _SESSION
+
+
+def configure_weight_budget(
+    region: Literal['global','us'] = 'global',
+    *,
+    fraction: Optional[float] = None,
+    max_weight: Optional[float] = None,
+    rate_per_sec: Optional[float] = None,
+) -> PacingGovernor:
+    """Ajusta el budget de weight del governor de ``region``.
+
+    ``max_weight`` explícito tiene prioridad; si no, se usa ``fraction`` del
+    límite oficial de la región (``BINANCE_WEIGHT_FRACTION`` por defecto).
+    """
+    if fraction is not None:
+        _WEIGHT_FRACTION[region] = float(fraction)
+    frac = _WEIGHT_FRACTION.setdefault(region, DEFAULT_WEIGHT_FRACTION)
+    target = float(max_weight) if max_weight is not None else WEIGHT_LIMITS[region] * frac
+    gov = governor_for(f"binance.{region}")
+    cfg = replace(gov.cfg, max_weight=target, window_s=60.0)
+    if rate_per_sec is not None:
+        cfg = replace(cfg, rate_per_sec=float(rate_per_sec), burst=1.0 if rate_per_sec > 0 else cfg.burst)
+    gov.reconfigure(cfg)
+    return gov
+
+
+def binance_governor(region: Literal['global','us'] = 'global') -> PacingGovernor:
+    if region not in _WEIGHT_FRACTION:
+        return configure_weight_budget(region)
+    return governor_for(f"binance.{region}")
+
+
+def weight_budget(region: Literal['global','us'] = 'global') -> dict:
+    """Budget vivo de weight para ``region`` (límite, objetivo, usado y restante)."""
+    snap = binance_governor(region).snapshot()
+    target = snap['max_weight']
+    return {
+        'region': region,
+        'limit': WEIGHT_LIMITS[region],
+        'target': target,
+        'used': snap['used_weight'],
+        'server_used': snap['server_used_weight'],
+        'remaining': max(0.0, target - snap['used_weight']),
+        'requests': snap['requests'],
+        'throttles': snap['throttles'],
+        'slept_s': snap['slept_s'],
+    }
+
+
+def _observe_weight(gov: PacingGovernor, r: requests.Response) -> None:
+    used = r.headers.get(USED_WEIGHT_HEADER)
+    if used is None:
+        return
+    try:
+        gov.observe_used_weight(float(used))
+    except ValueError:
+        pass
+
+
+def _rate_limited_get(
+    url: str,
+    params: dict,
+    max_retries: int = 5,
+    timeout: int = 30,
+    weight: int = KLINES_WEIGHT,
+    region: Literal['global','us'] = 'global',
+) -> requests.Response:
+    gov = binance_governor(region)
     for i in range(max_retries):
-        r = requests.get(url, params=params, timeout=timeout)
-        if r.status_code == 429:
-            sleep_s = min(2 ** i, 10)
-            time.sleep(sleep_s)
+        gov.acquire(weight)
+        r = http_session().get(url, params=params, timeout=timeout)
+        _observe_weight(gov, r)
+        # 429 = rate limit, 418 = IP baneada temporalmente; ambos traen Retry-After
+        if r.status_code in (418, 429):
+            gov.on_throttle(parse_retry_after(r.headers.get("Retry-After")))
             continue
         if 200 <= r.status_code < 300:
+            gov.on_success()
             return r
         # 5xx retry suave
         if 500 <= r.status_code < 600:
-            time.sleep(1.5)
+            gov.on_throttle()
             continue
         # Errores duros
         raise BinanceHTTPError(f"HTTP {r.status_code}: {r.text}")
     raise BinanceHTTPError(f"Rate limit persistente: {r.status_code} {r.text}")
 
+def plan_pages(
+    start_dt: datetime,
+    end_dt: datetime,
+    tf: str,
+    max_bars: int = MAX_BARS_PER_REQUEST,
+) -> List[Tuple[datetime, datetime, int]]:
+    """Parte [start_dt, end_dt] en páginas de hasta ``max_bars`` velas.
+
+    Las páginas se empaquetan de forma contigua sobre todo el rango (cruzando
+    límites de día/mes), así que un rango de N velas cuesta ceil(N/max_bars)
+    requests. Devuelve ``(win_start, win_end, expected_bars)`` con ambos
+    extremos inclusivos.
+    """
+    step = timedelta(minutes=STEP_MINUTES[tf])
+    windows: List[Tuple[datetime, datetime, int]] = []
+    cursor = start_dt
+    while cursor <= end_dt:
+        win_end = min(end_dt, cursor + step * (max_bars - 1))
+        expected = int((win_end - cursor) / step) + 1
+        windows.append((cursor, win_end, expected))
+        cursor = win_end + step
+    return windows
+
+
+def _loads(raw: bytes):
+    return _orjson.loads(raw) if _orjson is not None else json.loads(raw)
+
+
+def parse_klines(data: list) -> KlinePage:
+    """Lista JSON de klines → arrays NumPy, sin DataFrame intermedio.
+
+    Una sola matriz ``object`` y un ``astype`` por bloque: los precios llegan
+    como strings y NumPy los convierte a float64 en un único paso (en lugar de
+    ``pd.to_numeric`` columna a columna). Si algún campo viene vacío o no es
+    numérico se cae a ``pd.to_numeric(errors='coerce')``: ese valor queda NaN
+    y las filas sin ``openTime`` válido se descartan.
+    """
+    if not data:
+        return np.empty(0, np.int64), np.empty((0, len(_FLOAT_IDX))), np.empty(0, np.int64)
+    arr = np.array(data, dtype=object)
+    try:
+        return arr[:, 0].astype(np.int64), arr[:, _FLOAT_IDX].astype(np.float64), arr[:, 8].astype(np.int64)
+    except (TypeError, ValueError):
+        return _parse_klines_coerce(arr)
+
+
+def _parse_klines_coerce(arr: np.ndarray) -> KlinePage:
+    def num(i: int) -> np.ndarray:
+        return pd.to_numeric(pd.Series(arr[:, i]), errors='coerce').to_numpy(dtype=np.float64)
+
+    open_ms = num(0)
+    ok = ~np.isnan(open_ms)
+    floats = np.column_stack([num(i) for i in _FLOAT_IDX])
+    return open_ms[ok].astype(np.int64), floats[ok], num(8)[ok]
+
+
+def klines_frame(pages: List[KlinePage], start_ms: int, end_ms: int) -> pd.DataFrame:
+    """Une páginas en un único DataFrame: dedupe por ``ts``, orden y clip [start_ms, end_ms].
+
+    Vacío o no, sale por el mismo camino: mismas columnas y dtypes.
+    """
+    if not pages:
+        pages = [parse_klines([])]
+    open_ms = np.concatenate([p[0] for p in pages])
+    # np.unique ordena y devuelve la primera aparición: dedupe + sort en un paso
+    uniq, first = np.unique(open_ms, return_index=True)
+    keep = first[(uniq >= start_ms) & (uniq <= end_ms)]
+    floats = np.concatenate([p[1] for p in pages])[keep]
+    trades = np.concatenate([p[2] for p in pages])[keep]
+    df = pd.DataFrame({'ts': pd.to_datetime(open_ms[keep], unit='ms', utc=True)})
+    for n, c in enumerate(_FLOAT_COLS):
+        df[c] = floats[:, n]
+    df['trades'] = trades
+    return cast_extended(df[['ts','open','high','low','close','volume', *BINANCE_EXTENDED]])
+
+
+def _fetch_window(
+    url: str,
+    symbol: str,
+    tf: str,
+    window: Tuple[datetime, datetime, int],
+    region: str,
+) -> KlinePage:
+    win_start, win_end, expected = window
+    params = {
+        'symbol': symbol,
+        'interval': INTERVALS[tf],
+        'startTime': _to_ms(win_start),
+        'endTime': _to_ms(win_end),
+        'limit': min(MAX_BARS_PER_REQUEST, expected)
+    }
+    with span("binance.klines_page", symbol=symbol, tf=tf, region=region) as sp:
+        r = _rate_limited_get(url, params, region=region)
+        data = _loads(r.content)
+        sp.set(bytes=len(r.content), rows=len(data), requests=1)
+    if not isinstance(data, list):
+        raise BinanceHTTPError(f"Respuesta inesperada: {data}")
+    # Sin clip por página: klines_frame recorta una sola vez sobre el total
+    return parse_klines(data)
+
+
+@timed("binance.fetch_klines", labels=("symbol", "tf", "region"), rows=len)
 def fetch_klines(
     symbol: str,
     start_dt: datetime,
     end_dt: datetime,
     tf: Literal['M1','M5','M15','M30'] = 'M1',
-    region: Literal['global','us'] = 'global'
+    region: Literal['global','us'] = 'global',
+    *,
+    max_workers: Optional[int] = None,
+    base_url: Optional[str] = None,
 ) -> pd.DataFrame:
-    if tf not in _INTERVALS:
+    """Descarga klines [start_dt, end_dt] (ambos inclusivos, ``ts`` = openTime UTC).
+
+    Las ventanas de paginación se calculan por adelantado y se piden en paralelo
+    (hasta ``max_workers``) sobre una Session con keep-alive; cada página pasa
+    por el governor de la región, así que la concurrencia respeta el budget de
+    weight. ``base_url`` permite apuntar a otro host (tests, mirrors). Cada
+    página se parsea a arrays (``parse_klines``) y el DataFrame se arma una
+    sola vez al final (``klines_frame``).
+    """
+    if tf not in INTERVALS:
         raise ValueError(f"Intervalo no soportado para Binance: {tf}")
     if start_dt.tzinfo is None or end_dt.tzinfo is None:
         raise ValueError("start_dt y end_dt deben ser tz-aware UTC")
     if end_dt < start_dt:
-        return pd.DataFrame(columns=['ts','open','high','low','close','volume'])
-
-    step_minutes = _STEP_MINUTES[tf]
-    max_bars = 1000  # límite de Binance por request
-    # Ventana máxima en minutos por request
-    max_minutes_per_req = max_bars * step_minutes
-
-    base_url = BASE_URLS[region]
-    url = f"{base_url}/api/v3/klines"
+        return klines_frame([], _to_ms(start_dt), _to_ms(end_dt))
 
-    out = []
-    cursor = start_dt
-    # Protección anti-bucle: máximo número de requests razonable por día
-    max_requests = 10
-    requests_done = 0
-
-    while cursor <= end_dt and requests_done < max_requests:
-        requests_done += 1
-        # Sub-ventana [cursor, win_end]
-        win_end = min(end_dt, cursor + timedelta(minutes=max_minutes_per_req - step_minutes))
-        # Número esperado de barras en esta sub-ventana
-        expected = int(((win_end - cursor).total_seconds() // 60) / step_minutes) + 1
-        params = {
-            'symbol': symbol,
-            'interval': _INTERVALS[tf],
-            'startTime': _to_ms(cursor),
-            'endTime': _to_ms(win_end),
-            'limit': min(max_bars, expected)
-        }
-        r = _rate_limited_get(url, params)
-        data = r.json()
-        if not isinstance(data, list):
-            raise BinanceHTTPError(f"Respuesta inesperada: {data}")
-
-        if not data:
-            # Si no hubo datos, avanzar la ventana para evitar estancarse
-            cursor = win_end + timedelta(minutes=step_minutes)
-            continue
+    url = f"{base_url or BASE_URLS[region]}/api/v3/klines"
 
-        cols = [
-            'openTime','open','high','low','close','volume','closeTime',
-            'qav','numTrades','takerBuyBase','takerBuyQuote','ignore'
-        ]
-        df = pd.DataFrame(data, columns=cols)
-        if df.empty:
-            cursor = win_end + timedelta(minutes=step_minutes)
-            continue
+    # Ventanas precalculadas: el número de requests está acotado por el rango
+    windows = plan_pages(start_dt, end_dt, tf)
+    annotate(requests=len(windows))
 
-        df['ts'] = pd.to_datetime(df['openTime'], unit='ms', utc=True)
-        for c in ('open','high','low','close','volume'):
-            df[c] = pd.to_numeric(df[c], errors='coerce')
-        df = df[['ts','open','high','low','close','volume']]
-        # Clip de seguridad (por si Binance devolvió de más)
-        df = df[(df['ts'] >= cursor) & (df['ts'] <= win_end)]
-        out.append(df)
-
-        # Avanzar cursor a la siguiente ventana (según step) después de win_end
-        cursor = win_end + timedelta(minutes=step_minutes)
-
-    if not out:
-        return pd.DataFrame(columns=['ts','open','high','low','close','volume'])
-
-    res = (
-        pd.concat(out, ignore_index=True)
-        .drop_duplicates(subset=['ts'])
-        .sort_values('ts')
-        .reset_index(drop=True)
-    )
-    # Clip final absoluto
-    res = res[(res['ts'] >= start_dt) & (res['ts'] <= end_dt)].reset_index(drop=True)
-    return res
+    workers = min(len(windows), max_workers or DEFAULT_MAX_WORKERS)
+    if workers <= 1:
+        pages = [_fetch_window(url, symbol, tf, w, region) for w in windows]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='klines') as pool:
+            pages = list(pool.map(lambda w: _fetch_window(url, symbol, tf, w, region), windows))
+    return klines_frame(pages, _to_ms(start_dt), _to_ms(end_dt))
@@ -1,29 +1,89 @@
 from __future__ import annotations
 import os, glob
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from typing import List, Optional
 
+from datalake.utils.metrics import annotate, enabled, timed
+
+from .plan import FileRead, ReadPlan, prune_months, row_groups_in_range, stage, to_utc
+from .schemas import project_columns
+
 LAYOUT = "data/source={source}/market={market}/timeframe={tf}/symbol={symbol}/year=*/month=*/part-*.parquet"
 
 def _resolve_paths(lake_root: str, source: str, market: str, tf: str, symbol: str) -> List[str]:
     pat = os.path.join(lake_root, LAYOUT.format(source=source, market=market, tf=tf, symbol=symbol))
     return sorted(glob.glob(pat))
 
-def read_range_df(lake_root: str, *, market: str, tf: str, symbol: str, date_from: str, date_to: str, source: str = "ibkr") -> pd.DataFrame:
+def _read_projected(path: str, columns: Optional[List[str]], entry: Optional[FileRead] = None,
+                    start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """Lee ``path`` proyectado y solo los row groups cuyo ``ts`` solapa [start, end)."""
+    pf = pq.ParquetFile(path)
+    names = pf.schema_arrow.names
+    cols = project_columns(names, columns)
+    md = pf.metadata
+    groups = list(range(md.num_row_groups))
+    if "ts" in names and pa.types.is_timestamp(pf.schema_arrow.field("ts").type):
+        groups = row_groups_in_range(md, pf.schema_arrow.get_field_index("ts"), start, end)
+    if len(groups) == md.num_row_groups:
+        df = pf.read(columns=cols).to_pandas()
+    else:
+        df = pf.read_row_groups(groups, columns=cols).to_pandas()
+    if entry is not None:
+        idx = [names.index(c) for c in cols]
+        entry.row_groups, entry.row_groups_total = len(groups), md.num_row_groups
+        entry.bytes = sum(md.row_group(g).column(i).total_compressed_size for g in groups for i in idx)
+        entry.rows = len(df)
+    return df
+
+@timed("read.range_df", labels=("source", "tf", "symbol"), rows=len)
+def read_range_df(lake_root: str, *, market: str, tf: str, symbol: str, date_from: str, date_to: str, source: str = "ibkr", columns: Optional[List[str]] = None, explain: bool = False) -> pd.DataFrame:
     """
     Lee datos del lake y DEVUELVE por contrato global un DataFrame con:
       - Rango temporal half-open: [date_from, date_to) (fin EXCLUSIVO)
       - Columna ts como datetime64[ns, UTC]
       - Timestamps ordenados y SIN duplicados (drop_duplicates por 'ts')
 
+    ``columns`` proyecta la lectura (``ts`` siempre se incluye; las pedidas que
+    un archivo no tenga salen como NA). Sin ``columns`` se leen todas salvo los
+    campos extendidos de Binance (``schemas.BINANCE_EXTENDED``), que solo se
+    cargan si se piden.
+
+    Solo se abren las particiones mensuales que solapan el rango y, dentro de
+    cada una, solo los row groups cuyas estadísticas de ``ts`` lo solapan
+    (los writers cortan row groups por día UTC). Con
+    ``explain=True`` el plan de lectura (archivos elegidos/podados, bytes, row
+    groups, filas y tiempo por etapa) queda en ``df.attrs["read_plan"]``
+    (``ReadPlan``; ``.render()`` lo formatea).
+
     Nota: Si date_from/date_to son None, no se aplica el filtrado correspondiente.
     """
+    plan = ReadPlan(source, market, tf, symbol, date_from, date_to, columns) if explain else None
+    df = _read_range(lake_root, market, tf, symbol, date_from, date_to, source, columns, plan)
+    if plan is not None:
+        df.attrs["read_plan"] = plan
+    return df
 
-    files = _resolve_paths(lake_root, source, market, tf, symbol)
+def _read_range(lake_root, market, tf, symbol, date_from, date_to, source, columns, plan: Optional[ReadPlan]) -> pd.DataFrame:
+    with stage(plan, "glob"):
+        files = _resolve_paths(lake_root, source, market, tf, symbol)
+    with stage(plan, "prune"):
+        files = prune_months(files, date_from, date_to, plan)
+    if enabled():
+        annotate(files=len(files), bytes=sum(os.path.getsize(p) for p in files))
     if not files:
-        return pd.DataFrame(columns=["ts", "open", "high", "low", "close", "volume"])  # vacío
-
-    df = pd.concat((pd.read_parquet(p) for p in files), ignore_index=True)
+        return pd.DataFrame(columns=(["ts"] + [c for c in columns if c != "ts"]) if columns else ["ts", "open", "high", "low", "close", "volume"])  # vacío
+
+    with stage(plan, "decode"):
+        entries = plan.selected if plan is not None else [None] * len(files)
+        start, end = to_utc(date_from), to_utc(date_to)
+        df = pd.concat((_read_projected(p, columns, e, start, end) for p, e in zip(files, entries)), ignore_index=True)
+        for c in columns or []:
+            if c not in df.columns:
+                df[c] = pd.NA
+    if plan is not None:
+        plan.rows["decoded"] = len(df)
 
     # --- Normalización y contrato global de salida ---
     if df is None or len(df) == 0:
@@ -32,19 +92,20 @@ def read_range_df(lake_root: str, *, market: str, tf: str, symbol: str, date_fro
     if "ts" not in df.columns:
         return df
 
-    if not pd.api.types.is_datetime64_any_dtype(df["ts"]):
-        df["ts"] = pd.to_datetime(df["ts"], utc=True, errors="coerce")
-    else:
-        try:
-            tz = getattr(df["ts"].dtype, "tz", None)
-            if tz is None:
-                df["ts"] = pd.to_datetime(df["ts"], utc=True, errors="coerce")
-            elif str(tz) != "UTC":
-                df["ts"] = df["ts"].dt.tz_convert("UTC")
-        except Exception:
+    with stage(plan, "coerce"):
+        if not pd.api.types.is_datetime64_any_dtype(df["ts"]):
             df["ts"] = pd.to_datetime(df["ts"], utc=True, errors="coerce")
+        else:
+            try:
+                tz = getattr(df["ts"].dtype, "tz", None)
+                if tz is None:
+                    df["ts"] = pd.to_datetime(df["ts"], utc=True, errors="coerce")
+                elif str(tz) != "UTC":
+                    df["ts"] = df["ts"].dt.tz_convert("UTC")
+            except Exception:
+                df["ts"] = pd.to_datetime(df["ts"], utc=True, errors="coerce")
 
-    df = df.dropna(subset=["ts"])
+        df = df.dropna(subset=["ts"])
 
     def _to_utc(ts_like):
         if ts_like is None:
@@ -59,17 +120,22 @@ def read_range_df(lake_root: str, *, market: str, tf: str, symbol: str, date_fro
     _start = _to_utc(date_from) if date_from is not None else None
     _end = _to_utc(date_to) if date_to is not None else None
 
-    if _start is not None:
-        df = df.loc[df["ts"] >= _start]
-    if _end is not None:
-        df = df.loc[df["ts"] < _end]  # ⚠️ fin EXCLUSIVO por contrato global
+    with stage(plan, "filter"):
+        if _start is not None:
+            df = df.loc[df["ts"] >= _start]
+        if _end is not None:
+            df = df.loc[df["ts"] < _end]  # ⚠️ fin EXCLUSIVO por contrato global
+    if plan is not None:
+        plan.rows["in_range"] = len(df)
 
-    if "ts" in df.columns:
+    with stage(plan, "sort_dedupe"):
         df = (
             df.sort_values("ts")
               .drop_duplicates(subset=["ts"], keep="first")
               .reset_index(drop=True)
         )
+    if plan is not None:
+        plan.rows["deduped"] = len(df)
 
     return df
 
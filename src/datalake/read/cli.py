@@ -2,7 +2,10 @@ import argparse, os
 from .api import read_range_df, join_mtf_exec_ctx
 
 def _cmd_read(a):
-    df = read_range_df(a.lake_root, market=a.market, tf=a.tf, symbol=a.symbol, date_from=a.date_from, date_to=a.date_to, source=a.source)
+    cols = [c.strip() for c in a.columns.split(',') if c.strip()] if a.columns else None
+    df = read_range_df(a.lake_root, market=a.market, tf=a.tf, symbol=a.symbol, date_from=a.date_from, date_to=a.date_to, source=a.source, columns=cols, explain=a.explain)
+    if a.explain:
+        print(df.attrs["read_plan"].render())
     if a.head:
         print(df.head(a.head))
     if a.out_csv:
@@ -27,6 +30,8 @@ def main():
     r.add_argument('--date-from', required=True)
     r.add_argument('--date-to', required=True)
     r.add_argument('--source', default='ibkr')
+    r.add_argument('--columns', help='coma-separado, ej: close,volume,trades (incluye campos extendidos Binance)')
+    r.add_argument('--explain', action='store_true', help='Imprime el plan de lectura (archivos, bytes, row groups, filas y tiempos por etapa)')
     r.add_argument('--head', type=int, default=0)
     r.add_argument('--out-csv')
     r.set_defaults(func=_cmd_read)
@@ -0,0 +1,144 @@
+"""Plan de lectura de ``read_range_df`` (modo explain).
+
+Registra qué particiones se eligieron o podaron y por qué, cuántos bytes,
+row groups (tras podar por estadísticas de ``ts``) y filas se leyeron, cómo cambian las filas en cada paso
+(filtro de rango, dedupe) y el tiempo de cada etapa. Se adjunta al DataFrame
+como ``df.attrs["read_plan"]`` cuando se pide ``explain=True`` y la CLI lo
+imprime con ``--explain``.
+"""
+from __future__ import annotations
+
+import re
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+_PART_RE = re.compile(r"year=(\d{4})[\\/]+month=(\d{1,2})")
+
+
+@dataclass
+class FileRead:
+    path: str
+    selected: bool
+    reason: str
+    bytes: int = 0               # comprimidos de los row groups/columnas leídos
+    row_groups: int = 0          # leídos
+    row_groups_total: int = 0
+    rows: int = 0                # filas decodificadas
+
+
+@dataclass
+class ReadPlan:
+    source: str
+    market: str
+    tf: str
+    symbol: str
+    date_from: Optional[str]
+    date_to: Optional[str]
+    columns: Optional[List[str]] = None
+    files: List[FileRead] = field(default_factory=list)
+    stages: Dict[str, float] = field(default_factory=dict)   # segundos por etapa
+    rows: Dict[str, int] = field(default_factory=dict)       # filas tras cada etapa
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - t0
+
+    @property
+    def selected(self) -> List[FileRead]:
+        return [f for f in self.files if f.selected]
+
+    @property
+    def bytes_read(self) -> int:
+        return sum(f.bytes for f in self.selected)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def render(self) -> str:
+        sel = self.selected
+        rg = sum(f.row_groups for f in sel)
+        rg_total = sum(f.row_groups_total for f in sel)
+        out = [
+            f"READ PLAN source={self.source} market={self.market} tf={self.tf} symbol={self.symbol} "
+            f"range=[{self.date_from}, {self.date_to}) columns={self.columns or 'default'}",
+            f"  archivos: {len(sel)} leídos / {len(self.files) - len(sel)} podados | "
+            f"bytes={self.bytes_read:,} | row groups={rg}/{rg_total}",
+        ]
+        for f in self.files:
+            mark = "+" if f.selected else "-"
+            detail = f" rows={f.rows:,} rg={f.row_groups}/{f.row_groups_total} bytes={f.bytes:,}" if f.selected else ""
+            out.append(f"  {mark} {f.path} ({f.reason}){detail}")
+        if self.rows:
+            out.append("  filas: " + " → ".join(f"{k}={v:,}" for k, v in self.rows.items()))
+        total = sum(self.stages.values())
+        out.append(f"  tiempo total {total * 1000:.1f} ms")
+        for name, secs in self.stages.items():
+            pct = 100 * secs / total if total else 0.0
+            out.append(f"    {name:<12} {secs * 1000:8.1f} ms  {pct:5.1f}%")
+        return "\n".join(out)
+
+
+def stage(plan: Optional[ReadPlan], name: str):
+    """``plan.stage(name)`` o un contexto vacío si no hay plan."""
+    return plan.stage(name) if plan is not None else nullcontext()
+
+
+def partition_month(path: str) -> Optional[Tuple[int, int]]:
+    """(año, mes) de una ruta ``.../year=YYYY/month=MM/...`` o ``None``."""
+    m = _PART_RE.search(path)
+    return (int(m.group(1)), int(m.group(2))) if m else None
+
+
+def to_utc(ts_like) -> Optional[pd.Timestamp]:
+    if ts_like is None:
+        return None
+    ts = pd.Timestamp(ts_like)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+def prune_months(files: List[str], date_from, date_to, plan: Optional[ReadPlan] = None) -> List[str]:
+    """Descarta particiones mensuales sin solape con [date_from, date_to)."""
+    start, end = to_utc(date_from), to_utc(date_to)
+    keep: List[str] = []
+    for f in files:
+        ym = partition_month(f)
+        if ym is None:
+            ok, why = True, "sin partición año/mes"
+        else:
+            m0 = pd.Timestamp(year=ym[0], month=ym[1], day=1, tz="UTC")
+            m1 = m0 + pd.offsets.MonthBegin()
+            if end is not None and m0 >= end:
+                ok, why = False, f"{ym[0]}-{ym[1]:02d} >= date_to"
+            elif start is not None and m1 <= start:
+                ok, why = False, f"{ym[0]}-{ym[1]:02d} < date_from"
+            else:
+                ok, why = True, f"{ym[0]}-{ym[1]:02d} solapa el rango"
+        if ok:
+            keep.append(f)
+        if plan is not None:
+            plan.files.append(FileRead(f, ok, why))
+    return keep
+
+
+def row_groups_in_range(metadata, ts_index: int, start: Optional[pd.Timestamp], end: Optional[pd.Timestamp]) -> List[int]:
+    """Row groups cuyo [min, max] de ``ts`` (estadísticas) solapa [start, end).
+
+    Los que no tienen estadísticas se leen siempre.
+    """
+    keep: List[int] = []
+    for i in range(metadata.num_row_groups):
+        st = metadata.row_group(i).column(ts_index).statistics
+        if st is not None and st.has_min_max and (start is not None or end is not None):
+            lo, hi = to_utc(st.min), to_utc(st.max)
+            if (end is not None and lo >= end) or (start is not None and hi < start):
+                continue
+        keep.append(i)
+    return keep
@@ -1,8 +1,11 @@
 import glob, os
 from typing import List, Optional
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from .paths import months_between, symbol_base
-from .schemas import enforce_schema
+from .plan import row_groups_in_range
+from .schemas import enforce_schema, project_columns
 
 
 def list_month_files(lake_root: str, market: str, timeframe: str, symbol: str,
@@ -15,24 +18,36 @@ def list_month_files(lake_root: str, market: str, timeframe: str, symbol: str,
     return sorted(set(files))
 
 
+def _read_month(path: str, columns: Optional[List[str]], start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+    pf = pq.ParquetFile(path)
+    schema = pf.schema_arrow
+    cols = project_columns(schema.names, columns)
+    if "ts" not in schema.names or not pa.types.is_timestamp(schema.field("ts").type):
+        return pf.read(columns=cols).to_pandas()
+    groups = row_groups_in_range(pf.metadata, schema.get_field_index("ts"), start, end)
+    return pf.read_row_groups(groups, columns=cols).to_pandas()
+
+
 def read_range(lake_root: str, market: str, timeframe: str, symbol: str,
                date_from: str, date_to: str,
                columns: Optional[List[str]] = None) -> pd.DataFrame:
     """Lee filas cuya ts ∈ [date_from 00:00:00, date_to 23:59:59] UTC.
     Devuelve DataFrame ordenado por ts y con schema normalizado.
+    Los campos extendidos de Binance solo se leen si vienen en ``columns``.
+    De cada mes solo se decodifican los row groups cuyo ``ts`` solapa el rango.
     """
     files = list_month_files(lake_root, market, timeframe, symbol, date_from, date_to)
     if not files:
         return enforce_schema(pd.DataFrame(columns=["ts","open","high","low","close","volume"]), timeframe, symbol)
+    start = pd.Timestamp(date_from + " 00:00:00+00:00")
+    end   = pd.Timestamp(date_to   + " 23:59:59+00:00")
     dfs = []
     for f in files:
         try:
-            dfs.append(pd.read_parquet(f, columns=columns))
+            dfs.append(_read_month(f, columns, start, end + pd.Timedelta(seconds=1)))
         except Exception:
             dfs.append(pd.read_parquet(f))
     df = pd.concat(dfs, ignore_index=True)
     df = enforce_schema(df, timeframe=timeframe, symbol=symbol)
-    start = pd.Timestamp(date_from + " 00:00:00+00:00")
-    end   = pd.Timestamp(date_to   + " 23:59:59+00:00")
     df = df[(df["ts"] >= start) & (df["ts"] <= end)].sort_values("ts").reset_index(drop=True)
     return df
@@ -1,4 +1,5 @@
-from typing import List
+import os
+from typing import Dict, List, Optional
 import pandas as pd
 
 CANONICAL_ORDER: List[str] = [
@@ -20,6 +21,38 @@ DEFAULTS = {
     "tz": "UTC",
 }
 
+# Campos extendidos de las klines Binance (order flow). Opcionales: solo
+# existen en particiones source=binance recientes y los lectores no los
+# cargan salvo que se pidan por nombre.
+BINANCE_EXTENDED: List[str] = ["quote_volume", "trades", "taker_buy_base", "taker_buy_quote"]
+
+
+def extended_dtypes() -> Dict[str, str]:
+    """dtypes de los campos extendidos.
+
+    float64 por defecto: float32 solo guarda ~7 dígitos y los quote volume de
+    BTC (~1e8) perderían unidades. ``BINANCE_EXT_FLOAT=float32`` lo activa para
+    quien prefiera archivos más chicos.
+    """
+    f = os.getenv("BINANCE_EXT_FLOAT", "float64")
+    return {"quote_volume": f, "trades": "Int32", "taker_buy_base": f, "taker_buy_quote": f}
+
+
+def cast_extended(df: pd.DataFrame) -> pd.DataFrame:
+    """Castea in-place los campos extendidos presentes (filas antiguas sin ellos quedan NA)."""
+    for c, t in extended_dtypes().items():
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype(t)
+    return df
+
+
+def project_columns(available: List[str], columns: Optional[List[str]] = None) -> List[str]:
+    """Columnas a leer de un archivo: todas menos las extendidas, o ``ts`` + las pedidas que existan."""
+    if columns is None:
+        return [c for c in available if c not in BINANCE_EXTENDED]
+    return ["ts"] + [c for c in columns if c != "ts" and c in available]
+
+
 def enforce_schema(df: pd.DataFrame, timeframe: str = None, symbol: str = None) -> pd.DataFrame:
     d = df.copy()
     # ts datetime con tz UTC
@@ -0,0 +1,262 @@
+"""Matriz de cobertura por día de todo el lake (QC nocturno).
+
+Recorre todas las particiones ``source=*/market=*/timeframe=*/symbol=*/year=*/month=*``
+en paralelo leyendo solo ``ts`` (y ``is_synth`` si existe) y produce una fila
+por (source, market, timeframe, symbol, día) con filas, barras faltantes y
+barras sintéticas. Con ``--from/--to`` cada serie tiene una fila por día de la
+ventana (los días sin datos, también al inicio o al final, cuentan como
+incompletos), incluidas las series pedidas con ``--source``/``--tf``/``--symbols``
+que no tienen ningún archivo. El reporte se guarda en Parquet::
+
+    datalake-coverage --lake-root D:/lake --out coverage.parquet
+    datalake-coverage --source binance --tf M1 --from 2025-08-01 --to 2025-08-31
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from datalake.read.paths import months_between
+
+TF_MINUTES = {"M1": 1, "M5": 5, "M15": 15, "M30": 30, "H1": 60, "H4": 240, "D1": 1440}
+
+_DAY_NS = 86_400 * 10**9
+_KEYS = ["source", "market", "timeframe", "symbol"]
+REPORT_COLUMNS = _KEYS + ["date", "rows", "expected", "missing_bars", "missing_minutes", "synth_bars"]
+
+
+def _hive(path: str) -> Dict[str, str]:
+    parts = {}
+    for seg in path.replace("\\", "/").split("/"):
+        if "=" in seg:
+            k, v = seg.split("=", 1)
+            parts[k] = v
+    return parts
+
+
+def iter_partitions(
+    lake_root: str,
+    *,
+    sources: Optional[Sequence[str]] = None,
+    markets: Optional[Sequence[str]] = None,
+    timeframes: Optional[Sequence[str]] = None,
+    symbols: Optional[Sequence[str]] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+) -> Iterator[Dict[str, str]]:
+    """Particiones mensuales del lake que pasan los filtros (poda por año/mes)."""
+    months = None
+    if date_from and date_to:
+        months = {(y, m) for y, m in months_between(date_from, date_to)}
+    patt = os.path.join(
+        lake_root, "data", "source=*", "market=*", "timeframe=*", "symbol=*",
+        "year=*", "month=*", "*.parquet",
+    )
+    for path in sorted(glob.glob(patt)):
+        h = _hive(path)
+        if sources and h.get("source") not in sources:
+            continue
+        if markets and h.get("market") not in markets:
+            continue
+        if timeframes and h.get("timeframe") not in timeframes:
+            continue
+        if symbols and h.get("symbol") not in symbols:
+            continue
+        if months is not None and (int(h["year"]), int(h["month"])) not in months:
+            continue
+        yield {k: h[k] for k in _KEYS} | {"path": path}
+
+
+def scan_partition(part: Dict[str, str]) -> pd.DataFrame:
+    """Cobertura por día de un archivo mensual leyendo solo ``ts``/``is_synth``."""
+    step_min = TF_MINUTES.get(part["timeframe"].upper())
+    names = set(pq.read_schema(part["path"]).names)
+    cols = ["ts"] + (["is_synth"] if "is_synth" in names else [])
+    tbl = pq.read_table(part["path"], columns=cols)
+    ts = pd.to_datetime(tbl.column("ts").to_pandas(), utc=True)
+    if ts.empty:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+    t = pd.DatetimeIndex(ts).as_unit("ns").asi8
+    synth = (
+        tbl.column("is_synth").to_pandas().fillna(False).to_numpy(dtype=bool)
+        if "is_synth" in cols else np.zeros(len(t), dtype=bool)
+    )
+    day = t // _DAY_NS
+    days, rows = np.unique(day, return_counts=True)
+    synth_bars = np.bincount(np.searchsorted(days, day), weights=synth, minlength=len(days))
+    if step_min:
+        step = step_min * 60 * 10**9
+        grid = t[t % step == 0]
+        uniq_day = np.unique(grid) // _DAY_NS
+        present = np.bincount(np.searchsorted(days, uniq_day), minlength=len(days))
+        expected = np.full(len(days), _DAY_NS // step)
+        missing = np.maximum(expected - present, 0)
+    else:
+        expected = np.full(len(days), -1)
+        missing = np.zeros(len(days), dtype=np.int64)
+    out = pd.DataFrame({
+        "date": pd.to_datetime(days * _DAY_NS, unit="ns").date,
+        "rows": rows.astype("int64"),
+        "expected": expected.astype("int64"),
+        "missing_bars": missing.astype("int64"),
+        "missing_minutes": (missing * (step_min or 0)).astype("int64"),
+        "synth_bars": synth_bars.astype("int64"),
+    })
+    for k in reversed(_KEYS):
+        out.insert(0, k, part[k])
+    return out
+
+
+def expected_series(
+    lake_root: str,
+    *,
+    sources: Optional[Sequence[str]] = None,
+    markets: Optional[Sequence[str]] = None,
+    timeframes: Optional[Sequence[str]] = None,
+    symbols: Optional[Sequence[str]] = None,
+    **_,
+) -> List[Tuple[str, str, str, str]]:
+    """Series (source, market, timeframe, symbol) que el reporte debe cubrir.
+
+    Las que tienen alguna partición en el lake (en cualquier mes) y, si se
+    pidieron ``sources``, ``timeframes`` y ``symbols`` explícitos, todas sus
+    combinaciones aunque no exista ningún archivo.
+    """
+    found = {tuple(p[k] for k in _KEYS)
+             for p in iter_partitions(lake_root, sources=sources, markets=markets,
+                                      timeframes=timeframes, symbols=symbols)}
+    if sources and timeframes and symbols:
+        mks = markets or sorted({k[1] for k in found}) or ["crypto"]
+        found |= set(product(sources, mks, timeframes, symbols))
+    return sorted(found)
+
+
+def _fill_empty_days(
+    df: pd.DataFrame,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    series: Sequence[Tuple[str, str, str, str]] = (),
+) -> pd.DataFrame:
+    """Agrega días sin ninguna fila en cada serie.
+
+    Con ventana [date_from, date_to] se reindexa sobre toda la ventana (huecos
+    al inicio/fin incluidos) y las ``series`` sin filas salen con un día vacío
+    por fecha; sin ventana, entre el primer y último día presentes.
+    """
+    lo = pd.Timestamp(date_from).date() if date_from else None
+    hi = pd.Timestamp(date_to).date() if date_to else None
+    groups = {key: g for key, g in df.groupby(_KEYS, sort=False)} if len(df) else {}
+    if lo is not None and hi is not None:
+        for key in series:
+            groups.setdefault(tuple(key), None)
+    out = []
+    for key, g in groups.items():
+        if g is None:
+            g = pd.DataFrame(columns=["date", "rows", "expected", "missing_bars", "missing_minutes", "synth_bars"])
+        else:
+            g = g.groupby("date", as_index=False).agg(
+                {"rows": "sum", "expected": "max", "missing_bars": "min",
+                 "missing_minutes": "min", "synth_bars": "sum"}
+            )
+        first = lo if lo is not None else min(g["date"])
+        last = hi if hi is not None else max(g["date"])
+        days = pd.date_range(first, last, freq="D").date
+        g = g.set_index("date").reindex(days)
+        step_min = TF_MINUTES.get(str(key[2]).upper())
+        exp = 1440 // step_min if step_min else -1
+        empty = g["rows"].isna()
+        g.loc[empty, ["rows", "synth_bars"]] = 0
+        g.loc[empty, "expected"] = exp
+        g.loc[empty, "missing_bars"] = max(exp, 0)
+        g.loc[empty, "missing_minutes"] = max(exp, 0) * (step_min or 0)
+        g = g.astype("int64").rename_axis("date").reset_index()
+        for k, v in zip(reversed(_KEYS), reversed(key)):
+            g.insert(0, k, v)
+        out.append(g)
+    if not out:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+    return pd.concat(out, ignore_index=True)[REPORT_COLUMNS]
+
+
+def coverage_matrix(
+    lake_root: str,
+    *,
+    max_workers: Optional[int] = None,
+    **filters,
+) -> pd.DataFrame:
+    """Escanea el lake en paralelo y devuelve la matriz de cobertura diaria.
+
+    Con ``date_from``/``date_to`` cada serie esperada (ver ``expected_series``)
+    tiene una fila por día de la ventana, aunque no tenga datos.
+    """
+    parts = list(iter_partitions(lake_root, **filters))
+    frames: List[pd.DataFrame] = []
+    if parts:
+        workers = max_workers or min(32, (os.cpu_count() or 4) * 2)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="coverage") as pool:
+            frames = [f for f in pool.map(scan_partition, parts) if not f.empty]
+    date_from, date_to = filters.get("date_from"), filters.get("date_to")
+    window = bool(date_from and date_to)
+    series = expected_series(lake_root, **filters) if window else ()
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=REPORT_COLUMNS)
+    df = _fill_empty_days(df, date_from if window else None, date_to if window else None, series)
+    if df.empty:
+        return df
+    if window:
+        lo, hi = pd.Timestamp(date_from).date(), pd.Timestamp(date_to).date()
+        df = df[(df["date"] >= lo) & (df["date"] <= hi)]
+    return df.sort_values(_KEYS + ["date"]).reset_index(drop=True)
+
+
+def _csv(value: Optional[str]) -> Optional[List[str]]:
+    return [v.strip() for v in value.split(",") if v.strip()] if value else None
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Matriz de cobertura diaria de todo el lake")
+    ap.add_argument("--lake-root", default=os.getenv("LAKE_ROOT", os.getcwd()))
+    ap.add_argument("--source", help="Lista separada por comas (ibkr,binance)")
+    ap.add_argument("--market", help="Lista separada por comas")
+    ap.add_argument("--tf", help="Lista separada por comas (M1,M5,...)")
+    ap.add_argument("--symbols", help="Lista separada por comas")
+    ap.add_argument("--from", dest="date_from", help="YYYY-MM-DD (UTC)")
+    ap.add_argument("--to", dest="date_to", help="YYYY-MM-DD (UTC)")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--out", default="coverage.parquet", help="Reporte Parquet de salida")
+    ap.add_argument("--strict", action="store_true", help="Exit code 1 si hay días incompletos")
+    args = ap.parse_args(argv)
+
+    df = coverage_matrix(
+        args.lake_root,
+        max_workers=args.workers,
+        sources=_csv(args.source),
+        markets=_csv(args.market),
+        timeframes=_csv(args.tf),
+        symbols=_csv(args.symbols),
+        date_from=args.date_from,
+        date_to=args.date_to,
+    )
+    out_dir = os.path.dirname(os.path.abspath(args.out))
+    os.makedirs(out_dir, exist_ok=True)
+    df.to_parquet(args.out, index=False)
+
+    incomplete = df[df["missing_bars"] > 0]
+    print(f"series={df.groupby(_KEYS).ngroups if len(df) else 0} días={len(df)} "
+          f"incompletos={len(incomplete)} sintéticas={int(df['synth_bars'].sum()) if len(df) else 0}")
+    for row in incomplete.head(20).itertuples(index=False):
+        print(f"  [GAP] {row.source} {row.timeframe} {row.symbol} {row.date}: "
+              f"rows={row.rows}/{row.expected} faltan={row.missing_bars}")
+    print(f"Reporte → {args.out}")
+    return 1 if args.strict and len(incomplete) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,12 +2,131 @@ from __future__ import annotations
 
 import glob
 import os
-from datetime import timedelta, timezone
-from typing import List, Tuple
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 
 
+def _as_ns(values) -> np.ndarray:
+    """Timestamps (Series/Index/array/escalar) a epoch ns int64 en UTC."""
+    idx = pd.DatetimeIndex(pd.to_datetime(values, utc=True))
+    return idx.as_unit("ns").asi8
+
+
+def _ts_ns(value) -> int:
+    ts = pd.Timestamp(value)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+    return int(ts.as_unit("ns").value)
+
+
+def _step_ns(step) -> int:
+    return int(pd.Timedelta(step).as_unit("ns").value)
+
+
+@dataclass(frozen=True)
+class GapRuns:
+    """Runs de barras faltantes como arrays compactos (epoch ns, extremos inclusivos).
+
+    ``keys`` trae el símbolo de cada run cuando se calcula para varios símbolos.
+    """
+
+    starts: np.ndarray
+    ends: np.ndarray
+    step_ns: int
+    keys: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return int(self.starts.size)
+
+    @property
+    def bars(self) -> np.ndarray:
+        """Barras faltantes por run."""
+        return (self.ends - self.starts) // self.step_ns + 1
+
+    @property
+    def missing(self) -> int:
+        return int(self.bars.sum())
+
+    def to_list(self) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        s = pd.to_datetime(self.starts, unit="ns", utc=True)
+        e = pd.to_datetime(self.ends, unit="ns", utc=True)
+        return list(zip(s, e))
+
+    def to_frame(self) -> pd.DataFrame:
+        out = pd.DataFrame({
+            "start": pd.to_datetime(self.starts, unit="ns", utc=True),
+            "end": pd.to_datetime(self.ends, unit="ns", utc=True),
+            "bars": self.bars,
+        })
+        if self.keys is not None:
+            out.insert(0, "symbol", self.keys)
+        return out
+
+
+def _runs_from_sorted(t: np.ndarray, lo: int, hi: int, step: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Centinelas en lo-step y hi+step: cada salto > step entre vecinos es un run
+    b = np.concatenate(([lo - step], t, [hi + step]))
+    idx = np.flatnonzero(np.diff(b) > step)
+    return b[idx] + step, b[idx + 1] - step
+
+
+def _bounds(start, end, step) -> Tuple[int, int, int]:
+    lo, hi, st = _ts_ns(start), _ts_ns(end), _step_ns(step)
+    # ``end`` se recorta a la última barra de la grilla (p. ej. 23:59 con paso 5min -> 23:55)
+    return lo, lo + ((hi - lo) // st) * st, st
+
+
+def _on_grid(t: np.ndarray, lo: int, hi: int, step: int) -> np.ndarray:
+    t = t[(t >= lo) & (t <= hi)]
+    return t[(t - lo) % step == 0]
+
+
+def gap_runs(ts, start, end, step="1min") -> GapRuns:
+    """Runs faltantes en la grilla ``[start, end]`` (inclusiva) con paso ``step``.
+
+    Solo recorre los timestamps presentes (no materializa la grilla completa),
+    así que sirve igual para un día M1 que para años de M30. Timestamps fuera
+    de rango o fuera de la grilla se ignoran.
+    """
+    lo, hi, st = _bounds(start, end, step)
+    t = np.unique(_on_grid(_as_ns(ts), lo, hi, st))
+    starts, ends = _runs_from_sorted(t, lo, hi, st)
+    return GapRuns(starts, ends, st)
+
+
+def gap_runs_by_symbol(
+    df: pd.DataFrame,
+    start,
+    end,
+    step="1min",
+    *,
+    symbols: Optional[Sequence[str]] = None,
+    key: str = "symbol",
+) -> GapRuns:
+    """Igual que :func:`gap_runs` para muchos símbolos a la vez, sin bucle por símbolo.
+
+    ``symbols`` permite incluir símbolos sin ninguna fila (todo el rango falta).
+    """
+    lo, hi, st = _bounds(start, end, step)
+    names = pd.Index(sorted(set(df[key].astype(str)) | set(symbols or [])))
+    codes = names.get_indexer(df[key].astype(str)).astype(np.int64)
+    t = _as_ns(df["ts"]) if len(df) else np.empty(0, dtype=np.int64)
+    keep = (t >= lo) & (t <= hi)
+    keep[keep] = (t[keep] - lo) % st == 0
+    codes, t = codes[keep], t[keep]
+
+    n = len(names)
+    all_codes = np.arange(n, dtype=np.int64)
+    k = np.concatenate((all_codes, codes, all_codes))
+    v = np.concatenate((np.full(n, lo - st), t, np.full(n, hi + st)))
+    order = np.lexsort((v, k))
+    k, v = k[order], v[order]
+    idx = np.flatnonzero((np.diff(v) > st) & (k[1:] == k[:-1]))
+    return GapRuns(v[idx] + st, v[idx + 1] - st, st, keys=names.to_numpy()[k[idx]])
+
+
 def find_missing_ranges_utc(
     symbol: str,
     date_utc: str,
@@ -33,36 +152,13 @@ def find_missing_ranges_utc(
     )
     yy = f"{day.year:04d}"
     mm = f"{day.month:02d}"
-    patterns = [
-        os.path.join(base, f"year={yy}", f"month={mm}", "*.parquet"),
-        os.path.join(base, f"year={yy}", "month=*", "*.parquet"),
-    ]
-    files: List[str] = []
-    for p in patterns:
-        files.extend(glob.glob(p))
+    # Las particiones son por mes de ``ts``: el día solo puede estar en su mes
+    files = glob.glob(os.path.join(base, f"year={yy}", f"month={mm}", "*.parquet"))
     if files:
-        df = pd.concat((pd.read_parquet(f) for f in sorted(set(files))), ignore_index=True)
+        df = pd.concat((pd.read_parquet(f, columns=["ts"]) for f in sorted(set(files))), ignore_index=True)
         df["ts"] = pd.to_datetime(df["ts"], utc=True)
         df_day = df[(df["ts"] >= start) & (df["ts"] <= end)].sort_values("ts")
     else:
         df_day = pd.DataFrame(columns=["ts"])  # vacío
 
-    if df_day.empty:
-        return [(start, end)]
-
-    full = pd.date_range(start, end, freq="1min", tz=timezone.utc)
-    missing = full.difference(pd.DatetimeIndex(df_day["ts"]))
-    if missing.empty:
-        return []
-    ranges: List[Tuple[pd.Timestamp, pd.Timestamp]] = []
-    s = missing[0]
-    prev = s
-    for ts in missing[1:]:
-        if ts - prev == pd.Timedelta(minutes=1):
-            prev = ts
-        else:
-            ranges.append((s, prev))
-            s = ts
-            prev = ts
-    ranges.append((s, prev))
-    return ranges
+    return gap_runs(df_day["ts"], start, end, "1min").to_list()
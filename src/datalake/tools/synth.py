@@ -0,0 +1,230 @@
+"""Generador de lakes sintéticos para benchmarks, pruebas de carga y QC.
+
+- ``make_m1``: M1 de un símbolo para todo el rango en una sola pasada
+  vectorizada (un ``date_range`` y un random walk), sin bucles por día.
+- ``inject_faults``: huecos (en runs), duplicados (revisiones con otro
+  ``close``) y barras fuera de orden a tasas controladas; devuelve también
+  cuántas de cada una se inyectaron para poder verificar el QC.
+- ``write_lake``: genera muchos símbolos en paralelo (procesos) y escribe una
+  partición por (símbolo, mes) con el layout y schema de ``ibkr.writer``.
+
+Por defecto las particiones se escriben tal cual (reemplazando el archivo),
+así los defectos inyectados llegan a disco; ``merge=True`` pasa por
+``write_month`` (merge + dedupe + orden, como una ingesta real).
+"""
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from datalake.aggregates.aggregate import resample_df
+from datalake.ingestors.ibkr.writer import COLS_BASE, write_month
+from datalake.write.partition import atomic_write_table
+
+_MIN_NS = 60 * 10**9
+
+
+@dataclass(frozen=True)
+class Faults:
+    """Tasas de defectos (fracción de barras afectadas)."""
+
+    gap_rate: float = 0.0        # barras eliminadas, en runs de 1..max_gap
+    max_gap: int = 30
+    dup_rate: float = 0.0        # barras repetidas (mismo ts, otro close)
+    disorder_rate: float = 0.0   # pares adyacentes intercambiados
+
+    @property
+    def any(self) -> bool:
+        return bool(self.gap_rate or self.dup_rate or self.disorder_rate)
+
+
+@dataclass
+class SynthReport:
+    symbols: int = 0
+    rows: int = 0
+    files: List[str] = field(default_factory=list)
+    injected: Dict[str, int] = field(default_factory=lambda: {"gaps": 0, "dups": 0, "disorder": 0})
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def _utc_day(day: str) -> datetime:
+    return datetime.fromisoformat(day).replace(tzinfo=timezone.utc)
+
+
+def make_m1(symbol: str, day_from: str, day_to: str, seed: int = 42, *, price0: float = 100_000.0) -> pd.DataFrame:
+    """M1 sintético [day_from 00:00, day_to 23:59] UTC con el schema del writer IBKR."""
+    rng = np.random.default_rng(seed)
+    d0 = _utc_day(day_from)
+    n = ((_utc_day(day_to) - d0).days + 1) * 1440
+    ts = pd.DatetimeIndex(np.int64(d0.timestamp()) * 10**9 + np.arange(n, dtype=np.int64) * _MIN_NS,
+                          tz="UTC").as_unit("ns")
+    px = price0 + rng.normal(0, 10, n).cumsum()
+    out = pd.DataFrame({
+        "ts": ts,
+        "open": px,
+        "high": px + rng.uniform(0, 5, n),
+        "low": px - rng.uniform(0, 5, n),
+        "close": px + rng.normal(0, 2, n),
+        "volume": rng.integers(0, 100, n),
+    })
+    out["source"] = "ibkr"; out["market"] = "crypto"; out["timeframe"] = "M1"; out["symbol"] = symbol
+    out["exchange"] = os.getenv("IB_EXCHANGE_CRYPTO", "PAXOS")
+    out["what_to_show"] = os.getenv("IB_WHAT_TO_SHOW", "AGGTRADES")
+    out["vendor"] = "ibkr"; out["tz"] = "UTC"
+    return out
+
+
+def inject_faults(df: pd.DataFrame, faults: Faults, seed: int = 0) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """Aplica ``faults`` a ``df`` (ordenado, sin duplicados). Devuelve (df, conteos)."""
+    rng = np.random.default_rng(seed)
+    n = len(df)
+    counts = {"gaps": 0, "dups": 0, "disorder": 0}
+    if n == 0 or not faults.any:
+        return df, counts
+
+    keep = np.ones(n, dtype=bool)
+    if faults.gap_rate > 0:
+        lens = rng.integers(1, faults.max_gap + 1, max(1, int(n * faults.gap_rate / ((faults.max_gap + 1) / 2))))
+        starts = rng.integers(0, n, len(lens))
+        delta = np.zeros(n + 1, dtype=np.int32)
+        np.add.at(delta, starts, 1)
+        np.add.at(delta, np.minimum(starts + lens, n), -1)
+        keep = np.cumsum(delta[:-1]) == 0
+        counts["gaps"] = int((~keep).sum())
+    order = np.flatnonzero(keep)
+
+    if faults.dup_rate > 0 and len(order):
+        reps = np.ones(len(order), dtype=np.int64)
+        dup_at = rng.choice(len(order), min(len(order), int(len(order) * faults.dup_rate)), replace=False)
+        reps[dup_at] = 2
+        counts["dups"] = len(dup_at)
+        order = np.repeat(order, reps)
+        # la copia (2ª aparición) es una "revisión" con otro close
+        is_copy = np.zeros(len(order), dtype=bool)
+        is_copy[np.cumsum(reps)[dup_at] - 1] = True
+    else:
+        is_copy = np.zeros(len(order), dtype=bool)
+
+    if faults.disorder_rate > 0 and len(order) > 1:
+        pos = rng.choice(len(order) - 1, min(len(order) - 1, int(len(order) * faults.disorder_rate)), replace=False)
+        pos = np.sort(pos)
+        pos = pos[np.diff(np.concatenate([[-2], pos])) > 1]  # pares disjuntos
+        perm = np.arange(len(order))
+        perm[pos], perm[pos + 1] = pos + 1, pos
+        order, is_copy = order[perm], is_copy[perm]
+        counts["disorder"] = len(pos)
+
+    out = df.iloc[order].reset_index(drop=True)
+    if is_copy.any():
+        close = out["close"].to_numpy(copy=True)
+        close[is_copy] += rng.normal(0, 1, int(is_copy.sum()))
+        out["close"] = close
+    return out, counts
+
+
+def _month_slices(ts_ns: np.ndarray) -> Iterable[Tuple[int, int, np.ndarray]]:
+    """(año, mes, índices) por mes de ``ts`` respetando el orden de filas."""
+    months = ts_ns.astype("datetime64[ns]").astype("datetime64[M]").astype(np.int64)
+    for m in np.unique(months):
+        yield 1970 + int(m) // 12, int(m) % 12 + 1, np.flatnonzero(months == m)
+
+
+def _cfg(root: str, tf: str = "M1") -> SimpleNamespace:
+    return SimpleNamespace(data_root=root, market="crypto", timeframe=tf, source="ibkr", vendor="ibkr",
+                           exchange=os.getenv("IB_EXCHANGE_CRYPTO", "PAXOS"),
+                           what_to_show=os.getenv("IB_WHAT_TO_SHOW", "AGGTRADES"), tz="UTC")
+
+
+def partition_path(root: str, symbol: str, tf: str, year: int, month: int) -> Path:
+    return (Path(root) / "data" / "source=ibkr" / "market=crypto" / f"timeframe={tf}" / f"symbol={symbol}"
+            / f"year={year}" / f"month={month:02d}" / f"part-{year}-{month:02d}.parquet")
+
+
+def write_partitions(df: pd.DataFrame, symbol: str, root: str, *, tf: str = "M1", merge: bool = False) -> List[str]:
+    """Una partición por mes de ``df``; ``merge`` usa ``write_month`` (dedupe/orden)."""
+    out: List[str] = []
+    ts_ns = pd.DatetimeIndex(df["ts"]).as_unit("ns").asi8
+    for year, month, idx in _month_slices(ts_ns):
+        chunk = df.iloc[idx]
+        if merge:
+            out.append(write_month(chunk, symbol=symbol, cfg=_cfg(root, tf)))
+            continue
+        table = pa.Table.from_pandas(chunk[[c for c in COLS_BASE if c in chunk.columns]], preserve_index=False)
+        dest = partition_path(root, symbol, tf, year, month)
+        atomic_write_table(table, dest, compression="zstd", version="2.6", use_dictionary=False)
+        out.append(str(dest))
+    return out
+
+
+def _gen_symbol(job: tuple) -> Tuple[int, List[str], Dict[str, int]]:
+    root, symbol, day_from, day_to, seed, faults, merge, extra_tfs = job
+    df = make_m1(symbol, day_from, day_to, seed=seed)
+    files: List[str] = []
+    for tf, rule in extra_tfs:
+        agg = resample_df(df, rule, ffill=False)
+        agg["symbol"] = symbol; agg["timeframe"] = tf
+        for c in ("source", "market", "exchange", "what_to_show", "vendor", "tz"):
+            agg[c] = df[c].iloc[0]
+        files += write_partitions(agg, symbol, root, tf=tf, merge=merge)
+    df, counts = inject_faults(df, faults, seed=seed + 1)
+    files = write_partitions(df, symbol, root, merge=merge) + files
+    return len(df), files, counts
+
+
+def symbol_names(n: int, prefix: str = "SYN") -> List[str]:
+    return [f"{prefix}{i}-USD" for i in range(n)]
+
+
+def write_lake(
+    root: str,
+    symbols: List[str],
+    day_from: str,
+    day_to: str,
+    *,
+    seed: int = 42,
+    faults: Optional[Faults] = None,
+    merge: bool = False,
+    workers: Optional[int] = None,
+    extra_tfs: Optional[Dict[str, str]] = None,
+) -> SynthReport:
+    """Genera y escribe ``symbols`` x [day_from, day_to] en paralelo (un proceso por símbolo).
+
+    ``extra_tfs`` (``{"M5": "5min"}``) escribe además TFs agregadas desde el M1
+    limpio, p. ej. para el join MTF de los benchmarks.
+    """
+    faults = faults or Faults()
+    jobs = [(root, s, day_from, day_to, seed + 7919 * i, faults, merge, tuple((extra_tfs or {}).items()))
+            for i, s in enumerate(symbols)]
+    rep = SynthReport(symbols=len(symbols))
+    t0 = time.perf_counter()
+    workers = min(len(jobs), workers or os.cpu_count() or 1)
+    if workers <= 1:
+        results = map(_gen_symbol, jobs)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(_gen_symbol, jobs)
+    try:
+        for rows, files, counts in results:
+            rep.rows += rows
+            rep.files += files
+            for k, v in counts.items():
+                rep.injected[k] += v
+    finally:
+        if workers > 1:
+            pool.shutdown()
+    rep.seconds = time.perf_counter() - t0
+    return rep
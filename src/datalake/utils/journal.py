@@ -0,0 +1,207 @@
+"""Journal de trabajos de ingesta (JSON lines, solo-append).
+
+Cada línea es el estado de un día de una serie ``(source, symbol, tf, day)``
+tras procesarlo: ``status`` (``done``/``partial``/``empty``), filas escritas,
+filas esperadas, último ``ts`` escrito y requests acumulados. Al reabrir el
+journal se reproduce el archivo y gana la última línea de cada clave, así que
+un proceso que murió a mitad de rango sabe qué días ya están completos
+(se saltan) y cuáles quedaron parciales (se retoman).
+
+Append + ``flush``/``fsync`` por línea: un crash como mucho deja una última
+línea truncada, que se ignora al cargar. ``compact`` reescribe el archivo con
+solo el último estado por clave (tmp + ``os.replace``).
+
+Uso típico::
+
+    journal = open_journal(args.journal, lake_root)
+    if journal and journal.is_done("ibkr", sym, "M1", day):
+        ...  # saltar
+    journal.record("ibkr", sym, "M1", day, rows=1440, expected=1440, last_ts=ts, requests=3)
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger("datalake.journal")
+
+Key = Tuple[str, str, str, str]  # (source, symbol, tf, YYYY-MM-DD)
+
+DONE = "done"
+PARTIAL = "partial"
+EMPTY = "empty"
+
+
+def _day_str(day) -> str:
+    if isinstance(day, str):
+        return day[:10]
+    if isinstance(day, datetime):
+        return day.date().isoformat()
+    if isinstance(day, date):
+        return day.isoformat()
+    return pd.Timestamp(day).date().isoformat()
+
+
+def _ts_str(ts) -> Optional[str]:
+    if ts is None or (not isinstance(ts, str) and pd.isna(ts)):
+        return None
+    t = pd.Timestamp(ts)
+    t = t.tz_localize("UTC") if t.tzinfo is None else t.tz_convert("UTC")
+    return t.isoformat()
+
+
+def day_status(rows: int, expected: Optional[int]) -> str:
+    """``done`` si hay todas las filas esperadas (o cualquiera si no se sabe cuántas)."""
+    if rows <= 0:
+        return EMPTY
+    if not expected or rows >= expected:
+        return DONE
+    return PARTIAL
+
+
+class JobJournal:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._state: Dict[Key, dict] = {}
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        bad = 0
+        with open(self.path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                    key = (rec["source"], rec["symbol"], rec["tf"], rec["day"])
+                except (ValueError, KeyError, TypeError):
+                    bad += 1  # línea truncada por un crash
+                    continue
+                self._state[key] = rec
+        if bad:
+            logger.warning("journal %s: %d líneas ilegibles ignoradas", self.path, bad)
+
+    def get(self, source: str, symbol: str, tf: str, day) -> Optional[dict]:
+        with self._lock:
+            rec = self._state.get((source, symbol, tf, _day_str(day)))
+            return dict(rec) if rec else None
+
+    def is_done(self, source: str, symbol: str, tf: str, day) -> bool:
+        rec = self.get(source, symbol, tf, day)
+        return bool(rec) and rec["status"] == DONE
+
+    def pending(self, source: str, symbol: str, tf: str, days: Iterable) -> List[str]:
+        """Días (``YYYY-MM-DD``) de ``days`` que no están ``done``."""
+        return [d for d in map(_day_str, days) if not self.is_done(source, symbol, tf, d)]
+
+    def record(
+        self,
+        source: str,
+        symbol: str,
+        tf: str,
+        day,
+        *,
+        rows: int,
+        expected: Optional[int] = None,
+        last_ts=None,
+        requests: int = 0,
+        status: Optional[str] = None,
+    ) -> dict:
+        """Añade el estado del día; ``requests`` y ``attempts`` se acumulan entre corridas."""
+        key = (source, symbol, tf, _day_str(day))
+        with self._lock:
+            prev = self._state.get(key) or {}
+            rec = {
+                "source": source,
+                "symbol": symbol,
+                "tf": tf,
+                "day": key[3],
+                "status": status or day_status(rows, expected),
+                "rows": int(rows),
+                "expected": int(expected or 0),
+                "last_ts": _ts_str(last_ts) or prev.get("last_ts"),
+                "requests": int(prev.get("requests", 0)) + int(requests),
+                "attempts": int(prev.get("attempts", 0)) + 1,
+                "updated": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            }
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(rec, sort_keys=True) + "\n")
+                fh.flush()
+                os.fsync(fh.fileno())
+            self._state[key] = rec
+            return dict(rec)
+
+    def record_frame(
+        self,
+        source: str,
+        symbol: str,
+        tf: str,
+        df: pd.DataFrame,
+        days: Iterable,
+        *,
+        expected: Optional[int] = None,
+        requests: int = 0,
+    ) -> List[dict]:
+        """Registra cada día de ``days`` a partir de las filas de ``df`` (columna ``ts``).
+
+        Los ``requests`` del lote se reparten entre los días (el primero se
+        queda el resto de la división).
+        """
+        days = [_day_str(d) for d in days]
+        if df is None or df.empty:
+            counts: Dict[str, int] = {}
+            last: Dict[str, pd.Timestamp] = {}
+        else:
+            ts = pd.to_datetime(df["ts"], utc=True)
+            key = ts.dt.strftime("%Y-%m-%d")
+            counts = key.value_counts().to_dict()
+            last = ts.groupby(key).max().to_dict()
+        share, extra = divmod(int(requests), max(1, len(days)))
+        return [
+            self.record(
+                source, symbol, tf, d,
+                rows=int(counts.get(d, 0)),
+                expected=expected,
+                last_ts=last.get(d),
+                requests=share + (extra if i == 0 else 0),
+            )
+            for i, d in enumerate(days)
+        ]
+
+    def states(self) -> pd.DataFrame:
+        with self._lock:
+            recs = list(self._state.values())
+        return pd.DataFrame(recs)
+
+    def compact(self) -> None:
+        """Reescribe el journal con una línea por clave."""
+        with self._lock:
+            recs = [self._state[k] for k in sorted(self._state)]
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                for rec in recs:
+                    fh.write(json.dumps(rec, sort_keys=True) + "\n")
+            os.replace(tmp, self.path)
+
+
+def default_journal_path(lake_root: str) -> str:
+    return os.path.join(lake_root, ".state", "jobs.jsonl")
+
+
+def open_journal(spec: Optional[str], lake_root: str) -> Optional[JobJournal]:
+    """``spec``: ruta, ``auto`` (``<lake>/.state/jobs.jsonl``) u ``off``/vacío (sin journal)."""
+    if not spec or spec.lower() in ("off", "none", "0"):
+        return None
+    if spec.lower() == "auto":
+        spec = default_journal_path(lake_root)
+    return JobJournal(spec)
@@ -0,0 +1,293 @@
+"""Instrumentación ligera de hot paths: spans con tiempo de pared/CPU y contadores.
+
+Uso::
+
+    from datalake.utils.metrics import annotate, span, timed
+
+    @timed("read.range_df", labels=("source", "tf", "symbol"), rows=len)
+    def read_range_df(...):
+        ...
+        annotate(files=len(files))          # suma al span activo del hilo
+
+    with span("binance.fetch_klines", symbol=symbol) as sp:
+        ...
+        sp.set(rows=len(df), requests=len(windows))
+
+Desactivado (default) ``span`` devuelve un no-op compartido y ``timed`` llama
+directo a la función: el costo es una comparación. Se activa con la variable
+``DATALAKE_METRICS`` o con ``configure``:
+
+- ``jsonl:/ruta/metrics.jsonl`` (o una ruta terminada en ``.jsonl``): una
+  línea JSON por span (``span``, ``start``, ``wall_s``, ``cpu_s``, ``ok``,
+  etiquetas y contadores).
+- ``prom:/ruta/datalake.prom``: textfile para el collector de node_exporter
+  con contadores agregados por span (``datalake_span_*_total``), reescrito de
+  forma atómica como mucho cada ``DATALAKE_METRICS_FLUSH_S`` segundos y al
+  salir.
+
+``cpu_s`` es CPU del hilo (``time.thread_time``), así que es comparable entre
+spans que corren en pools de hilos.
+"""
+from __future__ import annotations
+
+import atexit
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+COUNTERS = ("rows", "bytes", "files", "requests")
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+    def __bool__(self) -> bool:  # ``if sp:`` para saltar métricas caras de calcular
+        return False
+
+    def set(self, **values: Any) -> None:
+        pass
+
+    def add(self, **values: float) -> None:
+        pass
+
+
+NOOP = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("name", "values", "_t0", "_c0", "_start")
+
+    def __init__(self, name: str, values: Dict[str, Any]) -> None:
+        self.name = name
+        self.values = values
+
+    def __enter__(self) -> "Span":
+        _stack().append(self)
+        self._start = time.time()
+        self._c0 = time.thread_time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        wall = time.perf_counter() - self._t0
+        cpu = time.thread_time() - self._c0
+        stack = _stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        sink = _SINK
+        if sink is not None:
+            rec = {
+                "span": self.name,
+                "start": datetime.fromtimestamp(self._start, timezone.utc).isoformat(),
+                "wall_s": round(wall, 6),
+                "cpu_s": round(cpu, 6),
+                "ok": exc_type is None,
+            }
+            rec.update(self.values)
+            sink.record(rec)
+        return False
+
+    def __bool__(self) -> bool:
+        return True
+
+    def set(self, **values: Any) -> None:
+        """Fija etiquetas o contadores (reemplaza)."""
+        self.values.update(values)
+
+    def add(self, **values: float) -> None:
+        """Acumula contadores (``rows``, ``bytes``, ...)."""
+        for k, v in values.items():
+            self.values[k] = self.values.get(k, 0) + v
+
+
+# -- sinks ---------------------------------------------------------------------
+class MemorySink:
+    """Guarda los registros en memoria (tests)."""
+
+    def __init__(self) -> None:
+        self.records: List[dict] = []
+        self._lock = threading.Lock()
+
+    def record(self, rec: dict) -> None:
+        with self._lock:
+            self.records.append(rec)
+
+    def flush(self) -> None:
+        pass
+
+
+class JsonlSink:
+    """Una línea JSON por span, en append."""
+
+    def __init__(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._fh = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def record(self, rec: dict) -> None:
+        line = json.dumps(rec, default=str) + "\n"
+        with self._lock:
+            self._fh.write(line)
+            self._fh.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._fh.flush()
+
+
+class PromTextfileSink:
+    """Contadores agregados por span en formato de texto Prometheus."""
+
+    def __init__(self, path: str, flush_s: Optional[float] = None, prefix: str = "datalake_span") -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.prefix = prefix
+        self.flush_s = float(os.getenv("DATALAKE_METRICS_FLUSH_S", "10")) if flush_s is None else flush_s
+        self._agg: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._lock = threading.Lock()
+        self._last = 0.0
+
+    def record(self, rec: dict) -> None:
+        with self._lock:
+            a = self._agg[rec["span"]]
+            a["count"] += 1
+            a["wall_seconds"] += rec["wall_s"]
+            a["cpu_seconds"] += rec["cpu_s"]
+            if not rec["ok"]:
+                a["errors"] += 1
+            for c in COUNTERS:
+                v = rec.get(c)
+                if isinstance(v, (int, float)):
+                    a[c] += v
+            due = time.monotonic() - self._last >= self.flush_s
+        if due:
+            self.flush()
+
+    def render(self) -> str:
+        with self._lock:
+            snap = {name: dict(v) for name, v in self._agg.items()}
+        out = []
+        for metric in ("count", "errors", "wall_seconds", "cpu_seconds", *COUNTERS):
+            full = f"{self.prefix}_{metric}_total"
+            out.append(f"# TYPE {full} counter")
+            for name in sorted(snap):
+                out.append(f'{full}{{span="{name}"}} {snap[name].get(metric, 0.0):g}')
+        return "\n".join(out) + "\n"
+
+    def flush(self) -> None:
+        text = self.render()
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        os.replace(tmp, self.path)
+        self._last = time.monotonic()
+
+
+Sink = Union[MemorySink, JsonlSink, PromTextfileSink]
+
+_SINK: Optional[Sink] = None
+_LOCAL = threading.local()
+
+
+def _stack() -> list:
+    st = getattr(_LOCAL, "stack", None)
+    if st is None:
+        st = _LOCAL.stack = []
+    return st
+
+
+def sink_from_spec(spec: Optional[str]) -> Optional[Sink]:
+    """``None``/``""``/``off`` → sin sink; ``prom:PATH``; ``jsonl:PATH`` o ``PATH``."""
+    if not spec or spec.strip().lower() in ("off", "none", "0"):
+        return None
+    kind, _, path = spec.partition(":")
+    if kind == "prom" and path:
+        return PromTextfileSink(path)
+    if kind == "jsonl" and path:
+        return JsonlSink(path)
+    return JsonlSink(spec)
+
+
+def configure(sink: Union[Sink, str, None]) -> Optional[Sink]:
+    """Activa (o con ``None`` desactiva) la instrumentación. Devuelve el sink anterior."""
+    global _SINK
+    prev = _SINK
+    if prev is not None:
+        prev.flush()
+    _SINK = sink_from_spec(sink) if isinstance(sink, str) else sink
+    return prev
+
+
+def enabled() -> bool:
+    return _SINK is not None
+
+
+def span(name: str, **labels: Any) -> Union[Span, _NoopSpan]:
+    if _SINK is None:
+        return NOOP
+    return Span(name, labels)
+
+
+def annotate(**values: float) -> None:
+    """Suma contadores al span activo del hilo (no-op si no hay)."""
+    if _SINK is None:
+        return
+    st = _stack()
+    if st:
+        st[-1].add(**values)
+
+
+def timed(
+    name: str,
+    *,
+    labels: Sequence[str] = (),
+    rows: Optional[Callable[[Any], int]] = None,
+) -> Callable:
+    """Decorador: un span por llamada; ``labels`` son argumentos a copiar al
+    registro y ``rows(resultado)`` fija el contador de filas."""
+
+    def deco(fn: Callable) -> Callable:
+        sig = inspect.signature(fn) if labels else None
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _SINK is None:
+                return fn(*args, **kwargs)
+            vals: Dict[str, Any] = {}
+            if sig is not None:
+                bound = sig.bind_partial(*args, **kwargs).arguments
+                vals = {k: bound[k] for k in labels if k in bound and isinstance(bound[k], (str, int, float))}
+            with Span(name, vals) as sp:
+                res = fn(*args, **kwargs)
+                if rows is not None:
+                    try:
+                        sp.set(rows=int(rows(res)))
+                    except TypeError:
+                        pass
+                return res
+
+        return wrapper
+
+    return deco
+
+
+def _flush_at_exit() -> None:
+    if _SINK is not None:
+        _SINK.flush()
+
+
+configure(os.getenv("DATALAKE_METRICS"))
+atexit.register(_flush_at_exit)
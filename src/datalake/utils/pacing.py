@@ -0,0 +1,233 @@
+"""Gobernador de ritmo (rate limit) compartido por todos los ingestores.
+
+Combina tres mecanismos en un solo componente thread-safe:
+
+- *token bucket*: limita la tasa de requests por segundo (con ráfaga ``burst``).
+- *budget de weight* en ventana deslizante: suma el weight de cada request y
+  bloquea si se excedería ``max_weight`` dentro de ``window_s`` segundos.
+- *feedback* del servidor: un 429/418 con ``Retry-After`` o una "pacing
+  violation" de IB abren un periodo de enfriamiento (cooldown) durante el cual
+  ``acquire`` espera. Sin ``Retry-After`` el cooldown crece exponencialmente y
+  se reinicia con el primer éxito.
+
+Uso típico::
+
+    gov = governor_for("ibkr")
+    gov.acquire()            # antes de cada request
+    ...
+    gov.on_success()         # o gov.on_throttle(retry_after) si hubo 429
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+
+@dataclass
+class PacingConfig:
+    rate_per_sec: float = 0.0   # <=0 desactiva el token bucket
+    burst: float = 1.0          # tokens máximos acumulables
+    max_weight: float = 0.0     # <=0 desactiva el budget por ventana
+    window_s: float = 60.0
+    backoff_base_s: float = 1.0
+    backoff_max_s: float = 60.0
+
+
+class PacingGovernor:
+    def __init__(
+        self,
+        cfg: Optional[PacingConfig] = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.cfg = cfg or PacingConfig()
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(self.cfg.burst)
+        self._last_refill = clock()
+        self._events: Deque[Tuple[float, float]] = deque()
+        self._used = 0.0
+        self._cooldown_until = 0.0
+        self._strikes = 0
+        self.server_used: Optional[float] = None
+        self.requests = 0
+        self.throttles = 0
+        self.slept_s = 0.0
+
+    def reconfigure(self, cfg: PacingConfig) -> None:
+        with self._lock:
+            self.cfg = cfg
+            self._tokens = min(self._tokens, float(cfg.burst))
+
+    # -- internos (llamar con el lock tomado) --
+    def _refill(self, now: float) -> None:
+        rate = self.cfg.rate_per_sec
+        if rate > 0:
+            self._tokens = min(float(self.cfg.burst), self._tokens + (now - self._last_refill) * rate)
+        self._last_refill = now
+
+    def _expire(self, now: float) -> None:
+        horizon = now - self.cfg.window_s
+        while self._events and self._events[0][0] <= horizon:
+            _, w = self._events.popleft()
+            self._used -= w
+        if not self._events:
+            self._used = 0.0
+
+    def _wait_needed(self, now: float, weight: float) -> float:
+        wait = max(0.0, self._cooldown_until - now)
+        rate = self.cfg.rate_per_sec
+        if rate > 0 and self._tokens < 1.0:
+            wait = max(wait, (1.0 - self._tokens) / rate)
+        limit = self.cfg.max_weight
+        if limit > 0 and self._events and self._used + weight > limit:
+            # esperar a que expire el evento más antiguo de la ventana
+            wait = max(wait, self._events[0][0] + self.cfg.window_s - now)
+        return wait
+
+    # -- API pública --
+    def acquire(self, weight: float = 1.0) -> float:
+        """Bloquea hasta poder emitir un request de ``weight``. Devuelve segundos dormidos."""
+        slept = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                self._expire(now)
+                wait = self._wait_needed(now, weight)
+                if wait <= 0:
+                    if self.cfg.rate_per_sec > 0:
+                        self._tokens -= 1.0
+                    if weight:
+                        self._events.append((now, float(weight)))
+                        self._used += float(weight)
+                    self.requests += 1
+                    self.slept_s += slept
+                    return slept
+            self._sleep(wait)
+            slept += wait
+
+    def on_success(self) -> None:
+        with self._lock:
+            self._strikes = 0
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> float:
+        """Registra un rechazo por rate limit y devuelve el cooldown aplicado (s)."""
+        with self._lock:
+            self._strikes += 1
+            self.throttles += 1
+            if retry_after is not None and retry_after >= 0:
+                # el servidor manda: se respeta aunque supere backoff_max_s
+                delay = float(retry_after)
+            else:
+                delay = min(
+                    self.cfg.backoff_max_s,
+                    self.cfg.backoff_base_s * (2 ** (self._strikes - 1)),
+                )
+            self._cooldown_until = max(self._cooldown_until, self._clock() + delay)
+            return delay
+
+    def observe_used_weight(self, server_used: float) -> None:
+        """Reconcilia el weight local con el que reporta el servidor.
+
+        Si el servidor contabiliza más weight del que vemos (otros procesos en la
+        misma IP, requests previos al arranque...), se registra la diferencia como
+        un evento sintético para que ``acquire`` frene antes de llegar al límite.
+        """
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            self.server_used = float(server_used)
+            deficit = self.server_used - self._used
+            if deficit > 0:
+                self._events.append((now, deficit))
+                self._used += deficit
+
+    def used_weight(self) -> float:
+        with self._lock:
+            self._expire(self._clock())
+            return self._used
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            return {
+                "requests": self.requests,
+                "throttles": self.throttles,
+                "slept_s": round(self.slept_s, 3),
+                "used_weight": self._used,
+                "server_used_weight": self.server_used,
+                "max_weight": self.cfg.max_weight,
+                "cooldown_s": round(max(0.0, self._cooldown_until - now), 3),
+            }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Interpreta la cabecera ``Retry-After`` (solo el formato en segundos)."""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(str(value).strip()))
+    except ValueError:
+        return None
+
+
+# Códigos de error de IB asociados a pacing de datos históricos. El 420 es
+# siempre pacing; el 162 es el error genérico de HMDS y solo cuenta si el
+# mensaje lo dice.
+IB_PACING_CODES = {162, 420}
+
+
+def is_ib_pacing_violation(code: int, msg: str = "") -> bool:
+    """``True`` si el error ``code``/``msg`` de IB es una pacing violation."""
+    if code not in IB_PACING_CODES:
+        return False
+    return code == 420 or "pacing" in (msg or "").lower()
+
+
+def attach_ib_pacing_feedback(ib, governor: "PacingGovernor") -> None:
+    """Suscribe el governor al ``errorEvent`` de ``ib_insync`` para detectar pacing violations."""
+
+    def _on_error(req_id, code, msg, *_):
+        if is_ib_pacing_violation(int(code), str(msg)):
+            governor.on_throttle()
+
+    ib.errorEvent += _on_error
+
+
+# --- Registro de governors compartidos por proceso ---
+DEFAULT_PACING: Dict[str, PacingConfig] = {
+    # Binance spot: 6000 weight/min por IP (binance.com)
+    "binance": PacingConfig(rate_per_sec=20.0, burst=10.0, max_weight=6000.0, window_s=60.0),
+    # IB HMDS: ~1 req/s sostenido y backoff ante pacing violations. Un solo
+    # valor por proceso (IB_RATE_LIMIT_RPS): lo comparten pool, repair e histórico
+    "ibkr": PacingConfig(rate_per_sec=float(os.getenv("IB_RATE_LIMIT_RPS", "0.7")), burst=1.0,
+                         backoff_base_s=2.0, backoff_max_s=120.0),
+}
+
+_GOVERNORS: Dict[str, PacingGovernor] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def governor_for(name: str) -> PacingGovernor:
+    """Devuelve (creándolo si hace falta) el governor compartido para ``name``."""
+    with _REGISTRY_LOCK:
+        gov = _GOVERNORS.get(name)
+        if gov is None:
+            base = DEFAULT_PACING.get(name.split(".", 1)[0], PacingConfig())
+            gov = PacingGovernor(replace(base))
+            _GOVERNORS[name] = gov
+        return gov
+
+
+def configure_governor(name: str, cfg: PacingConfig) -> PacingGovernor:
+    gov = governor_for(name)
+    gov.reconfigure(cfg)
+    return gov
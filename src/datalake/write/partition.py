@@ -0,0 +1,229 @@
+"""Escritura segura de particiones del lake (varios procesos a la vez).
+
+Tres piezas que usan todos los writers (IBKR, Binance, agregados, niveles):
+
+- ``partition_lock``: lock advisory por partición (``.<archivo>.lock`` con
+  ``fcntl.flock`` en POSIX, ``msvcrt.locking`` en Windows). Serializa el
+  ciclo leer → merge → escribir entre procesos que escriben el mismo mes.
+- ``atomic_write_table``: escribe a un temporal único en el mismo directorio
+  y lo publica con ``os.replace``; un lector nunca ve un parquet a medias.
+- ``merge_write``: bajo el lock lee la versión actual, aplica ``merge`` y,
+  antes de publicar, comprueba que la versión (``mtime_ns``, tamaño, inode)
+  no cambió. Si otro escritor sin lock (p. ej. otro host sobre un share) la
+  pisó en medio, se reintenta el merge sobre la versión nueva; agotados los
+  reintentos se lanza ``ConcurrentWriteError``.
+
+Layout interno: ``atomic_write_table`` corta los row groups en días UTC de
+``ts`` (``DATALAKE_ROW_GROUP=day``, default), en bloques de N filas
+(``DATALAKE_ROW_GROUP=1440``) o deja el default de pyarrow (``off``). Los días
+consecutivos se juntan hasta ``DATALAKE_ROW_GROUP_MIN_ROWS`` filas (default
+1000) para no fragmentar TFs altos. Con estadísticas de ``ts`` por row group
+(y page index opcional, ``DATALAKE_PAGE_INDEX=1``) una lectura de un día
+decodifica ~1/30 del archivo mensual.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:  # POSIX
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger("datalake.write")
+
+PathLike = Union[str, Path]
+Version = Optional[Tuple[int, int, int]]
+
+DEFAULT_LOCK_TIMEOUT_S = 300.0
+DEFAULT_ROW_GROUP = "day"
+DEFAULT_ROW_GROUP_MIN_ROWS = 1000
+
+RowGroups = Union[str, int, None]
+
+_UNIT_PER_DAY = {"s": 86_400, "ms": 86_400 * 10**3, "us": 86_400 * 10**6, "ns": 86_400 * 10**9}
+
+
+class ConcurrentWriteError(RuntimeError):
+    """La partición cambió durante el merge en todos los reintentos."""
+
+
+def partition_version(path: PathLike) -> Version:
+    """Versión observable del archivo: ``(mtime_ns, size, inode)`` o ``None`` si no existe."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:  # pragma: no cover - Windows
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:  # pragma: no cover - Windows
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def partition_lock(path: PathLike, timeout: Optional[float] = None, poll_s: float = 0.05) -> Iterator[None]:
+    """Lock exclusivo entre procesos sobre ``.<archivo>.lock`` (espera hasta ``timeout``).
+
+    Oculto (prefijo ``.``) para que los lectores de datasets lo ignoren.
+    """
+    if timeout is None:
+        timeout = float(os.getenv("DATALAKE_LOCK_TIMEOUT", DEFAULT_LOCK_TIMEOUT_S))
+    path = Path(path)
+    lock_path = path.with_name(f".{path.name}.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        deadline = time.monotonic() + timeout
+        while not _try_lock(fd):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"lock de partición ocupado: {lock_path}")
+            time.sleep(poll_s)
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+def row_group_policy(spec: RowGroups = None) -> RowGroups:
+    """``"day"``, un número de filas (``int``) o ``None`` (default de pyarrow).
+
+    Sin ``spec`` se toma ``DATALAKE_ROW_GROUP``.
+    """
+    if spec is None:
+        spec = os.getenv("DATALAKE_ROW_GROUP", DEFAULT_ROW_GROUP)
+    if isinstance(spec, int):
+        return spec if spec > 0 else None
+    spec = str(spec).strip().lower()
+    if spec in ("", "off", "none", "0"):
+        return None
+    if spec == "day":
+        return "day"
+    try:
+        rows = int(spec)
+    except ValueError:
+        raise ValueError(f"DATALAKE_ROW_GROUP inválido: {spec!r} (day | N filas | off)") from None
+    return rows if rows > 0 else None
+
+
+def row_group_bounds(table: pa.Table, policy: RowGroups, min_rows: Optional[int] = None) -> Optional[List[Tuple[int, int]]]:
+    """Cortes ``[(inicio, fin), ...]`` de row groups para ``table`` o ``None`` (sin layout propio).
+
+    ``"day"`` corta donde cambia el día UTC de ``ts`` (respetando el orden de
+    filas) y junta días consecutivos hasta ``min_rows``; sin columna ``ts``
+    de tipo timestamp se deja el default de pyarrow.
+    """
+    n = table.num_rows
+    if policy is None or n == 0:
+        return None
+    if isinstance(policy, int):
+        return [(a, min(a + policy, n)) for a in range(0, n, policy)]
+    if "ts" not in table.column_names or not pa.types.is_timestamp(table.schema.field("ts").type):
+        return None
+    if min_rows is None:
+        min_rows = int(os.getenv("DATALAKE_ROW_GROUP_MIN_ROWS", DEFAULT_ROW_GROUP_MIN_ROWS))
+    col = table.column("ts")
+    raw = col.cast(pa.int64()).fill_null(0).to_numpy()
+    day = raw // _UNIT_PER_DAY[col.type.unit]
+    starts = [0, *(np.flatnonzero(np.diff(day)) + 1).tolist()]
+    bounds: List[Tuple[int, int]] = []
+    a = 0
+    for b in starts[1:] + [n]:
+        if b - a >= min_rows:
+            bounds.append((a, b))
+            a = b
+    if a < n:
+        if bounds and n - a < min_rows:  # cola corta: se suma al último grupo
+            bounds[-1] = (bounds[-1][0], n)
+        else:
+            bounds.append((a, n))
+    return bounds
+
+
+def atomic_write_table(table: pa.Table, dest: PathLike, *, row_groups: RowGroups = None, **write_kwargs) -> Path:
+    """Escribe ``table`` a un temporal del mismo directorio + ``os.replace``.
+
+    ``row_groups`` fija el layout (ver ``row_group_policy``); las estadísticas
+    de columna se escriben siempre y el page index si ``DATALAKE_PAGE_INDEX``.
+    """
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+    write_kwargs.setdefault("write_statistics", True)
+    write_kwargs.setdefault("write_page_index", os.getenv("DATALAKE_PAGE_INDEX", "0").lower() in ("1", "true", "yes", "on"))
+    bounds = row_group_bounds(table, row_group_policy(row_groups))
+    try:
+        if bounds is None:
+            pq.write_table(table, tmp, **write_kwargs)
+        else:
+            with pq.ParquetWriter(tmp, table.schema, **write_kwargs) as writer:
+                for a, b in bounds:
+                    writer.write_table(table.slice(a, b - a), row_group_size=b - a)
+        os.replace(tmp, dest)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return dest
+
+
+def read_partition(path: PathLike) -> Optional[pd.DataFrame]:
+    """Lee un parquet de partición como archivo suelto (sin columnas hive) o ``None``."""
+    if not os.path.exists(path):
+        return None
+    return pq.ParquetFile(path).read().to_pandas()
+
+
+def merge_write(
+    dest: PathLike,
+    merge: Callable[[Optional[pd.DataFrame]], Union[pd.DataFrame, pa.Table]],
+    *,
+    retries: int = 3,
+    lock_timeout: Optional[float] = None,
+    **write_kwargs,
+) -> Path:
+    """Lee ``dest``, escribe ``merge(existente)`` de forma atómica y con lock.
+
+    ``merge`` recibe el DataFrame actual (``None`` si la partición no existe)
+    y devuelve lo que debe quedar escrito. Puede llamarse más de una vez si
+    la versión cambia durante el merge.
+    """
+    dest = Path(dest)
+    with partition_lock(dest, timeout=lock_timeout):
+        for attempt in range(1, retries + 1):
+            before = partition_version(dest)
+            merged = merge(read_partition(dest))
+            table = merged if isinstance(merged, pa.Table) else pa.Table.from_pandas(merged, preserve_index=False)
+            if partition_version(dest) != before:
+                logger.warning("partición modificada durante el merge (intento %d/%d): %s", attempt, retries, dest)
+                continue
+            return atomic_write_table(table, dest, **write_kwargs)
+    raise ConcurrentWriteError(f"la partición cambió en {retries} intentos: {dest}")
@@ -0,0 +1,65 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from datalake.utils.pacing import PacingConfig, governor_for
+from helpers import stub_kline
+
+_INTERVAL_MS = {"1m": 60_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000}
+
+
+class _KlinesHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        srv = self.server
+        q = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        with srv.lock:
+            srv.requests.append(q)
+            srv.peers.add(self.client_address)
+        step = _INTERVAL_MS[q["interval"]]
+        start, end, limit = int(q["startTime"]), int(q["endTime"]), int(q.get("limit", 500))
+        first = -(-start // step) * step
+        bars = [stub_kline(t, step) for t in range(first, end + 1, step)
+                if t not in srv.missing_ms][:limit]
+        body = json.dumps(bars).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-MBX-USED-WEIGHT-1M", str(2 * len(srv.requests)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def binance_stub():
+    """Servidor HTTP local que imita /api/v3/klines. Devuelve el server (``.url``, ``.requests``)."""
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _KlinesHandler)
+    srv.daemon_threads = True
+    srv.lock = threading.Lock()
+    srv.requests = []
+    srv.peers = set()
+    srv.missing_ms = set()
+    srv.url = f"http://127.0.0.1:{srv.server_address[1]}"
+    th = threading.Thread(target=srv.serve_forever, daemon=True)
+    th.start()
+    try:
+        yield srv
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+@pytest.fixture
+def fast_ibkr_governor():
+    gov = governor_for("ibkr")
+    old = gov.cfg
+    gov.reconfigure(PacingConfig(backoff_base_s=0.0))
+    yield gov
+    gov.reconfigure(old)
@@ -0,0 +1,54 @@
+"""Dobles de prueba compartidos (Binance klines, IB) que los tests importan directamente."""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pandas as pd
+
+
+def stub_kline(open_ms: int, step_ms: int) -> list:
+    """Kline con el mismo layout que /api/v3/klines y precios deterministas.
+
+    Como en Binance, una vela de más de 1m es la agregación exacta de sus
+    velas de 1m.
+    """
+    px = [100.0 + (t // 60_000) % 97 for t in range(open_ms, open_ms + step_ms, 60_000)]
+    n = len(px)
+    return [
+        open_ms, f"{px[0]:.2f}", f"{max(px) + 1:.2f}", f"{min(px) - 1:.2f}", f"{px[-1] + 0.5:.2f}", f"{1.5 * n}",
+        open_ms + step_ms - 1, f"{150.0 * n}", 10 * n, f"{0.7 * n:.2f}", f"{70.0 * n}", "0",
+    ]
+
+
+class _Event(list):
+    def __iadd__(self, fn):
+        self.append(fn)
+        return self
+
+
+class HonourIB:
+    """IB falso que solo devuelve las últimas ``max_span`` horas de cada request."""
+
+    def __init__(self, max_span=timedelta(hours=12)):
+        self.errorEvent = _Event()
+        self.max_span = max_span
+        self.connected = False
+        self.client_id = None
+
+    def connect(self, host, port, clientId, timeout=None, **k):
+        self.connected, self.client_id = True, clientId
+
+    def isConnected(self):
+        return self.connected
+
+    def reqCurrentTime(self):
+        return 0
+
+    def disconnect(self):
+        self.connected = False
+
+    def reqHistoricalData(self, contract, endDateTime, durationStr, **kw):
+        end = datetime.strptime(endDateTime, "%Y%m%d %H:%M:%S UTC").replace(tzinfo=timezone.utc)
+        dur = timedelta(seconds=int(durationStr.split()[0]))
+        start = end - min(dur, self.max_span)
+        ts = pd.date_range(pd.Timestamp(start).ceil("min"), end, freq="min", inclusive="left")
+        return [SimpleNamespace(date=t.to_pydatetime(), open=1.0, high=1.0, low=1.0, close=1.0, volume=1.0) for t in ts]
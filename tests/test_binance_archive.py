@@ -0,0 +1,90 @@
+import zipfile
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from datalake.ingestors.binance.archive_cli import (
+    LocalArchiveFetcher,
+    archive_relpath,
+    backfill,
+    read_kline_archive,
+)
+from helpers import stub_kline
+
+UTC = timezone.utc
+
+
+def _write_zip(path, start, n, step_min, *, header=False, unit_us=False):
+    step_ms = step_min * 60_000
+    t0 = int(start.timestamp() * 1000)
+    lines = ["open_time,open,high,low,close,volume,close_time,quote_volume,count,"
+             "taker_buy_volume,taker_buy_quote_volume,ignore"] if header else []
+    for i in range(n):
+        k = stub_kline(t0 + i * step_ms, step_ms)
+        if unit_us:
+            k[0], k[6] = k[0] * 1000, k[6] * 1000
+        lines.append(",".join(str(v) for v in k))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(path.with_suffix(".csv").name, "\n".join(lines) + "\n")
+
+
+def test_read_kline_archive_header_and_micros(tmp_path):
+    start = datetime(2025, 8, 1, tzinfo=UTC)
+    z = tmp_path / "BTCUSDT-30m-2025-08-01.zip"
+    _write_zip(z, start, 48, 30, header=True, unit_us=True)
+    df = read_kline_archive(z)
+    assert len(df) == 48
+    assert df["ts"].iloc[0] == pd.Timestamp(start)
+    assert df["close"].dtype == "float64"
+
+    empty = tmp_path / "BTCUSDT-30m-2025-08-02.zip"
+    _write_zip(empty, start, 0, 30)
+    assert list(read_kline_archive(empty).columns) == list(df.columns)
+    assert read_kline_archive(empty).dtypes.drop("ts").equals(df.dtypes.drop("ts"))
+
+
+def test_backfill_monthly_then_daily(tmp_path):
+    arch = tmp_path / "archive"
+    # Julio: ZIP mensual (layout data.binance.vision). Agosto: solo diarios (plano).
+    _write_zip(arch / archive_relpath("BTCUSDT", "M30", 2025, 7), datetime(2025, 7, 1, tzinfo=UTC), 31 * 48, 30)
+    for d in (1, 2):
+        day = datetime(2025, 8, d, tzinfo=UTC)
+        _write_zip(arch / f"BTCUSDT-30m-2025-08-{d:02d}.zip", day, 48, 30, header=True)
+
+    lake = tmp_path / "lake"
+    paths = backfill("BTC-USD", "M30", "2025-07-30", "2025-08-02", LocalArchiveFetcher(arch), root=str(lake))
+
+    assert len(paths) == 2
+    jul, aug = (pd.read_parquet(p) for p in paths)
+    assert len(jul) == 2 * 48 and len(aug) == 2 * 48
+    assert jul["ts"].min() == pd.Timestamp("2025-07-30", tz="UTC")
+    assert set(aug["source"]) == {"binance"} and set(aug["symbol"]) == {"BTC-USD"}
+    assert aug["ts"].max() == pd.Timestamp("2025-08-02 23:30", tz="UTC")
+
+
+def test_backfill_missing_middle_month_and_single_venue(tmp_path, binance_stub, monkeypatch, capsys):
+    import pytest
+
+    from datalake.providers.binance import client
+
+    monkeypatch.setitem(client.BASE_URLS, "global", binance_stub.url)
+    arch = tmp_path / "archive"
+    _write_zip(arch / archive_relpath("BTCUSDT", "M30", 2025, 7), datetime(2025, 7, 1, tzinfo=UTC), 31 * 48, 30)
+    _write_zip(arch / archive_relpath("BTCUSDT", "M30", 2025, 9), datetime(2025, 9, 1, tzinfo=UTC), 30 * 48, 30)
+    lake = tmp_path / "lake"
+
+    # archivos de binance.com: no se etiquetan ni se completan como Binance.US
+    with pytest.raises(ValueError):
+        backfill("BTC-USD", "M30", "2025-07-31", "2025-09-01", LocalArchiveFetcher(arch), region="us", root=str(lake))
+
+    # sin --rest-tail agosto queda reportado como hueco
+    paths = backfill("BTC-USD", "M30", "2025-07-31", "2025-09-01", LocalArchiveFetcher(arch), root=str(lake))
+    assert len(paths) == 2 and not binance_stub.requests
+    assert "meses sin archivo (huecos; usar --rest-tail): 2025-08" in capsys.readouterr().out
+
+    paths = backfill("BTC-USD", "M30", "2025-07-31", "2025-09-01", LocalArchiveFetcher(arch),
+                     rest_tail=True, root=str(lake))
+    assert len(paths) == 3 and binance_stub.requests
+    aug = pd.read_parquet(paths[1])
+    assert len(aug) == 31 * 48 and set(aug["exchange"]) == {"BINANCE"}
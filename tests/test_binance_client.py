@@ -0,0 +1,63 @@
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from datalake.providers.binance.client import klines_frame, parse_klines, plan_pages, fetch_klines, weight_budget
+from helpers import stub_kline
+
+UTC = timezone.utc
+
+
+def test_plan_pages_m1_day():
+    start = datetime(2025, 8, 1, tzinfo=UTC)
+    end = datetime(2025, 8, 1, 23, 59, tzinfo=UTC)
+    wins = plan_pages(start, end, "M1")
+    assert [w[2] for w in wins] == [1000, 440]
+    assert wins[1][0] == datetime(2025, 8, 1, 16, 40, tzinfo=UTC)
+    assert wins[-1][1] == end
+
+
+def test_fetch_klines_parallel_pages(binance_stub):
+    start = datetime(2025, 8, 1, tzinfo=UTC)
+    end = datetime(2025, 8, 3, 23, 59, tzinfo=UTC)
+    df = fetch_klines("BTCUSDT", start, end, tf="M1", max_workers=3, base_url=binance_stub.url)
+
+    assert len(df) == 3 * 1440
+    assert df["ts"].is_monotonic_increasing and df["ts"].is_unique
+    assert df["ts"].iloc[0] == pd.Timestamp(start) and df["ts"].iloc[-1] == pd.Timestamp(end)
+    assert len(binance_stub.requests) == 5
+    # keep-alive: las 5 páginas viajan por como mucho 3 conexiones
+    assert len(binance_stub.peers) <= 3
+    assert weight_budget("global")["server_used"] is not None
+
+
+def test_klines_frame_dedupes_overlapping_pages_and_clips_once():
+    t0 = 1_754_006_400_000  # 2025-08-01 UTC
+    a = parse_klines([stub_kline(t0 + i * 60_000, 60_000) for i in range(0, 6)])
+    b = parse_klines([stub_kline(t0 + i * 60_000, 60_000) for i in range(4, 10)])
+    df = klines_frame([b, a, parse_klines([])], t0 + 60_000, t0 + 8 * 60_000)
+
+    assert len(df) == 8 and df["ts"].is_monotonic_increasing and df["ts"].is_unique
+    assert df["ts"].iloc[0] == pd.Timestamp(t0 + 60_000, unit="ms", tz="UTC")
+    assert df["close"].iloc[0] == float(stub_kline(t0 + 60_000, 60_000)[4])
+    assert str(df["trades"].dtype) == "Int32" and df["trades"].eq(10).all()
+
+
+def test_klines_frame_schema_stable_and_bad_fields_coerced():
+    empty = klines_frame([], 0, 10**12)
+    full = klines_frame([parse_klines([stub_kline(0, 60_000)])], 0, 10**12)
+    assert list(empty.columns) == list(full.columns) and empty.dtypes.equals(full.dtypes)
+
+    bad = stub_kline(60_000, 60_000)
+    bad[1], bad[8] = "", "n/a"  # open vacío, trades no numérico
+    df = klines_frame([parse_klines([stub_kline(0, 60_000), bad, [""] * 12])], 0, 10**12)
+    assert len(df) == 2 and pd.isna(df["open"].iloc[1]) and pd.isna(df["trades"].iloc[1])
+    assert df["trades"].iloc[0] == 10
+
+
+def test_fetch_klines_inverted_range_keeps_schema(binance_stub):
+    start, end = datetime(2025, 8, 2, tzinfo=UTC), datetime(2025, 8, 1, tzinfo=UTC)
+    df = fetch_klines("BTCUSDT", start, end, tf="M1", base_url=binance_stub.url)
+    ref = klines_frame([], 0, 0)
+    assert df.empty and not binance_stub.requests
+    assert list(df.columns) == list(ref.columns) and df.dtypes.equals(ref.dtypes)
@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import pandas as pd
+
+from datalake.ingestors.binance import ingest_cli
+from datalake.providers.binance import client
+
+
+def test_range_ingest_packs_pages_and_writes_per_month(binance_stub, tmp_path, monkeypatch):
+    monkeypatch.setitem(client.BASE_URLS, "global", binance_stub.url)
+    monkeypatch.setenv("LAKE_ROOT", str(tmp_path))
+    args = SimpleNamespace(symbols="BTC-USD", date_from="2025-07-30", date_to="2025-08-02",
+                           tf="M5", binance_region="global")
+
+    paths = ingest_cli.ingest(args)
+
+    # 4 días x 288 = 1152 velas -> 2 requests (antes: 4, uno por día)
+    assert len(binance_stub.requests) == 2
+    assert sorted(p.rsplit("part-", 1)[1] for p in paths) == ["2025-07.parquet", "2025-08.parquet"]
+    counts = [len(pd.read_parquet(p)) for p in sorted(paths)]
+    assert counts == [2 * 288, 2 * 288]
+
+
+def test_derive_from_m1_matches_api_and_skips_coarse_downloads(binance_stub, tmp_path, monkeypatch):
+    monkeypatch.setitem(client.BASE_URLS, "global", binance_stub.url)
+    root = str(tmp_path)
+    paths, rows = ingest_cli.ingest_symbol("BTC-USD", "M1", "2025-08-01", "2025-08-02", "global",
+                                           root=root, derive=["M5", "M15", "M30"])
+    assert rows == 2 * 1440
+    assert {r["interval"] for r in binance_stub.requests} == {"1m"}
+    assert len(paths) == 4
+
+    for tf, n in (("M5", 288), ("M15", 96), ("M30", 48)):
+        r = ingest_cli.verify_derived("BTC-USD", tf, "2025-08-02", "global", root=root)
+        assert r["api_rows"] == r["local_rows"] == n
+        assert r["mismatched"] == r["only_api"] == r["only_local"] == 0
+
+
+def test_extended_fields_are_stored_compact_and_projected_on_demand(binance_stub, tmp_path, monkeypatch):
+    from datalake.read.api import read_range_df
+
+    monkeypatch.setitem(client.BASE_URLS, "global", binance_stub.url)
+    root = str(tmp_path)
+    ingest_cli.ingest_symbol("BTC-USD", "M1", "2025-08-01", "2025-08-01", "global", root=root, derive=["M15"])
+
+    part = next(tmp_path.rglob("timeframe=M1/**/part-*.parquet"))
+    raw = pd.read_parquet(part)
+    assert str(raw["quote_volume"].dtype) == "float64" and str(raw["trades"].dtype) == "Int32"
+    assert raw["trades"].eq(10).all()
+
+    kw = dict(market="crypto", symbol="BTC-USD", date_from="2025-08-01", date_to="2025-08-02", source="binance")
+    ohlcv = read_range_df(root, tf="M1", **kw)
+    assert len(ohlcv) == 1440 and "trades" not in ohlcv.columns
+    m15 = read_range_df(root, tf="M15", columns=["close", "trades", "taker_buy_quote"], **kw)
+    assert list(m15.columns) == ["ts", "close", "trades", "taker_buy_quote"]
+    assert m15["trades"].eq(150).all()  # 15 velas de 1m x 10 trades
+    assert ingest_cli.verify_derived("BTC-USD", "M15", "2025-08-01", "global", root=root)["mismatched"] == 0
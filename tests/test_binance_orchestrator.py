@@ -0,0 +1,28 @@
+import pandas as pd
+
+from datalake.ingestors.binance.orchestrator import month_range, plan_units, run_units
+from datalake.providers.binance import client
+
+
+def test_plan_units_spans_months_and_starts_with_heaviest():
+    assert month_range("2024-11", "2025-02") == [(2024, 11), (2024, 12), (2025, 1), (2025, 2)]
+    units = plan_units(["BTC-USD", "ETH-USD"], ["M5", "M1"], "2025-07", "2025-08")
+    assert len(units) == 8
+    assert {u.tf for u in units[:4]} == {"M1"}
+    assert units[0].planned_requests == 45  # 31 días de M1 en páginas de 1000
+
+
+def test_run_units_fills_every_partition_in_parallel(binance_stub, tmp_path, monkeypatch):
+    monkeypatch.setitem(client.BASE_URLS, "global", binance_stub.url)
+    units = plan_units(["BTC-USD", "ETH-USD"], ["M15", "M30"], "2025-07", "2025-08")
+    done = []
+    report = run_units(units, region="global", workers=4, root=str(tmp_path), progress=done.append)
+
+    assert not report.failed and len(done) == 8
+    assert report.requests == len(binance_stub.requests) == sum(u.planned_requests for u in units)
+    assert report.rows == 2 * (62 * 96 + 62 * 48)
+    s = report.summary()
+    assert s["bars_per_sec"] > 0 and s["requests_per_min"] > 0 and s["target_weight_per_min"] > 0
+    parts = sorted(tmp_path.rglob("part-*.parquet"))
+    assert len(parts) == 8
+    assert sorted(len(pd.read_parquet(p)) for p in parts) == [31 * 48] * 4 + [31 * 96] * 4
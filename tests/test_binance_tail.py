@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from datalake.ingestors.binance.tail import TailUpdater, last_lake_ts
+from datalake.providers.binance import client
+
+UTC = timezone.utc
+
+
+def test_tail_batches_writes_and_resumes_from_lake(binance_stub, tmp_path, monkeypatch):
+    monkeypatch.setitem(client.BASE_URLS, "global", binance_stub.url)
+    now = [datetime(2025, 8, 1, 0, 30, 5, tzinfo=UTC)]
+    tail = TailUpdater(["BTC-USD", "ETH-USD"], "M1", root=str(tmp_path), lookback_min=20,
+                       flush_s=120, clock=lambda: now[0])
+    tail.bootstrap()
+
+    assert tail.poll_once() == 2 * 20  # 00:10 → 00:29 (00:30 aún abierta)
+    assert not list(tmp_path.rglob("part-*.parquet"))  # todavía en el buffer
+    now[0] += timedelta(minutes=1)
+    assert tail.poll_once() == 2 and len(binance_stub.requests) == 4
+    now[0] += timedelta(minutes=1)
+    assert tail.poll_once() == 2  # flush_s cumplido → un merge por símbolo
+
+    part = next(tmp_path.rglob("symbol=BTC-USD/**/part-*.parquet"))
+    df = pd.read_parquet(part)
+    assert len(df) == 22 and df["ts"].max() == pd.Timestamp("2025-08-01 00:31", tz="UTC")
+    m = tail.metrics()["BTC-USD"]
+    assert m["pending_rows"] == 0 and m["rows_written"] == 22 and m["lag_s"] == 5.0  # 00:32:05 - cierre de 00:31
+
+    # reinicio: el cursor sale del lake, no se repiden las velas escritas
+    assert last_lake_ts(str(tmp_path), "BTC-USD", "M1") == datetime(2025, 8, 1, 0, 31, tzinfo=UTC)
+    now[0] += timedelta(minutes=3)
+    again = TailUpdater(["BTC-USD"], "M1", root=str(tmp_path), flush_s=0, clock=lambda: now[0])
+    again.bootstrap()
+    assert again.poll_once() == 3
+    assert binance_stub.requests[-1]["startTime"] == str(int(datetime(2025, 8, 1, 0, 32, tzinfo=UTC).timestamp() * 1000))
+    assert len(pd.read_parquet(part)) == 25
+
+
+def test_tail_flush_failure_keeps_batch_pending(binance_stub, tmp_path, monkeypatch):
+    from datalake.ingestors.binance import tail as tail_mod
+    from datalake.write.partition import ConcurrentWriteError
+
+    monkeypatch.setitem(client.BASE_URLS, "global", binance_stub.url)
+    now = [datetime(2025, 8, 1, 0, 30, 5, tzinfo=UTC)]
+    tail = TailUpdater(["BTC-USD", "ETH-USD"], "M1", root=str(tmp_path), lookback_min=10,
+                       flush_s=0, clock=lambda: now[0])
+    tail.bootstrap()
+    real = tail_mod.write_by_month
+    fail = {"BTC-USD"}
+
+    def flaky(df, root):
+        if df["symbol"].iloc[0] in fail:
+            raise ConcurrentWriteError("la partición cambió")
+        return real(df, root=root)
+
+    monkeypatch.setattr(tail_mod, "write_by_month", flaky)
+    assert tail.poll_once() == 2 * 10  # flush_s=0: escribe en el mismo ciclo; BTC falla sin tumbar el daemon
+    btc, eth = tail.metrics()["BTC-USD"], tail.metrics()["ETH-USD"]
+    assert btc["errors"] == 1 and btc["pending_rows"] == 10 and btc["rows_written"] == 0
+    assert eth["errors"] == 0 and eth["rows_written"] == 10
+    assert not list(tmp_path.rglob("symbol=BTC-USD/**/part-*.parquet"))
+
+    fail.clear()
+    now[0] += timedelta(minutes=1)
+    assert tail.poll_once() == 2  # el lote retenido + la vela nueva en un solo merge
+    part = next(tmp_path.rglob("symbol=BTC-USD/**/part-*.parquet"))
+    assert len(pd.read_parquet(part)) == 11 and tail.metrics()["BTC-USD"]["pending_rows"] == 0
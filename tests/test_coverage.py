@@ -0,0 +1,58 @@
+import os
+
+import pandas as pd
+
+from datalake.tools import coverage
+
+
+def _write(root, source, tf, symbol, ts, synth=None):
+    d = os.path.join(root, "data", f"source={source}", "market=crypto", f"timeframe={tf}",
+                     f"symbol={symbol}", f"year={ts[0].year:04d}", f"month={ts[0].month:02d}")
+    os.makedirs(d, exist_ok=True)
+    df = pd.DataFrame({"ts": ts, "close": 1.0})
+    if synth is not None:
+        df["is_synth"] = synth
+    df.to_parquet(os.path.join(d, f"part-{ts[0].year:04d}-{ts[0].month:02d}.parquet"), index=False)
+
+
+def test_coverage_matrix_and_cli(tmp_path):
+    m1 = pd.date_range("2025-08-01", "2025-08-03 23:59", freq="min", tz="UTC")
+    m1 = m1[(m1.day != 2)].delete([10, 11, 12])  # día 2 vacío, 3 huecos el día 1
+    synth = [i < 5 for i in range(len(m1))]
+    _write(tmp_path, "ibkr", "M1", "BTC-USD", m1, synth)
+    m5 = pd.date_range("2025-07-31", "2025-08-01 23:55", freq="5min", tz="UTC")
+    _write(tmp_path, "binance", "M5", "ETH-USD", m5[m5.month == 7])
+    _write(tmp_path, "binance", "M5", "ETH-USD", m5[m5.month == 8])
+
+    df = coverage.coverage_matrix(str(tmp_path), max_workers=2)
+    btc = df[df["symbol"] == "BTC-USD"].set_index("date")
+    assert list(btc["rows"]) == [1437, 0, 1440]
+    assert list(btc["missing_minutes"]) == [3, 1440, 0]
+    assert list(btc["synth_bars"]) == [5, 0, 0]
+    eth = df[df["symbol"] == "ETH-USD"]
+    assert list(eth["expected"]) == [288, 288] and eth["missing_bars"].sum() == 0
+
+    out = tmp_path / "rep" / "coverage.parquet"
+    rc = coverage.main(["--lake-root", str(tmp_path), "--source", "ibkr",
+                        "--from", "2025-08-01", "--to", "2025-08-02", "--out", str(out), "--strict"])
+    assert rc == 1
+    rep = pd.read_parquet(out)
+    assert len(rep) == 2 and set(rep["source"]) == {"ibkr"}
+
+
+def test_coverage_window_reports_trailing_and_missing_series(tmp_path):
+    m1 = pd.date_range("2025-08-01", "2025-08-02 23:59", freq="min", tz="UTC")
+    _write(tmp_path, "binance", "M1", "BTC-USD", m1)  # falta el 03/08 (ingesta de anoche)
+
+    df = coverage.coverage_matrix(str(tmp_path), sources=["binance"], timeframes=["M1"],
+                                  symbols=["BTC-USD", "ETH-USD"], date_from="2025-07-31", date_to="2025-08-03")
+    btc = df[df["symbol"] == "BTC-USD"]
+    assert [str(d) for d in btc["date"]] == ["2025-07-31", "2025-08-01", "2025-08-02", "2025-08-03"]
+    assert list(btc["rows"]) == [0, 1440, 1440, 0]
+    eth = df[df["symbol"] == "ETH-USD"]  # sin ningún archivo
+    assert len(eth) == 4 and eth["rows"].sum() == 0 and (eth["missing_bars"] == 1440).all()
+
+    rc = coverage.main(["--lake-root", str(tmp_path), "--source", "binance", "--tf", "M1", "--symbols", "BTC-USD",
+                        "--from", "2025-08-01", "--to", "2025-08-03", "--out", str(tmp_path / "c.parquet"),
+                        "--strict"])
+    assert rc == 1
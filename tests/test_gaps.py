@@ -0,0 +1,42 @@
+import pandas as pd
+
+from datalake.tools.gaps import gap_runs, gap_runs_by_symbol
+
+
+def _day(step="1min"):
+    return pd.date_range("2025-08-01", "2025-08-01 23:59", freq=step, tz="UTC")
+
+
+def test_gap_runs_single_symbol_m1():
+    full = _day()
+    present = full.delete(list(range(0, 3)) + list(range(100, 110)) + [1439])
+    runs = gap_runs(pd.Series(present), full[0], full[-1])
+    assert runs.missing == 14
+    assert runs.to_list() == [
+        (full[0], full[2]),
+        (full[100], full[109]),
+        (full[1439], full[1439]),
+    ]
+    assert gap_runs(pd.Series(full), full[0], full[-1]).to_list() == []
+    assert gap_runs([], full[0], full[-1]).to_list() == [(full[0], full[-1])]
+
+
+def test_gap_runs_step_and_end_alignment():
+    full = _day("5min")
+    present = full.delete([10, 11])
+    # end 23:59 no cae en la grilla de 5 minutos: se recorta a 23:55
+    runs = gap_runs(present, full[0], pd.Timestamp("2025-08-01 23:59", tz="UTC"), "5min")
+    assert runs.to_list() == [(full[10], full[11])]
+
+
+def test_gap_runs_by_symbol():
+    full = _day()
+    df = pd.concat([
+        pd.DataFrame({"symbol": "BTC-USD", "ts": full.delete([5, 6])}),
+        pd.DataFrame({"symbol": "ETH-USD", "ts": full}),
+    ])
+    runs = gap_runs_by_symbol(df, full[0], full[-1], symbols=["SOL-USD"])
+    frame = runs.to_frame()
+    assert list(frame["symbol"]) == ["BTC-USD", "SOL-USD"]
+    assert list(frame["bars"]) == [2, 1440]
+    assert frame["start"].iloc[0] == full[5]
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+from ib_insync import BarData
+
+from datalake.ingestors.ibkr.downloader import bars_frame_utc, bars_to_columns, bars_to_df
+
+
+def _bars(n, tz=timezone.utc):
+    t0 = datetime(2025, 8, 1, tzinfo=tz)
+    return [BarData(date=t0 + timedelta(minutes=i), open=1.0 + i, high=2.0 + i, low=0.5,
+                    close=1.5 + i, volume=10, average=1.0, barCount=2) for i in range(n)]
+
+
+def test_bars_to_columns_and_frames():
+    bars = _bars(5)
+    cols = bars_to_columns(bars)
+    assert cols["open"].dtype == "float64" and cols["volume"].tolist() == [10.0] * 5
+
+    df = bars_frame_utc(list(reversed(bars)))
+    assert list(df.columns) == ["ts", "open", "high", "low", "close", "volume"]
+    assert df["ts"].is_monotonic_increasing and str(df["ts"].dt.tz) == "UTC"
+    assert df["close"].iloc[-1] == 5.5
+
+    # fechas naive se interpretan en la tz del exchange (PAXOS -> New York)
+    naive = _bars(3, tz=None)
+    out = bars_to_df(naive, exchange="PAXOS")
+    assert out["ts"].iloc[0] == pd.Timestamp("2025-08-01 04:00", tz="UTC")
+    assert bars_frame_utc([]).empty and bars_to_df([], "PAXOS").empty
+
+
+def test_bars_to_columns_tolerates_missing_fields():
+    from types import SimpleNamespace
+
+    t0 = datetime(2025, 8, 1, tzinfo=timezone.utc)
+    bars = [SimpleNamespace(date=t0, open=1.0, high=2.0, low=0.5, close=1.5, volume=10),
+            SimpleNamespace(date=t0 + timedelta(minutes=1), open=1.0, high=2.0, low=0.5, close=1.5),
+            SimpleNamespace(date=t0 + timedelta(minutes=2), open=1.0, high=2.0, low=0.5, close=1.5, volume=None)]
+    cols = bars_to_columns(bars)
+    assert cols["volume"][0] == 10.0 and pd.isna(cols["volume"][1:]).all()
+    assert len(bars_frame_utc(bars)) == 3
@@ -0,0 +1,45 @@
+import threading
+
+from helpers import HonourIB
+from datalake.ingestors.ibkr.session import IBSessionPool, SessionConfig
+
+
+class FakeIB(HonourIB):
+    instances = []
+
+    def __init__(self):
+        super().__init__()
+        FakeIB.instances.append(self)
+
+
+def test_pool_reuses_and_health_checks():
+    FakeIB.instances = []
+    pool = IBSessionPool(SessionConfig(host="h", port=1, base_client_id=10, size=2), factory=FakeIB)
+
+    with pool.session() as a:
+        with pool.session() as b:
+            assert {a.client_id, b.client_id} == {10, 11}
+    with pool.session() as c:
+        assert c in (a, b)
+    assert pool.stats()["connects"] == 2
+
+    # sesión caída -> se reconecta con el mismo client id
+    c.connected = False
+    with pool.session() as d:
+        assert d.isConnected() and d.client_id == c.client_id
+    assert pool.stats()["reconnects"] == 1
+
+    pool.close()
+    assert not any(ib.isConnected() for ib in FakeIB.instances)
+
+
+def test_pool_blocks_when_exhausted():
+    pool = IBSessionPool(SessionConfig(host="h", port=1, base_client_id=1, size=1), factory=FakeIB)
+    got = []
+    with pool.session() as a:
+        t = threading.Thread(target=lambda: got.append(pool.session().__enter__()))
+        t.start()
+        t.join(0.2)
+        assert not got  # esperando a que se libere la única sesión
+    t.join(2)
+    assert got == [a]
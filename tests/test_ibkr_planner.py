@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from helpers import HonourIB
+from datalake.ingestors.ibkr import ingest_cli
+from datalake.ingestors.ibkr.planner import AdaptivePlanner, FixedPlanner
+from datalake.ingestors.ibkr.session import IBSessionPool, SessionConfig
+
+UTC = timezone.utc
+KEY = ("BTC-USD", "PAXOS")
+
+
+def test_adaptive_planner_learns_and_persists(tmp_path):
+    state = tmp_path / "planner.json"
+    p = AdaptivePlanner(str(state))
+    day = datetime(2025, 8, 1, tzinfo=UTC)
+    assert len(p.day_chunks(day, KEY)) == 3  # 20h de cuerpo con ventanas de 8h
+    p.observe(KEY, 8 * 3600, 8 * 3600)
+    p.observe(KEY, 8 * 3600, 8 * 3600)
+    assert p.window_s(KEY) == 12 * 3600
+    chunks = p.day_chunks(day, KEY)
+    assert len(chunks) == 2 and chunks[0][0] == day and chunks[-1][1] == day + timedelta(hours=19, minutes=59)
+    p.observe(KEY, 12 * 3600, 5 * 3600)  # IB devolvió solo 5h
+    assert p.window_s(KEY) == 5 * 3600
+    for _ in range(8):
+        p.observe(KEY, p.window_s(KEY), p.window_s(KEY))
+    assert p.window_s(KEY) < 12 * 3600  # no vuelve a crecer hasta el techo que falló
+    p.save()
+    assert AdaptivePlanner(str(state)).window_s(KEY) == p.window_s(KEY)
+    assert FixedPlanner().day_chunks(day, KEY)[-1][1] == day + timedelta(hours=15, minutes=59)
+
+
+def _run(planner, tmp_path, monkeypatch):
+    pool = IBSessionPool(SessionConfig(host="h", port=1, base_client_id=1), factory=HonourIB)
+    monkeypatch.setattr(ingest_cli, "shared_pool", lambda: pool)
+    monkeypatch.delenv("DATALAKE_SYNTH", raising=False)
+    out = tmp_path / planner / "metrics.csv"
+    args = ingest_cli._build_parser().parse_args([
+        "--symbols", "BTC-USD", "--from", "2025-08-01", "--to", "2025-08-04",
+        "--planner", planner, "--planner-state", str(tmp_path / planner / "state.json"),
+        "--metrics-out", str(out),
+    ])
+    ingest_cli.ingest(args, data_root=str(tmp_path / planner))
+    return pd.read_csv(out)
+
+
+def test_adaptive_uses_fewer_requests_per_filled_day(tmp_path, monkeypatch, fast_ibkr_governor):
+    fixed = _run("fixed", tmp_path, monkeypatch)
+    adaptive = _run("adaptive", tmp_path, monkeypatch)
+    assert fixed["filled"].all() and adaptive["filled"].all()
+    assert adaptive["requests"].sum() < fixed["requests"].sum()
+    assert adaptive["requests"].iloc[-1] < fixed["requests"].iloc[-1]
@@ -31,3 +31,19 @@ def test_argparse_and_metadata(tmp_path, monkeypatch):
     assert (df["timeframe"] == "M1").all()
     assert (df["symbol"] == "BTC-USD").all()
     assert (df["what_to_show"] == "AGGTRADES").all()
+
+
+def test_synth_fill_flat_bars_any_step():
+    from datetime import datetime, timedelta, timezone
+
+    start = datetime(2025, 8, 1, tzinfo=timezone.utc)
+    full = pd.date_range(start, periods=288, freq="5min", tz="UTC")
+    df = pd.DataFrame({"ts": full[[2, 3, 10]], "open": [1.0, 2.0, 3.0], "high": 9.0,
+                       "low": 0.0, "close": [1.5, 2.5, 3.5], "volume": 1.0})
+    out = ingest_cli._synth_fill(df, start, step=timedelta(minutes=5)).reset_index(drop=True)
+    assert len(out) == 288 and out["ts"].is_monotonic_increasing
+    synth = out[out["is_synth"]]
+    assert len(synth) == 285 and (synth["volume"] == 0).all()
+    # hueco inicial -> open siguiente; intermedio y final -> close previo
+    assert list(out.loc[[0, 1, 4, 287], "close"]) == [1.0, 1.0, 2.5, 3.5]
+    assert not out.loc[[2, 3, 10], "is_synth"].any()
@@ -0,0 +1,117 @@
+from types import SimpleNamespace
+
+import pandas as pd
+
+from helpers import HonourIB
+from datalake.ingestors.binance import ingest_cli
+from datalake.ingestors.ibkr import ingest_cli as ib_cli
+from datalake.ingestors.ibkr.session import IBSessionPool, SessionConfig
+from datalake.providers.binance import client
+from datalake.utils.journal import JobJournal, open_journal
+
+
+def test_journal_replays_last_state_and_skips_truncated_line(tmp_path):
+    path = tmp_path / "jobs.jsonl"
+    j = JobJournal(str(path))
+    j.record("ibkr", "BTC-USD", "M1", "2025-08-01", rows=900, expected=1440,
+             last_ts="2025-08-01T14:59:00Z", requests=3)
+    j.record("ibkr", "BTC-USD", "M1", "2025-08-01", rows=1440, expected=1440, requests=2)
+    j.record("ibkr", "BTC-USD", "M1", "2025-08-02", rows=0, expected=1440)
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write('{"source": "ibkr", "sym')  # crash a mitad de línea
+
+    j2 = JobJournal(str(path))
+    rec = j2.get("ibkr", "BTC-USD", "M1", "2025-08-01")
+    assert rec["status"] == "done" and rec["requests"] == 5 and rec["attempts"] == 2
+    assert rec["last_ts"] == "2025-08-01T14:59:00+00:00"
+    assert j2.pending("ibkr", "BTC-USD", "M1", ["2025-08-01", "2025-08-02"]) == ["2025-08-02"]
+    j2.compact()
+    assert len(path.read_text().splitlines()) == 2
+    assert open_journal("off", str(tmp_path)) is None
+
+
+def test_binance_ingest_resumes_partial_day_and_skips_done(binance_stub, tmp_path, monkeypatch):
+    monkeypatch.setitem(client.BASE_URLS, "global", binance_stub.url)
+    monkeypatch.setenv("LAKE_ROOT", str(tmp_path))
+    # la cola del último día no existe todavía en el vendor
+    tail = pd.date_range("2025-08-02 12:00", "2025-08-02 23:55", freq="5min", tz="UTC")
+    binance_stub.missing_ms = {int(t.value // 1_000_000) for t in tail}
+    args = SimpleNamespace(symbols="BTC-USD", date_from="2025-08-01", date_to="2025-08-02",
+                           tf="M5", binance_region="global", journal="auto")
+
+    ingest_cli.ingest(args)
+    journal = JobJournal(str(tmp_path / ".state" / "jobs.jsonl"))
+    assert journal.get("binance", "BTC-USD", "M5", "2025-08-01")["status"] == "done"
+    assert journal.get("binance", "BTC-USD", "M5", "2025-08-02")["status"] == "partial"
+
+    binance_stub.missing_ms = set()
+    binance_stub.requests.clear()
+    paths = ingest_cli.ingest(args)
+    # solo se pide lo que falta tras last_ts del día parcial
+    assert len(binance_stub.requests) == 1
+    assert int(binance_stub.requests[0]["startTime"]) == int(tail[0].value // 1_000_000)
+    assert len(pd.read_parquet(paths[0])) == 2 * 288
+
+    binance_stub.requests.clear()
+    assert ingest_cli.ingest(args) == []
+    assert binance_stub.requests == []
+
+
+def test_binance_ingest_resume_skips_done_day_in_the_middle(binance_stub, tmp_path, monkeypatch):
+    monkeypatch.setitem(client.BASE_URLS, "global", binance_stub.url)
+    monkeypatch.setenv("LAKE_ROOT", str(tmp_path))
+    # solo el 2025-08-02 está disponible en la primera pasada
+    gaps = pd.date_range("2025-08-01", "2025-08-04", freq="5min", tz="UTC", inclusive="left")
+    gaps = gaps[gaps.normalize() != pd.Timestamp("2025-08-02", tz="UTC")]
+    binance_stub.missing_ms = {int(t.value // 1_000_000) for t in gaps}
+    args = SimpleNamespace(symbols="BTC-USD", date_from="2025-08-01", date_to="2025-08-03",
+                           tf="M5", binance_region="global", journal="auto")
+
+    ingest_cli.ingest(args)
+    journal = JobJournal(str(tmp_path / ".state" / "jobs.jsonl"))
+    assert journal.pending("binance", "BTC-USD", "M5", ["2025-08-01", "2025-08-02", "2025-08-03"]) == [
+        "2025-08-01", "2025-08-03"]
+
+    binance_stub.missing_ms = set()
+    binance_stub.requests.clear()
+    paths = ingest_cli.ingest(args)
+    day2 = (pd.Timestamp("2025-08-02", tz="UTC").value // 1_000_000,
+            pd.Timestamp("2025-08-03", tz="UTC").value // 1_000_000)
+    assert len(binance_stub.requests) == 2
+    for req in binance_stub.requests:
+        assert int(req["endTime"]) < day2[0] or int(req["startTime"]) >= day2[1]
+    assert len(pd.read_parquet(paths[0])) == 3 * 288
+
+
+def test_ibkr_ingest_resumes_only_missing_ranges(tmp_path, monkeypatch, fast_ibkr_governor):
+    hole = pd.date_range("2025-08-01 10:00", "2025-08-01 10:59", freq="min", tz="UTC")
+
+    class HoleIB(HonourIB):
+        def reqHistoricalData(self, *a, **kw):
+            return [b for b in super().reqHistoricalData(*a, **kw) if pd.Timestamp(b.date) not in self.hole]
+
+    def run(hole_ts):
+        HoleIB.hole = set(hole_ts)
+        pool = IBSessionPool(SessionConfig(host="h", port=1, base_client_id=1), factory=HoleIB)
+        monkeypatch.setattr(ib_cli, "shared_pool", lambda: pool)
+        args = ib_cli._build_parser().parse_args([
+            "--symbols", "BTC-USD", "--from", "2025-08-01", "--to", "2025-08-01",
+            "--planner", "fixed", "--planner-state", str(tmp_path / "planner.json"),
+            "--journal", str(tmp_path / "jobs.jsonl"),
+        ])
+        return ib_cli.ingest(args, data_root=str(tmp_path))
+
+    monkeypatch.delenv("DATALAKE_SYNTH", raising=False)
+    gov = fast_ibkr_governor
+    run(hole)
+    assert JobJournal(str(tmp_path / "jobs.jsonl")).get("ibkr", "BTC-USD", "M1", "2025-08-01")["status"] == "partial"
+
+    req0 = gov.requests
+    paths = run([])
+    rec = JobJournal(str(tmp_path / "jobs.jsonl")).get("ibkr", "BTC-USD", "M1", "2025-08-01")
+    assert rec["status"] == "done" and rec["rows"] == 1440
+    assert gov.requests - req0 == 1  # solo la hora que faltaba
+    assert len(pd.read_parquet(paths[0])) == 1440
+
+    req0 = gov.requests
+    assert run([]) == [] and gov.requests == req0
@@ -0,0 +1,66 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from datalake.providers.binance.client import fetch_klines
+from datalake.read.api import read_range_df
+from datalake.tools.synth import write_lake
+from datalake.utils import metrics
+
+
+@pytest.fixture
+def sink():
+    mem = metrics.MemorySink()
+    prev = metrics.configure(mem)
+    try:
+        yield mem
+    finally:
+        metrics.configure(prev)
+
+
+def test_disabled_span_is_shared_noop():
+    prev = metrics.configure(None)
+    try:
+        assert metrics.span("x") is metrics.NOOP and not metrics.span("x")
+        metrics.annotate(rows=1)  # sin span activo ni sink: no falla
+    finally:
+        metrics.configure(prev)
+
+
+def test_hot_paths_emit_rows_bytes_files_and_times(sink, tmp_path, binance_stub):
+    rep = write_lake(str(tmp_path), ["A-USD"], "2025-07-31", "2025-08-01", workers=1, merge=True)
+    df = read_range_df(str(tmp_path), market="crypto", tf="M1", symbol="A-USD",
+                       date_from="2025-07-31", date_to="2025-08-02")
+    utc = timezone.utc
+    fetch_klines("BTCUSDT", datetime(2025, 8, 1, tzinfo=utc), datetime(2025, 8, 1, 23, 59, tzinfo=utc),
+                 base_url=binance_stub.url)
+
+    by = {}
+    for r in sink.records:
+        by.setdefault(r["span"], []).append(r)
+    writes = by["ibkr.write_month"]
+    assert len(writes) == len(rep.files) == 2 and sum(w["rows"] for w in writes) == 2 * 1440
+    assert all(w["symbol"] == "A-USD" and w["bytes"] > 0 and w["wall_s"] > 0 for w in writes)
+    (read,) = by["read.range_df"]
+    assert read["rows"] == len(df) == 2 * 1440 and read["files"] == 2 and read["tf"] == "M1" and read["ok"]
+    (fetch,) = by["binance.fetch_klines"]
+    assert fetch["rows"] == 1440 and fetch["requests"] == 2
+    assert sum(p["bytes"] for p in by["binance.klines_page"]) > 0
+
+
+def test_prom_textfile_aggregates_per_span(tmp_path):
+    prom = metrics.PromTextfileSink(str(tmp_path / "dl.prom"), flush_s=3600)
+    prev = metrics.configure(prom)
+    try:
+        for n in (10, 5):
+            with metrics.span("read.range_df") as sp:
+                sp.set(rows=n)
+        with pytest.raises(ValueError):
+            with metrics.span("read.range_df"):
+                raise ValueError("boom")
+    finally:
+        metrics.configure(prev)  # flush al desactivar
+    text = (tmp_path / "dl.prom").read_text()
+    assert 'datalake_span_count_total{span="read.range_df"} 3' in text
+    assert 'datalake_span_errors_total{span="read.range_df"} 1' in text
+    assert 'datalake_span_rows_total{span="read.range_df"} 15' in text
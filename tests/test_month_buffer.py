@@ -0,0 +1,50 @@
+import pandas as pd
+
+from datalake.ingestors.ibkr import ingest_cli
+from datalake.ingestors.ibkr.month_buffer import MonthBuffer
+
+
+def _day(day: str, n: int = 1440) -> pd.DataFrame:
+    ts = pd.date_range(day, periods=n, freq="min", tz="UTC")
+    return pd.DataFrame({"ts": ts, "open": 1.0, "high": 1.0, "low": 1.0, "close": 1.0, "volume": 1.0})
+
+
+def test_buffer_writes_once_per_month_and_recovers_spill(tmp_path):
+    calls = []
+
+    def write(df, symbol, cfg):
+        calls.append((symbol, df["ts"].min().strftime("%Y-%m"), len(df)))
+        return f"{symbol}-{len(calls)}"
+
+    spill = tmp_path / "spill"
+    buf = MonthBuffer(None, str(spill), write=write)
+    for d in ("2025-07-30", "2025-07-31"):
+        assert buf.add("BTC-USD", _day(d)) == []
+    assert buf.flush("BTC-USD", before=(2025, 8)) == ["BTC-USD-1"]
+    buf.add("BTC-USD", _day("2025-08-01"))
+    assert calls == [("BTC-USD", "2025-07", 2 * 1440)]
+    assert not (spill / "symbol=BTC-USD" / "2025-07").exists()
+
+    # crash: el día de agosto solo está en el spill; otra corrida lo recupera
+    calls.clear()
+    assert MonthBuffer(None, str(spill), write=write).recover() == ["BTC-USD-1"]
+    assert calls == [("BTC-USD", "2025-08", 1440)]
+    assert not list(spill.rglob("*.parquet"))
+
+    # umbral de memoria: flush anticipado del mes más grande
+    calls.clear()
+    small = MonthBuffer(None, str(spill), max_rows=2000, write=write)
+    small.add("ETH-USD", _day("2025-08-01"))
+    assert small.add("ETH-USD", _day("2025-08-02")) == ["ETH-USD-1"]
+    assert small.rows == 0 and calls == [("ETH-USD", "2025-08", 2880)]
+
+
+def test_ingest_writes_each_month_once(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATALAKE_SYNTH", "1")
+    args = ingest_cli._build_parser().parse_args([
+        "--symbols", "BTC-USD", "--from", "2025-07-30", "--to", "2025-08-02", "--journal", "off",
+    ])
+    paths = ingest_cli.ingest(args, data_root=str(tmp_path))
+    assert [p.rsplit("part-", 1)[1] for p in paths] == ["2025-07.parquet", "2025-08.parquet"]
+    assert [len(pd.read_parquet(p)) for p in paths] == [2, 2]
+    assert not list((tmp_path / ".state" / "spill").rglob("*.parquet"))
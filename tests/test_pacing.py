@@ -0,0 +1,81 @@
+from datalake.utils.pacing import PacingConfig, PacingGovernor, is_ib_pacing_violation, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, s):
+        self.now += s
+
+
+def _gov(**kw):
+    clk = FakeClock()
+    return PacingGovernor(PacingConfig(**kw), clock=clk, sleep=clk.sleep), clk
+
+
+def test_token_bucket_rate():
+    gov, clk = _gov(rate_per_sec=2.0, burst=1.0)
+    for _ in range(5):
+        gov.acquire()
+    # 1 token inicial + 4 a 0.5s cada uno
+    assert abs(clk.now - 2.0) < 1e-9
+
+
+def test_weight_window_blocks_until_expiry():
+    gov, clk = _gov(max_weight=10, window_s=60)
+    for _ in range(5):
+        gov.acquire(2)
+    assert clk.now == 0.0 and gov.used_weight() == 10
+    gov.acquire(2)
+    assert clk.now == 60.0
+
+
+def test_server_weight_reconciliation():
+    gov, clk = _gov(max_weight=100, window_s=60)
+    gov.acquire(2)
+    gov.observe_used_weight(95)  # otro proceso en la misma IP ya gastó weight
+    assert gov.used_weight() == 95
+    gov.acquire(2)
+    assert clk.now == 0.0
+    gov.acquire(5)  # 97 + 5 > 100 -> espera a que expire la ventana
+    assert clk.now == 60.0
+
+
+def test_retry_after_and_backoff():
+    gov, clk = _gov(backoff_base_s=1.0, backoff_max_s=4.0)
+    assert gov.on_throttle(parse_retry_after("7")) == 7.0
+    gov.acquire()
+    assert clk.now == 7.0
+    assert [gov.on_throttle() for _ in range(3)] == [2.0, 4.0, 4.0]  # strikes acumulan y topan
+    gov.on_success()
+    assert gov.on_throttle() == 1.0
+
+
+def test_ib_pacing_detection():
+    assert is_ib_pacing_violation(162, "Historical Market Data Service error message:API historical data query cancelled: pacing violation")
+    assert not is_ib_pacing_violation(162, "HMDS query returned no data")
+
+
+def test_ib_client_keeps_shared_rate_unless_explicit():
+    from dataclasses import replace
+
+    from datalake.ingestors.ibkr.ib_client import IBClient, IBClientConfig
+    from datalake.utils.pacing import governor_for
+
+    gov = governor_for("ibkr")
+    before = gov.cfg
+    try:
+        gov.reconfigure(replace(before, rate_per_sec=0.5))
+        IBClient()
+        assert gov.cfg.rate_per_sec == 0.5  # un cliente más no cambia el ritmo del proceso
+        IBClient(IBClientConfig(rate_limit_rps=0.25))
+        assert gov.cfg.rate_per_sec == 0.25
+    finally:
+        gov.reconfigure(before)
+    # el 420 basta por sí solo; fuera de IB_PACING_CODES el texto no cuenta
+    assert is_ib_pacing_violation(420, "Invalid Real-time Query")
+    assert not is_ib_pacing_violation(200, "pacing violation")
@@ -25,3 +25,12 @@ def test_levels_basic():
     ol.load_m1_range = fake_loader  # monkeypatch
     out = ol.build_or_levels('BTC-USD','2025-08-01 00:00:00Z','2025-08-01 23:59:59Z', or_window='00:00-00:02', tz='UTC')
     assert set(['or_high','or_low','break_dir']).issubset(out.columns)
+
+def test_levels_multi_day(monkeypatch):
+    ts = pd.date_range('2025-08-01 00:00:00+00:00', periods=2 * 360, freq='4min')
+    price = [10 + (i % 90) * 0.1 for i in range(len(ts))]
+    df = pd.DataFrame({'ts':ts,'open':price,'high':[p+0.1 for p in price],'low':[p-0.1 for p in price],'close':price,'volume':[1]*len(ts)})
+    monkeypatch.setattr(ol, 'load_m1_range', lambda *a: df.copy())
+    out = ol.build_or_levels('BTC-USD','2025-08-01 00:00:00Z','2025-08-02 23:59:59Z', or_window='00:00-01:00', tz='UTC')
+    assert len(out) == 2
+    assert out['or_high'].round(6).tolist() == [11.5, 11.5]  # cada día usa solo sus propias velas
@@ -5,3 +5,28 @@ def test_api_smoke(tmp_path):
     # smoke: no archivos => DF vacío
     df = read_range_df(str(tmp_path), market='crypto', tf='M1', symbol='BTC-USD', date_from='2025-08-01', date_to='2025-08-01')
     assert df.empty
+
+
+def test_read_prunes_months_and_explains_plan(tmp_path, capsys, monkeypatch):
+    from datalake.read import cli
+    from datalake.tools.synth import Faults, write_lake
+
+    write_lake(str(tmp_path), ['BTC-USD'], '2025-06-30', '2025-08-01', faults=Faults(dup_rate=0.01), workers=1)
+    df = read_range_df(str(tmp_path), market='crypto', tf='M1', symbol='BTC-USD',
+                       date_from='2025-07-10', date_to='2025-07-11', explain=True)
+    plan = df.attrs['read_plan']
+    assert len(df) == 1440
+    assert [f.selected for f in plan.files] == [False, True, False]
+    (jul,) = plan.selected
+    # row groups por día UTC: solo se decodifica el 10/07 (con sus duplicados)
+    assert (jul.row_groups, jul.row_groups_total) == (1, 31)
+    assert jul.rows == plan.rows['decoded'] < 2 * 1440 and 0 < jul.bytes < os.path.getsize(jul.path) / 10
+    assert plan.rows['in_range'] > plan.rows['deduped'] == 1440
+    assert {'glob', 'prune', 'decode', 'coerce', 'filter', 'sort_dedupe'} <= set(plan.stages)
+
+    monkeypatch.setattr('sys.argv', ['datalake-read', 'read', '--lake-root', str(tmp_path), '--market', 'crypto',
+                                     '--tf', 'M1', '--symbol', 'BTC-USD', '--date-from', '2025-07-10',
+                                     '--date-to', '2025-07-11', '--explain'])
+    cli.main()
+    out = capsys.readouterr().out
+    assert 'READ PLAN' in out and '1 leídos / 2 podados' in out and 'sort_dedupe' in out
@@ -0,0 +1,75 @@
+import os
+
+import pandas as pd
+
+from datalake.commands.repair_plan import execute_plan, gaps_from_coverage, plan_requests
+from datalake.tools.coverage import coverage_matrix
+
+
+def _ts(s):
+    return pd.Timestamp(s, tz="UTC")
+
+
+def test_plan_requests_coalesces_and_splits():
+    gaps = pd.DataFrame({
+        "symbol": "BTC-USD", "timeframe": "M1",
+        "start": [_ts("2025-08-01 00:10"), _ts("2025-08-01 03:00"), _ts("2025-08-01 09:00")],
+        "end": [_ts("2025-08-01 00:20"), _ts("2025-08-01 03:05"), _ts("2025-08-02 02:59")],
+    })
+    plan = plan_requests(gaps)
+    # los dos primeros runs caben en una ventana de 8h; el run largo se parte
+    assert [(str(r.start.time()), str(r.end.time())) for r in plan] == [
+        ("00:10:00", "03:05:00"), ("09:00:00", "16:59:00"), ("17:00:00", "00:59:00"), ("01:00:00", "02:59:00"),
+    ]
+    assert len(plan[0].runs) == 2 and plan[0].missing_bars == 17
+    assert all(r.duration_seconds <= 8 * 3600 for r in plan)
+
+
+def test_plan_requests_every_tf_terminates():
+    import pytest
+
+    from datalake.commands.repair_plan import MAX_SPAN
+    from datalake.ingestors.ibkr.downloader import ib_duration_str
+    from datalake.ingestors.ibkr.ingest_cli import BAR_SIZES
+
+    assert set(BAR_SIZES) <= set(MAX_SPAN)
+    d1 = pd.DataFrame({"symbol": "BTC-USD", "timeframe": "D1",
+                       "start": [_ts("2025-01-03"), _ts("2025-03-01")], "end": [_ts("2025-01-05"), _ts("2025-03-01")]})
+    plan = plan_requests(d1)
+    assert len(plan) == 1 and plan[0].missing_bars == 4
+    assert ib_duration_str(plan[0].duration_seconds) == "58 D"
+    # span menor que el paso: cada request cubre al menos una barra
+    plan = plan_requests(d1, max_span={"D1": pd.Timedelta(hours=1)})
+    assert [r.missing_bars for r in plan] == [1, 1, 1, 1]
+
+    m5 = pd.DataFrame({"symbol": "BTC-USD", "timeframe": "M5",
+                       "start": [_ts("2025-08-01 00:00")], "end": [_ts("2025-08-09 23:55")]})
+    plan = plan_requests(m5)
+    assert len(plan) == 2 and sum(r.missing_bars for r in plan) == 9 * 288
+    with pytest.raises(ValueError):
+        plan_requests(m5.assign(timeframe="W1"))
+
+
+def test_repair_plan_writes_each_month_once(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATALAKE_SYNTH", "1")
+    full = pd.date_range("2025-07-31", "2025-08-01 23:59", freq="min", tz="UTC")
+    have = full.delete(list(range(100, 130)) + list(range(1500, 1510)) + [2000])
+    for (y, m), ts in pd.Series(have).groupby([have.year, have.month]):
+        d = tmp_path / "data" / "source=ibkr" / "market=crypto" / "timeframe=M1" / "symbol=BTC-USD" / f"year={y}" / f"month={m:02d}"
+        os.makedirs(d)
+        pd.DataFrame({"ts": ts.values, "open": 2.0, "high": 2.0, "low": 2.0, "close": 2.0, "volume": 5.0}).to_parquet(
+            d / f"part-{y}-{m:02d}.parquet", index=False)
+
+    report = coverage_matrix(str(tmp_path), sources=["ibkr"])
+    gaps = gaps_from_coverage(report, str(tmp_path))
+    assert list(gaps["bars"]) == [30, 10, 1]
+    plan = plan_requests(gaps)
+    assert len(plan) == 3  # 08-01 01:00 y 09:20 quedan a más de 8h
+
+    paths = execute_plan(plan, lake_root=str(tmp_path), exchange="PAXOS", what_to_show="AGGTRADES")
+    assert len(paths) == 2
+    after = coverage_matrix(str(tmp_path), sources=["ibkr"])
+    assert after["missing_bars"].sum() == 0
+    aug = pd.read_parquet(paths[1])
+    # las barras existentes no se pisan
+    assert (aug.loc[aug["ts"] == _ts("2025-08-01 00:00"), "close"] == 2.0).all()
@@ -0,0 +1,29 @@
+import pandas as pd
+
+from datalake.tools.synth import Faults, inject_faults, make_m1, write_lake
+
+
+def test_make_m1_and_faults_are_exact():
+    df = make_m1("BTC-USD", "2025-07-31", "2025-08-01")
+    assert len(df) == 2 * 1440 and df["ts"].is_monotonic_increasing and df["ts"].is_unique
+
+    bad, n = inject_faults(df, Faults(gap_rate=0.01, max_gap=5, dup_rate=0.01, disorder_rate=0.01), seed=3)
+    assert n["gaps"] > 0 and n["dups"] > 0 and n["disorder"] > 0
+    assert len(bad) == len(df) - n["gaps"] + n["dups"]
+    assert bad["ts"].duplicated().sum() == n["dups"]
+    assert 2 * 1440 - bad["ts"].nunique() == n["gaps"]
+    assert (bad["ts"].diff() < pd.Timedelta(0)).sum() >= n["disorder"] // 2
+
+
+def test_write_lake_splits_months_and_keeps_or_cleans_faults(tmp_path):
+    faults = Faults(dup_rate=0.01)
+    rep = write_lake(str(tmp_path / "raw"), ["A-USD", "B-USD"], "2025-07-31", "2025-08-01",
+                     faults=faults, workers=2, extra_tfs={"M5": "5min"})
+    assert rep.rows == 2 * 2 * 1440 + rep.injected["dups"]
+    assert len(rep.files) == 2 * 2 * 2  # símbolo x mes x (M1, M5)
+    jul = pd.read_parquet(tmp_path / "raw/data/source=ibkr/market=crypto/timeframe=M1/symbol=A-USD/year=2025/month=07/part-2025-07.parquet")
+    assert jul["ts"].dt.month.eq(7).all() and jul["ts"].duplicated().any()
+
+    rep = write_lake(str(tmp_path / "clean"), ["A-USD"], "2025-07-31", "2025-08-01", faults=faults, merge=True, workers=1)
+    df = pd.concat(pd.read_parquet(f) for f in rep.files)
+    assert len(df) == 2 * 1440 and df["ts"].is_unique
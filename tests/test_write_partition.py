@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from datalake.ingestors.binance.ingest_cli import write_merge_dedupe
+from datalake.write.partition import (
+    ConcurrentWriteError,
+    atomic_write_table,
+    merge_write,
+    partition_lock,
+    row_group_bounds,
+)
+
+
+def _day(day: str) -> pd.DataFrame:
+    ts = pd.date_range(day, periods=288, freq="5min", tz="UTC")
+    return pd.DataFrame({"ts": ts, "open": 1.0, "high": 1.0, "low": 1.0, "close": 1.0, "volume": 1.0,
+                         "symbol": "BTC-USD", "tf": "M5", "source": "binance", "exchange": "BINANCE"})
+
+
+def test_parallel_writers_same_month_keep_every_day(tmp_path):
+    days = [f"2025-08-{d:02d}" for d in range(1, 13)]
+    with ThreadPoolExecutor(max_workers=6) as ex:
+        paths = set(ex.map(lambda d: write_merge_dedupe(_day(d), root=str(tmp_path)), days))
+    assert len(paths) == 1
+    df = pd.read_parquet(paths.pop())
+    assert len(df) == len(days) * 288 and df["ts"].is_monotonic_increasing
+    assert not [p for p in tmp_path.rglob("*.tmp")]
+
+
+def test_merge_retries_when_partition_changes_underneath(tmp_path):
+    dest = tmp_path / "part.parquet"
+    atomic_write_table(pa.table({"x": [1]}), dest)
+    calls = []
+
+    def merge(existing):
+        calls.append(len(existing))
+        if len(calls) == 1:  # otro escritor sin lock publica una versión nueva
+            atomic_write_table(pa.table({"x": [1, 2]}), dest)
+        return pd.concat([existing, pd.DataFrame({"x": [3]})], ignore_index=True)
+
+    merge_write(dest, merge)
+    assert calls == [1, 2]
+    assert pd.read_parquet(dest)["x"].tolist() == [1, 2, 3]
+
+    def always_conflict(existing):
+        atomic_write_table(pa.table({"x": [0]}), dest)
+        return existing
+
+    with pytest.raises(ConcurrentWriteError):
+        merge_write(dest, always_conflict, retries=2)
+
+
+def test_partition_lock_times_out_while_held(tmp_path):
+    dest = tmp_path / "part.parquet"
+    with partition_lock(dest):
+        with ThreadPoolExecutor(max_workers=1) as ex:
+            fut = ex.submit(lambda: partition_lock(dest, timeout=0.1).__enter__())
+            with pytest.raises(TimeoutError):
+                fut.result()
+
+
+def test_row_groups_follow_utc_days(tmp_path, monkeypatch):
+    m5 = pd.concat([_day(f"2025-08-{d:02d}") for d in range(1, 11)], ignore_index=True)
+    dest = atomic_write_table(pa.Table.from_pandas(m5, preserve_index=False), tmp_path / "m5.parquet",
+                              row_groups="day")
+    md = pq.ParquetFile(dest).metadata
+    # 288 barras/día < 1000: se juntan días consecutivos (la cola corta va al último grupo)
+    assert [md.row_group(i).num_rows for i in range(md.num_row_groups)] == [1152, 1728]
+    st = md.row_group(1).column(0).statistics
+    assert (pd.Timestamp(st.min).day, pd.Timestamp(st.max).day) == (5, 10)
+
+    table = pa.Table.from_pandas(m5, preserve_index=False)
+    assert row_group_bounds(table, "day", min_rows=1) == [(d * 288, (d + 1) * 288) for d in range(10)]
+    assert row_group_bounds(table, 1000) == [(0, 1000), (1000, 2000), (2000, 2880)]
+    monkeypatch.setenv("DATALAKE_ROW_GROUP", "off")
+    assert pq.ParquetFile(atomic_write_table(table, tmp_path / "off.parquet")).metadata.num_row_groups == 1
@@ -3,6 +3,8 @@
 import argparse, glob, os
 import pandas as pd
 
+from datalake.tools.gaps import gap_runs
+
 
 def main():
     ap = argparse.ArgumentParser()
@@ -57,22 +59,12 @@ def main():
     print("per_hour:")
     print(per_hour)
 
-    full = pd.date_range(start, end, freq="1min")
-    missing = full.difference(pd.DatetimeIndex(d["ts"]))
-    print("missing_minutes:", len(missing))
+    step = {"M1": "1min", "M5": "5min", "M15": "15min", "M30": "30min", "H1": "1h"}.get(args.timeframe, "1min")
+    runs = gap_runs(d["ts"], start, end, step)
+    print("missing_minutes:", runs.missing)
     exit_code = 0
-    if len(missing):
-        ranges = []
-        s = missing[0]
-        prev = s
-        for ts in missing[1:]:
-            if ts - prev == pd.Timedelta(minutes=1):
-                prev = ts
-            else:
-                ranges.append((s, prev))
-                s = ts
-                prev = ts
-        ranges.append((s, prev))
+    if len(runs):
+        ranges = runs.to_list()
         print("missing_ranges:")
         for a, b in ranges:
             print(f"  {a.isoformat()} -> {b.isoformat()}")
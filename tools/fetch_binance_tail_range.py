@@ -7,26 +7,16 @@ from datetime import datetime, timezone
 import requests
 import pandas as pd
 
+from datalake.tools.gaps import gap_runs
+
 UTC = timezone.utc
 
 def to_ms(dt: datetime) -> int:
     return int(dt.timestamp() * 1000)
 
 def missing_report(df: pd.DataFrame, start_dt: datetime, end_dt: datetime):
-    exp = pd.date_range(start=start_dt, end=end_dt, freq="min", tz="UTC")
-    got = set(df["ts"]) if not df.empty else set()
-    miss = [t for t in exp if t not in got]
-    ranges = []
-    if miss:
-        run_start = miss[0]; prev = miss[0]
-        for t in miss[1:]:
-            if (t - prev) == pd.Timedelta(minutes=1):
-                prev = t
-            else:
-                ranges.append((run_start, prev))
-                run_start = t; prev = t
-        ranges.append((run_start, prev))
-    return len(miss), ranges
+    runs = gap_runs(df["ts"] if not df.empty else [], start_dt, end_dt, "1min")
+    return runs.missing, runs.to_list()
 
 def fetch_binance_klines(symbol: str, start_dt: datetime, end_dt: datetime, base_url: str):
     """
@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 """
-Llenado de granja de datos (source=binance) para un mes completo y múltiples TFs.
-- Itera días del mes YYYY-MM.
-- Reusa el ingestor interno de Binance (que ya pagina y escribe con dedupe).
-- Respeta límites con pacing conservador por minuto.
+Llenado de granja de datos (source=binance) para uno o varios meses y múltiples TFs.
+- Una unidad de trabajo por (símbolo, TF, mes): el ingestor empaqueta páginas
+  de 1000 velas sobre el mes y escribe una vez por mes. Las unidades corren en
+  un pool de ``--workers`` hilos (datalake.ingestors.binance.orchestrator).
+- Respeta límites con el governor de pacing compartido (token bucket + budget
+  de weight por minuto + backoff ante 429/418), el mismo que usa el cliente.
+  El weight usado se reconcilia con la cabecera X-MBX-USED-WEIGHT-1M.
 
 Uso básico (PowerShell):
 
@@ -14,29 +17,36 @@ Uso básico (PowerShell):
     --region global
 
 Puedes ajustar:
-  --sleep-per-call 0.2   (segundos entre "unidades planificadas" de request)
-  --max-weight-per-minute 5000  (budget conservador; Spot ~6000/min en binance.com)
+  --derive-from-m1       (bajar solo M1; M5/M15/M30 se agregan localmente)
+  --verify-days 2        (con --derive-from-m1: muestra de días comparada contra la API)
+  --to-month 2025-10     (último mes, inclusive, para rangos multi-mes)
+  --workers 4            (unidades en paralelo; todas comparten el mismo budget)
+  --sleep-per-call 0.2   (intervalo mínimo entre requests; 0 = sin tope de tasa)
+  --weight-fraction 0.8  (fracción del límite de weight/min de la región)
+  --max-weight-per-minute 5000  (budget absoluto; tiene prioridad sobre la fracción)
+  --journal auto         (estado por día en <lake>/.state/jobs.jsonl; off = sin journal)
+  --no-resume            (re-descargar aunque el journal marque días completos)
   --dry-run
 
+Si el proceso se corta, volver a lanzarlo salta los días ya completos y retoma
+desde el primer día pendiente.
+
+Al final se reporta requests/min, weight/min frente al objetivo y velas/s.
+
 Nota: El ingestor escribe bajo ./data/source=binance/...
 """
 from __future__ import annotations
 import argparse
-import calendar
+import os
 import sys
-import time
-from dataclasses import dataclass
-from datetime import date, datetime, timezone, timedelta
-from types import SimpleNamespace
 
-# Importamos el orquestador de escritura que ya existe en la repo
-try:
-    from datalake.ingestors.binance.ingest_cli import ingest  # type: ignore
-except Exception as e:
-    print("ERROR: No se pudo importar datalake.ingestors.binance.ingest_cli.ingest", e, file=sys.stderr)
-    sys.exit(2)
+import numpy as np
+import pandas as pd
 
-UTC = timezone.utc
+from datalake.ingestors.binance.ingest_cli import verify_derived
+from datalake.ingestors.binance.orchestrator import UnitResult, month_range, plan_units, run_units
+from datalake.providers.binance.client import configure_weight_budget, weight_budget
+from datalake.utils.journal import open_journal
 
 TF_EXPECTED = {
     "M1": 1440,
@@ -45,71 +55,56 @@ TF_EXPECTED = {
     "M30": 48,
 }
 
-# Aproximación de requests por día según TF (Spot /api/v3/klines limit=1000)
-# Esto es para pacing de rate limit a nivel orquestador (el ingestor ya pagina internamente)
-TF_REQS_PER_DAY = {
-    "M1": 2,   # 1440/1000 => 2 requests
-    "M5": 1,   # 288 <= 1000
-    "M15": 1,  # 96 <= 1000
-    "M30": 1,  # 48 <= 1000
-}
-
-@dataclass
-class Budget:
-    max_weight_per_minute: int = 5000  # conservador (binance.com suele ser 6000)
-    used_weight: int = 0
-    window_start: float = time.time()
-
-    def maybe_wait(self, planned_reqs: int, weight_per_req: int = 2, sleep_per_call: float = 0.2):
-        """Control de budget por minuto (ventana deslizante). Si vamos a exceder,
-        dormimos hasta que reinicie la ventana. Además paceamos con pequeños sleeps por request planificada.
-        """
-        now = time.time()
-        # Reinicia ventana si pasó 1 minuto
-        if now - self.window_start >= 60:
-            self.window_start = now
-            self.used_weight = 0
-        planned_weight = planned_reqs * weight_per_req
-        if self.used_weight + planned_weight > self.max_weight_per_minute:
-            # Esperar al comienzo de la próxima ventana
-            wait_s = 60 - (now - self.window_start)
-            if wait_s > 0:
-                print(f"[RATE] Esperando {wait_s:.1f}s para no exceder budget/min...")
-                time.sleep(wait_s)
-            # Reinicia
-            self.window_start = time.time()
-            self.used_weight = 0
-        # Pacing suave por cada req planificada
-        for _ in range(planned_reqs):
-            time.sleep(max(0.0, sleep_per_call))
-            self.used_weight += weight_per_req
-
-
-def iter_days_of_month(year: int, month: int):
-    ndays = calendar.monthrange(year, month)[1]
-    for d in range(1, ndays + 1):
-        yield date(year, month, d)
-
-
 def parse_args() -> argparse.Namespace:
     ap = argparse.ArgumentParser(description="Llenar granja (source=binance) por mes/TF con pacing")
     ap.add_argument("--symbols", required=True, help="Lista separada por comas, ej.: BTC-USD,ETH-USD")
-    ap.add_argument("--month", required=True, help="YYYY-MM (UTC)")
+    ap.add_argument("--month", required=True, help="YYYY-MM (UTC); primer mes si se usa --to-month")
+    ap.add_argument("--to-month", default=None, help="YYYY-MM último mes (inclusive) para rangos multi-mes")
     ap.add_argument("--tfs", default="M1,M5,M15,M30", help="TFs separados por coma; soportados: M1,M5,M15,M30")
     ap.add_argument("--region", choices=["global","us"], default="global", help="Binance región")
-    ap.add_argument("--sleep-per-call", type=float, default=0.2, help="Pausa (s) por request planificada")
-    ap.add_argument("--max-weight-per-minute", type=int, default=5000, help="Budget de weight/min (conservador)")
-    ap.add_argument("--dry-run", action="store_true", help="No ingesta, solo plan y pacing")
+    ap.add_argument("--workers", type=int, default=4, help="Unidades (símbolo, TF, mes) en paralelo; comparten el budget")
+    ap.add_argument("--sleep-per-call", type=float, default=0.2, help="Intervalo mínimo (s) entre requests; 0 = sin tope")
+    ap.add_argument("--weight-fraction", type=float, default=None, help="Fracción del límite de weight/min (default BINANCE_WEIGHT_FRACTION o 0.8)")
+    ap.add_argument("--max-weight-per-minute", type=int, default=None, help="Budget absoluto de weight/min")
+    ap.add_argument("--journal", default=os.getenv("DATALAKE_JOURNAL", "auto"),
+                    help="Journal de días procesados; auto = <lake>/.state/jobs.jsonl, off = sin journal")
+    ap.add_argument("--no-resume", action="store_true", help="Re-descargar aunque el journal marque días completos")
+    ap.add_argument("--derive-from-m1", action="store_true",
+                    help="Bajar solo M1 y agregar M5/M15/M30 localmente (ahorra weight)")
+    ap.add_argument("--verify-days", type=int, default=0,
+                    help="Con --derive-from-m1: comparar N días por símbolo/TF derivada contra la API")
+    ap.add_argument("--dry-run", action="store_true", help="No ingesta, solo plan")
     return ap.parse_args()
 
 
+def _progress(res: UnitResult) -> None:
+    if res.error:
+        print(f"[ERROR] {res.unit}: {res.error}", file=sys.stderr)
+    else:
+        print(f"[DONE] {res.unit} filas={res.rows} en {res.seconds:.1f}s")
+
+
+def _verify(units, n_days: int, region: str, lake_root: str) -> None:
+    """Muestra de días por (símbolo, TF derivada): compara contra la API."""
+    for u in units:
+        if not u.derive:
+            continue
+        days = pd.date_range(u.date_from, u.date_to, freq="D")
+        idx = sorted({int(i) for i in np.linspace(0, len(days) - 1, min(n_days, len(days)))})
+        for tf in u.derive:
+            for i in idx:
+                r = verify_derived(u.symbol, tf, days[i].date().isoformat(), region, root=lake_root)
+                ok = r["mismatched"] == 0 and r["only_api"] == 0 and r["only_local"] == 0
+                print(f"[VERIFY] {u.symbol} {tf} {r['day']} api={r['api_rows']} local={r['local_rows']} "
+                      f"dif={r['mismatched']} solo_api={r['only_api']} solo_local={r['only_local']} {'OK' if ok else 'DIFF'}")
+
+
 def main() -> int:
     args = parse_args()
     try:
-        year, month = map(int, args.month.split("-"))
-        assert 1 <= month <= 12
-    except Exception:
-        print("--month debe ser YYYY-MM", file=sys.stderr)
+        months = month_range(args.month, args.to_month)
+    except ValueError:
+        print("--month/--to-month deben ser YYYY-MM (y --to-month >= --month)", file=sys.stderr)
         return 2
 
     symbols = [s.strip() for s in args.symbols.split(",") if s.strip()]
@@ -119,46 +114,50 @@ def main() -> int:
             print(f"TF no soportado: {t}", file=sys.stderr)
             return 2
 
-    budget = Budget(max_weight_per_minute=args.max_weight_per_minute)
-
-    total_days = calendar.monthrange(year, month)[1]
-    print(f"Plan: symbols={symbols} month={args.month} tfs={tfs} region={args.region} days={total_days}")
-    print(f"Pacing: sleep_per_call={args.sleep_per_call}s, max_weight/min={args.max_weight_per_minute}")
-
-    # Recorremos símbolo → TF → días
-    for sym in symbols:
-        for tf in tfs:
-            planned_reqs_per_day = TF_REQS_PER_DAY[tf]
-            exp_rows = TF_EXPECTED[tf]
-            print(f"\n=== {sym} | {tf} | {args.month} ===")
-            for d in iter_days_of_month(year, month):
-                day_str = d.isoformat()
-                # Pacing conservador antes de lanzar la ingesta del día
-                budget.maybe_wait(planned_reqs=planned_reqs_per_day, sleep_per_call=args.sleep_per_call)
-
-                print(f"[RUN] {sym} {tf} {day_str} (esperado {exp_rows} filas)")
-                if args.dry_run:
-                    continue
-                # Construimos args para el ingestor interno de Binance (que ya pagina y escribe)
-                ns = SimpleNamespace(
-                    symbols=sym,
-                    date_from=day_str,
-                    date_to=day_str,
-                    tf=tf,
-                    binance_region=args.region,
-                )
-                try:
-                    ingest(ns)  # escribe al lake y loguea warn si filas!=esperado
-                except SystemExit as se:
-                    # por si el ingest hace SystemExit
-                    if int(se.code) != 0:
-                        print(f"[ERROR] ingest SystemExit code={se.code} en {sym} {tf} {day_str}", file=sys.stderr)
-                except Exception as e:
-                    print(f"[ERROR] ingest falló en {sym} {tf} {day_str}: {e}", file=sys.stderr)
-                    # seguimos con el siguiente día sin abortar todo
-                    continue
-
-    print("\nOK: proceso completado.")
+    rate = 1.0 / args.sleep_per_call if args.sleep_per_call > 0 else 0.0
+    configure_weight_budget(
+        args.region,
+        fraction=args.weight_fraction,
+        max_weight=args.max_weight_per_minute,
+        rate_per_sec=rate,
+    )
+    budget = weight_budget(args.region)
+
+    units = plan_units(symbols, tfs, args.month, args.to_month, derive=args.derive_from_m1)
+    planned = sum(u.planned_requests for u in units)
+    print(f"Plan: symbols={symbols} months={args.month}→{args.to_month or args.month} ({len(months)}) tfs={tfs} region={args.region}")
+    print(f"Unidades={len(units)} requests planeados={planned} workers={args.workers}")
+    if args.derive_from_m1:
+        full = sum(u.planned_requests for u in plan_units(symbols, tfs, args.month, args.to_month))
+        print(f"Derivando de M1: {planned} requests en vez de {full} ({1 - planned / full:.0%} menos weight)")
+    print(f"Pacing: sleep_per_call={args.sleep_per_call}s, weight/min objetivo={budget['target']:.0f} (límite {budget['limit']})")
+    if args.dry_run:
+        for u in units:
+            print(f"[PLAN] {u} {u.date_from}→{u.date_to} ({u.planned_requests} req)")
+        return 0
+
+    lake_root = os.getenv("LAKE_ROOT", os.getcwd())
+    report = run_units(
+        units,
+        region=args.region,
+        workers=args.workers,
+        journal=open_journal(args.journal, lake_root),
+        resume=not args.no_resume,
+        root=lake_root,
+        progress=_progress,
+    )
+    if args.derive_from_m1 and args.verify_days > 0:
+        _verify(units, args.verify_days, args.region, lake_root)
+    s = report.summary()
+    print(
+        f"\n[RATE] requests={s['requests']} en {s['elapsed_s']:.1f}s → {s['requests_per_min']:.0f} req/min, "
+        f"{s['weight_per_min']:.0f}/{s['target_weight_per_min']:.0f} weight/min ({s['budget_use']:.0%} del budget), "
+        f"{s['bars_per_sec']:.0f} velas/s"
+    )
+    if report.failed:
+        print(f"Terminado con {len(report.failed)} unidades fallidas.", file=sys.stderr)
+        return 1
+    print("OK: proceso completado.")
     return 0
 
 
@@ -1,69 +1,41 @@
-import argparse, os
-from types import SimpleNamespace
-from datetime import datetime, timedelta, timezone
-import numpy as np
-import pandas as pd
-from datalake.ingestors.ibkr.writer import write_month
-
-
-def make_m1(symbol: str, day_from: str, day_to: str, seed: int = 42) -> pd.DataFrame:
-    rng = np.random.default_rng(seed)
-    d0 = datetime.fromisoformat(day_from).replace(tzinfo=timezone.utc)
-    d1 = datetime.fromisoformat(day_to).replace(tzinfo=timezone.utc)
+"""Lake sintético (M1 IBKR) para demos, benchmarks y QC.
 
-    day = d0
-    frames = []
-    price0 = 100_000.0
-    while day <= d1:
-        idx = pd.date_range(day.replace(hour=0, minute=0, second=0, microsecond=0),
-                            day.replace(hour=23, minute=59, second=0, microsecond=0),
-                            freq="1min", tz="UTC")
-        steps = rng.normal(0, 10, len(idx))
-        px = price0 + steps.cumsum()
-        high = px + rng.uniform(0, 5, len(idx))
-        low  = px - rng.uniform(0, 5, len(idx))
-        open_ = px
-        close = px + rng.normal(0, 2, len(idx))
-        vol = rng.integers(0, 100, len(idx))
+    python tools/synth_gen.py --symbol BTC-USD --from 2025-08-01 --to 2025-08-03
+    python tools/synth_gen.py --n-symbols 100 --from 2024-01-01 --to 2024-12-31 --workers 8 \\
+        --gap-rate 0.001 --dup-rate 0.0005 --disorder-rate 0.0005
 
-        df = pd.DataFrame({
-            "ts": idx,
-            "open": open_, "high": high, "low": low, "close": close,
-            "volume": vol
-        })
-        frames.append(df)
-        price0 = float(close[-1])
-        day += timedelta(days=1)
+Ver ``datalake.tools.synth`` para la API.
+"""
+import argparse, os
 
-    out = pd.concat(frames, ignore_index=True)
-    out["source"]="ibkr"; out["market"]="crypto"; out["timeframe"]="M1"; out["symbol"]=symbol
-    out["exchange"]=os.getenv("IB_EXCHANGE_CRYPTO","PAXOS")
-    out["what_to_show"]=os.getenv("IB_WHAT_TO_SHOW","AGGTRADES")
-    out["vendor"]="ibkr"; out["tz"]="UTC"
-    return out
+from datalake.tools.synth import Faults, make_m1, symbol_names, write_lake  # noqa: F401  (make_m1: compat)
 
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--symbol", required=True, help="BTC-USD, ETH-USD, etc.")
+    who = ap.add_mutually_exclusive_group(required=True)
+    who.add_argument("--symbol", help="BTC-USD, ETH-USD, etc. (lista separada por comas)")
+    who.add_argument("--n-symbols", type=int, help="Genera SYN0-USD..SYN{N-1}-USD")
     ap.add_argument("--from", dest="date_from", required=True, help="YYYY-MM-DD (UTC)")
     ap.add_argument("--to",   dest="date_to",   required=True, help="YYYY-MM-DD (UTC)")
     ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--root", default=os.getenv("LAKE_ROOT", os.getcwd()))
+    ap.add_argument("--workers", type=int, default=None, help="Procesos (default: CPUs)")
+    ap.add_argument("--gap-rate", type=float, default=0.0, help="Fracción de barras eliminadas (en runs)")
+    ap.add_argument("--max-gap", type=int, default=30, help="Largo máximo de cada hueco (minutos)")
+    ap.add_argument("--dup-rate", type=float, default=0.0, help="Fracción de barras duplicadas")
+    ap.add_argument("--disorder-rate", type=float, default=0.0, help="Fracción de pares fuera de orden")
+    ap.add_argument("--merge", action="store_true", help="Escribir vía write_month (merge/dedupe; limpia los defectos)")
     args = ap.parse_args()
 
-    df = make_m1(args.symbol, args.date_from, args.date_to, seed=args.seed)
-
-    cfg = SimpleNamespace(
-        data_root=os.getenv("LAKE_ROOT", os.getcwd()),
-        market="crypto", timeframe="M1",
-        source="ibkr", vendor="ibkr",
-        exchange=os.getenv("IB_EXCHANGE_CRYPTO","PAXOS"),
-        what_to_show=os.getenv("IB_WHAT_TO_SHOW","AGGTRADES"),
-        tz="UTC",
-    )
-
-    path = write_month(df, symbol=args.symbol, cfg=cfg)
-    print("M1 sintético escrito en:", path, "| rows:", len(df))
+    symbols = ([s.strip() for s in args.symbol.split(",") if s.strip()] if args.symbol
+               else symbol_names(args.n_symbols))
+    faults = Faults(gap_rate=args.gap_rate, max_gap=args.max_gap, dup_rate=args.dup_rate,
+                    disorder_rate=args.disorder_rate)
+    rep = write_lake(args.root, symbols, args.date_from, args.date_to, seed=args.seed,
+                     faults=faults, merge=args.merge, workers=args.workers)
+    print(f"M1 sintético: símbolos={rep.symbols} filas={rep.rows} archivos={len(rep.files)} "
+          f"en {rep.seconds:.1f}s ({rep.rows_per_sec / 1e6:.2f} M filas/s) | inyectado={rep.injected}")
 
 
 if __name__ == "__main__":